@@ -1,6 +1,30 @@
-from .api_utils import OpenAIClient, extract_json
+import importlib
+
+# openai is only imported once a client is created
+_LAZY = {
+    "OpenAIClient": "api_utils",
+    "extract_json": "api_utils",
+    "HTTPPool": "http_pool",
+    "get_http_pool": "http_pool",
+    "configure_http_pool": "http_pool",
+}
 
 __all__ = [
     "OpenAIClient",
-    "extract_json"
-]
\ No newline at end of file
+    "extract_json",
+    "HTTPPool",
+    "get_http_pool",
+    "configure_http_pool",
+]
+
+
+def __getattr__(name: str):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_LAZY[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
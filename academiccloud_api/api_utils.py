@@ -1,47 +1,70 @@
-from openai import OpenAI
 import json
 from httpx import Timeout
 from typing import Any
+from profiling import timer, count
+from .http_pool import HTTPPool, get_http_pool
 
 class OpenAIClient:
-    def __init__(self, api_key_path: str, timeout: Timeout=Timeout(600.0, read=200.0, write=400.0, connect=3.0)):
+    def __init__(
+            self,
+            api_key_path: str,
+            timeout: Timeout=Timeout(600.0, read=200.0, write=400.0, connect=3.0),
+            http_pool: HTTPPool=None,
+            base_url: str="https://chat-ai.academiccloud.de/v1",
+            max_retries: int=2
+        ):
         """
         Initialize the OpenAI client with API key and base URL.
         Hand different timeout parameters for larger queries/models.
+        Connections come from the shared pool unless another `http_pool` is given.
+        Point `base_url` to any OpenAI compatible endpoint, e.g. a local stand-in.
         """
+        from openai import OpenAI
+
         with open(api_key_path, "r") as f:
             api_key = f.read().strip()
-        base_url = "https://chat-ai.academiccloud.de/v1"
 
         self.client = OpenAI(
             api_key=api_key,
             base_url=base_url,
             timeout=timeout,
+            max_retries=max_retries,
+            http_client=(http_pool or get_http_pool()).client,
         )
+        # token usage of the latest non-streamed completion
+        self.last_usage = None
 
     def prompt_model(self, messages: list[dict], model: str, stream: bool=False) -> str:
         """
         Prompt a model on the academic cloud. Response can be streamed.
+        Latency and token usage are recorded per model under "llm.<model>".
         """
+        count(f"llm.{model}.requests")
         if stream:
             print("Streaming response...", flush=True)
             final_response = ""
-            response = self.client.chat.completions.create(
-                messages=messages,
-                model=model,
-                stream=True
-            )
-            for chunk in response:
-                content = chunk.choices[0].delta.content or ""
-                print(content, end="", flush=True)
-                final_response += content
+            with timer(f"llm.{model}"):
+                response = self.client.chat.completions.create(
+                    messages=messages,
+                    model=model,
+                    stream=True
+                )
+                for chunk in response:
+                    content = chunk.choices[0].delta.content or ""
+                    print(content, end="", flush=True)
+                    final_response += content
             print("\n[End of stream]")
             return final_response
         else:
-            response = self.client.chat.completions.create(
-                messages=messages,
-                model=model
-            )
+            with timer(f"llm.{model}"):
+                response = self.client.chat.completions.create(
+                    messages=messages,
+                    model=model
+                )
+            self.last_usage = response.usage
+            if response.usage:
+                count(f"llm.{model}.prompt_tokens", response.usage.prompt_tokens)
+                count(f"llm.{model}.completion_tokens", response.usage.completion_tokens)
             return response.choices[0].message.content
 
 
@@ -0,0 +1,188 @@
+import threading
+from functools import partial
+from importlib.util import find_spec
+from httpx import Client, Limits, Timeout, Request, Response, BaseTransport, HTTPTransport, SyncByteStream
+
+DEFAULT_TIMEOUT = Timeout(30.0, connect=5.0)
+
+
+class PoolStats:
+    """
+    Per-host counters for requests and newly opened connections.
+    A request that did not open a connection reused a pooled one.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hosts = {}
+
+    def add(self, host: str, key: str, n: int=1):
+        with self._lock:
+            counts = self.hosts.setdefault(
+                host, {"requests": 0, "connections": 0, "tls_handshakes": 0, "http2_requests": 0}
+                )
+            counts[key] += n
+
+    def summary(self) -> dict:
+        """
+        Returns the counters per host plus totals and the connection reuse ratio.
+        """
+        with self._lock:
+            hosts = {host: dict(counts) for host, counts in self.hosts.items()}
+
+        totals = {"requests": 0, "connections": 0, "tls_handshakes": 0, "http2_requests": 0}
+        for counts in hosts.values():
+            for key, value in counts.items():
+                totals[key] += value
+        for counts in list(hosts.values()) + [totals]:
+            counts["reuse_ratio"] = (
+                1 - counts["connections"] / counts["requests"] if counts["requests"] else 0.0
+                )
+        return {"hosts": hosts, "total": totals}
+
+
+class _ReleasingStream(SyncByteStream):
+    """
+    Response body that calls `release` once it is closed, i.e. read to the end or discarded.
+    """
+    def __init__(self, stream: SyncByteStream, release):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            if self._release is not None:
+                self._release()
+                self._release = None
+
+
+class _HostLimitedTransport(BaseTransport):
+    def __init__(self, transport: BaseTransport, slot):
+        """
+        Holds one of the target host's slots (see `HTTPPool._slot`) from sending a request
+        until its response is closed, so the limit also covers clients handed `HTTPPool.client`.
+        """
+        self._transport = transport
+        self._slot = slot
+
+    def handle_request(self, request: Request) -> Response:
+        slot = self._slot(request.url.host)
+        slot.acquire()
+        try:
+            response = self._transport.handle_request(request)
+        except BaseException:
+            slot.release()
+            raise
+        return Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_ReleasingStream(response.stream, slot.release),
+            extensions=response.extensions,
+        )
+
+    def close(self):
+        self._transport.close()
+
+
+class HTTPPool:
+    def __init__(
+            self,
+            timeout: Timeout=DEFAULT_TIMEOUT,
+            max_connections: int=50,
+            max_keepalive_connections: int=20,
+            max_per_host: int=8,
+            keepalive_expiry: float=30.0,
+            http2: bool=True,
+            headers: dict=None
+        ):
+        """
+        One keep-alive connection pool shared by scraping and the LLM client.
+        HTTP/2 is used when the optional `h2` package is installed.
+        `max_per_host` caps concurrent requests to a single host, for `request` as well as
+        for clients using `client` directly like `OpenAIClient`. A streamed response holds
+        its host's slot until it is closed.
+        """
+        self.http2 = http2 and find_spec("h2") is not None
+        self.max_per_host = max_per_host
+        self.stats = PoolStats()
+        self._host_slots = {}
+        self._lock = threading.Lock()
+
+        limits = Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.client = Client(
+            timeout=timeout,
+            limits=limits,
+            http2=self.http2,
+            transport=_HostLimitedTransport(HTTPTransport(limits=limits, http2=self.http2), self._slot),
+            headers=headers,
+            follow_redirects=True,
+            event_hooks={"request": [self._on_request], "response": [self._on_response]},
+        )
+
+    def _on_request(self, request: Request):
+        request.extensions["trace"] = partial(self._trace, request.url.host)
+
+    def _on_response(self, response: Response):
+        host = response.request.url.host
+        self.stats.add(host, "requests")
+        if response.http_version == "HTTP/2":
+            self.stats.add(host, "http2_requests")
+
+    def _trace(self, host: str, event_name: str, info: dict):
+        if event_name == "connection.connect_tcp.complete":
+            self.stats.add(host, "connections")
+        elif event_name == "connection.start_tls.complete":
+            self.stats.add(host, "tls_handshakes")
+
+    def _slot(self, host: str) -> threading.Semaphore:
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_slots[host]
+
+    def request(self, method: str, url: str, **kwargs) -> Response:
+        """
+        Sends a request through the pool, waiting for a free slot on the target host.
+        Keyword arguments are passed to `httpx.Client.request`.
+        """
+        return self.client.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> Response:
+        return self.request("GET", url, **kwargs)
+
+    def close(self):
+        self.client.close()
+
+
+_shared_pool = None
+_shared_lock = threading.Lock()
+
+
+def get_http_pool() -> HTTPPool:
+    """
+    Returns the process-wide pool, creating it with default settings on first use.
+    """
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = HTTPPool()
+        return _shared_pool
+
+
+def configure_http_pool(**kwargs) -> HTTPPool:
+    """
+    Replaces the process-wide pool with one built from `kwargs` (see `HTTPPool`).
+    Clients created before this call keep using the old pool, so configure first.
+    """
+    global _shared_pool
+    with _shared_lock:
+        _shared_pool = HTTPPool(**kwargs)
+        return _shared_pool
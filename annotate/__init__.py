@@ -1,9 +1,50 @@
-from .prompting import get_screening_prompt, get_review_prompt, annotate_df
-from .scrape_pdfs import scrape_paper
+import importlib
+
+# pandas, openai and the PDF libraries are only imported once these are used
+_LAZY = {
+    "annotate_df": "prompting",
+    "get_screening_prompt": "prompting",
+    "get_review_prompt": "prompting",
+    "screening_prompt_args": "prompting",
+    "review_prompt_args": "prompting",
+    "scrape_paper": "scrape_pdfs",
+    "cascade_annotate_df": "cascade",
+    "cascade_report": "cascade",
+    "print_cascade_report": "cascade",
+    "annotate_by_priority": "scheduling",
+    "priority_scores": "scheduling",
+    "AnnotationQueue": "scheduling",
+    "annotate_with_workers": "workqueue",
+    "run_worker": "workqueue",
+    "WorkQueue": "workqueue",
+}
 
 __all__ = [
     "annotate_df",
     "get_screening_prompt",
     "get_review_prompt",
+    "screening_prompt_args",
+    "review_prompt_args",
     "scrape_paper",
-]
\ No newline at end of file
+    "cascade_annotate_df",
+    "cascade_report",
+    "print_cascade_report",
+    "annotate_by_priority",
+    "priority_scores",
+    "AnnotationQueue",
+    "annotate_with_workers",
+    "run_worker",
+    "WorkQueue",
+]
+
+
+def __getattr__(name: str):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_LAZY[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,342 @@
+import re
+import json
+from typing import Callable
+import pandas as pd
+from pandas import DataFrame
+from academiccloud_api import OpenAIClient
+from profiling import scope, count
+from storage.ids import paper_id
+from .prompting import annotate_df
+
+CONFIDENCE_QUESTION = """CONFIDENCE
+
+Rate how confident you are in your answers from 0 (guessing) to 100 (certain).
+Add the rating as one more object at the end of the JSON list:
+
+```json
+  {"confidence": "0-100"}
+```"""
+
+# Confidence of answers like "high" from models that ignore the scale
+VERBAL_CONFIDENCE = {"very high": 95, "high": 85, "medium": 60, "moderate": 60, "low": 30, "very low": 10}
+
+ROLES = ["small", "large"]
+
+
+def with_confidence_question(prompt_fn: Callable) -> Callable:
+    """
+    Wraps a prompt function like `get_screening_prompt` so the model also rates its confidence.
+    """
+    def prompt_with_confidence(*args) -> list[dict]:
+        messages = prompt_fn(*args)
+        last = messages[-1]
+        return [*messages[:-1], {**last, "content": f"{last['content']}\n\n{CONFIDENCE_QUESTION}"}]
+    return prompt_with_confidence
+
+
+def parse_confidence(value) -> float:
+    """
+    Confidence from 0 to 100 from answers like "85", "85%", "0.85" or "high", None if there is none.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and not pd.isna(value):
+        value = str(value)
+    if not isinstance(value, str):
+        return None
+    match = re.search(r"\d+(?:\.\d+)?", value)
+    if not match:
+        return VERBAL_CONFIDENCE.get(value.strip().lower())
+    confidence = float(match.group())
+    if "." in match.group() and confidence <= 1:
+        confidence *= 100
+    return min(confidence, 100.0)
+
+
+def _usage(run_report: dict, model: str) -> dict:
+    counters = run_report["counters"]
+    return {
+        "requests": counters.get(f"llm.{model}.requests", 0),
+        "seconds": run_report["timers"].get(f"llm.{model}", {}).get("seconds", 0.0),
+        "tokens": counters.get(f"llm.{model}.prompt_tokens", 0) + counters.get(f"llm.{model}.completion_tokens", 0),
+    }
+
+
+def _new_usage(small_model: str, large_model: str) -> dict:
+    return {
+        "rows": [],
+        **{role: {"model": model, "requests": 0, "seconds": 0.0, "tokens": 0}
+           for role, model in zip(ROLES, [small_model, large_model])},
+    }
+
+
+def _annotate_pass(
+        part: DataFrame,
+        client: OpenAIClient,
+        model: str,
+        role: str,
+        prompt_fn: Callable,
+        get_prompt_args: Callable,
+        max_workers: int,
+        usage: dict
+    ) -> DataFrame:
+    """
+    Annotates the rows of `part` with `model` in a separate DataFrame, so the answers of
+    both models can be compared before any is written to the candidates.
+    Adds the requests, model time and tokens of this pass to `usage[role]`.
+    """
+    answers = DataFrame(index=part.index)
+    # kept for the full-text index
+    for col in ["title", "abstract"]:
+        if col in part.columns:
+            answers[col] = part[col]
+    answers["_args"] = pd.Series([get_prompt_args(row) for _, row in part.iterrows()], index=part.index, dtype=object)
+
+    with scope() as scoped:
+        answers = annotate_df(answers, client, model, prompt_fn, lambda row: row["_args"], max_workers=max_workers)
+    for key, value in _usage(scoped.report(), model).items():
+        usage[role][key] += value
+        count(f"cascade.{role}.{key}", value)
+    return answers.drop(columns=["_args"])
+
+
+def _in_sample(title: str, share: float, seed: int) -> bool:
+    """
+    Draws a paper into the agreement sample by its title, so the sample
+    does not depend on chunks or on how often the annotation was resumed.
+    """
+    return int(paper_id(f"{seed} {title}"), 16) / 16**16 < share
+
+
+def _status(answers: DataFrame, i):
+    """
+    True if annotating row `i` failed, False if it is annotated and None if it was not reached.
+    """
+    if answers is None or "requires reannotation" not in answers.columns:
+        return None
+    status = answers.loc[i, "requires reannotation"]
+    return None if pd.isna(status) else bool(status)
+
+
+def cascade_annotate_df(
+        df: DataFrame,
+        client: OpenAIClient,
+        small_model: str,
+        large_model: str,
+        prompt_fn: Callable,
+        get_prompt_args: Callable,
+        escalate_on: dict=None,
+        min_confidence: float=70,
+        sample_share: float=0.1,
+        ask_confidence: bool=True,
+        start: int=0,
+        end: int=None,
+        max_workers: int=1,
+        seed: int=0,
+        usage: dict=None
+    ) -> tuple[DataFrame, dict]:
+    """
+    `annotate_df` in two steps: a small, fast model answers for all rows and only some rows
+    are sent on to the large model, whose answers are kept for them.
+
+        small_model:      answers for every row, asked to rate its confidence with `ask_confidence`
+        large_model:      answers for the escalated rows
+        escalate_on:      answers that make a row positive, e.g. {"disinformation focused": "Yes"}.
+                          Positive rows are always escalated, so the large model decides what is selected
+        min_confidence:   rows the small model rates below this (0 to 100) or does not rate are escalated
+        sample_share:     share of the remaining rows also sent to the large model
+                          to measure agreement, see `cascade_report`
+        seed:             seed for drawing the sample
+        usage:            dict returned by an earlier call, e.g. for the previous chunk, to add this call to
+
+    The other arguments are those of `annotate_df`. Adds the columns
+        "cascade model":          model whose answers are kept
+        "cascade reason":         why the row was escalated: "positive", "uncertain", "failed", "sample" or ""
+        "cascade confidence":     confidence of the small model
+        "cascade small answers":  answers of the small model (JSON) for escalated rows
+
+    Rows whose escalation failed or was stopped by a rate limit keep the small answers
+    but still require reannotation.
+
+    Returns the DataFrame and the usage of this call (and of the calls it was passed from):
+    the rows the small model answered and the requests, model time and tokens per model,
+    which `cascade_report` summarizes.
+    """
+    if usage is None:
+        usage = {}
+    if not usage:
+        usage.update(_new_usage(small_model, large_model))
+    end = min(end, len(df)) if end is not None else len(df)
+    part = df[start:end]
+    if "requires reannotation" in part.columns:
+        part = part[part["requires reannotation"] != False]
+    if len(part) == 0:
+        return df, usage
+
+    small_prompt_fn = with_confidence_question(prompt_fn) if ask_confidence else prompt_fn
+    small = _annotate_pass(part, client, small_model, "small", small_prompt_fn, get_prompt_args, max_workers, usage)
+    small_columns = [col for col in small.columns if col not in ("title", "abstract", "requires reannotation")]
+
+    reasons = {}
+    for i, row in small.iterrows():
+        status = _status(small, i)
+        if status is None:
+            # stopped by a rate limit, the next run starts over with the small model
+            continue
+        confidence = parse_confidence(row.get("confidence"))
+        if status:
+            reasons[i] = "failed"
+        elif escalate_on and all(row.get(col) == value for col, value in escalate_on.items()):
+            reasons[i] = "positive"
+        elif ask_confidence and (confidence is None or confidence < min_confidence):
+            reasons[i] = "uncertain"
+        elif _in_sample(part.loc[i].get("title", i), sample_share, seed):
+            reasons[i] = "sample"
+        else:
+            reasons[i] = ""
+    count("cascade.rows", len(reasons))
+    usage["rows"] += list(reasons)
+
+    escalated = [i for i, reason in reasons.items() if reason]
+    large = None
+    if escalated:
+        large = _annotate_pass(
+            part.loc[escalated], client, large_model, "large", prompt_fn, get_prompt_args, max_workers, usage
+            )
+    large_columns = [col for col in large.columns if col not in ("title", "abstract", "requires reannotation")] \
+        if large is not None else []
+    answer_columns = list(dict.fromkeys(col for col in [*small_columns, *large_columns] if col != "confidence"))
+
+    for i, reason in reasons.items():
+        count(f"cascade.escalated.{reason or 'none'}")
+        kept, model, status = small, small_model, _status(small, i)
+        if reason:
+            large_status = _status(large, i)
+            if large_status is False:
+                kept, model, status = large, large_model, False
+            elif reason != "sample":
+                status = large_status
+
+        for col in answer_columns:
+            df.loc[i, col] = kept.loc[i, col] if col in kept.columns else None
+        df.loc[i, "cascade model"] = model
+        df.loc[i, "cascade reason"] = reason
+        df.loc[i, "cascade confidence"] = parse_confidence(small.loc[i].get("confidence"))
+        small_answers = {col: small.loc[i, col] for col in small_columns if col != "confidence"}
+        df.loc[i, "cascade small answers"] = json.dumps(
+            {col: value for col, value in small_answers.items() if isinstance(value, str)}
+        ) if reason and reason != "failed" else None
+        df.loc[i, "requires reannotation"] = status
+    return df, usage
+
+
+def _agreement(rows: DataFrame, compare_columns: list[str]) -> dict:
+    agree = {col: [] for col in compare_columns}
+    all_agree = []
+    for _, row in rows.iterrows():
+        small_answers = json.loads(row["cascade small answers"])
+        matches = {
+            col: small_answers[col] == row[col] for col in compare_columns
+            if col in small_answers and isinstance(row.get(col), str)
+        }
+        for col, match in matches.items():
+            agree[col].append(match)
+        if matches:
+            all_agree.append(all(matches.values()))
+    return {
+        "rows": len(all_agree),
+        "all": sum(all_agree) / len(all_agree) if all_agree else None,
+        "columns": {col: sum(values) / len(values) if values else None for col, values in agree.items()},
+    }
+
+
+def cascade_report(
+        df: DataFrame,
+        usage: dict,
+        compare_columns: list[str]=None,
+        prices: dict=None
+    ) -> dict:
+    """
+    Summarizes the cascaded annotation of the rows in `usage` (returned by `cascade_annotate_df`):
+        - how many rows each model answered and why rows were escalated
+        - agreement of the small with the large model per answer (by default all "Yes|No" answers),
+          on the random sample and on the escalated rows. The sample estimates how often
+          the small model is right on the rows it answers alone
+        - model time, tokens and cost (`prices` in any currency per million tokens by model name)
+          of these calls compared to an estimate for annotating the rows with the large model only
+    """
+    screened = [i for i in dict.fromkeys(usage["rows"]) if i in df.index]
+    rows = df.loc[screened]
+    if "cascade model" in rows.columns:
+        rows = rows[rows["cascade model"].notna()]
+    else:
+        rows = rows.iloc[0:0]
+    large_model = usage["large"]["model"]
+    reasons = rows["cascade reason"].fillna("").replace("", "none").value_counts().to_dict() if len(rows) else {}
+
+    compared = rows[(rows["cascade model"] == large_model) & rows["cascade small answers"].notna()] \
+        if len(rows) else rows
+    if compare_columns is None:
+        compare_columns = sorted({
+            col for answers in compared["cascade small answers"] for col, value in json.loads(answers).items()
+            if value in ("Yes", "No")
+        }) if len(compared) else []
+
+    report_usage = {role: dict(usage[role]) for role in ROLES}
+    for role in ROLES:
+        model = report_usage[role]["model"]
+        report_usage[role]["cost"] = report_usage[role]["tokens"] / 1e6 * prices[model] \
+            if prices and model in prices else None
+
+    large_requests = report_usage["large"]["requests"]
+    saved = None
+    if screened and large_requests:
+        # every row answered once by the large model at its mean cost per request
+        baseline = {key: report_usage["large"][key] / large_requests * len(screened)
+                    for key in ["seconds", "tokens", "cost"] if report_usage["large"][key] is not None}
+        saved = {
+            key: baseline[key] - report_usage["small"][key] - report_usage["large"][key] for key in baseline
+            if report_usage["small"][key] is not None
+        }
+        saved["share_of_seconds"] = saved["seconds"] / baseline["seconds"] if baseline["seconds"] else None
+        saved["share_of_tokens"] = saved["tokens"] / baseline["tokens"] if baseline["tokens"] else None
+        report_usage["large_only_estimate"] = baseline
+
+    return {
+        "rows": len(rows),
+        "answered_by": rows["cascade model"].value_counts().to_dict() if len(rows) else {},
+        "escalated": reasons,
+        "agreement": {
+            "sample": _agreement(compared[compared["cascade reason"] == "sample"], compare_columns),
+            "escalated": _agreement(compared[compared["cascade reason"] != "sample"], compare_columns),
+        },
+        "usage": report_usage,
+        "saved": saved,
+    }
+
+
+def print_cascade_report(report: dict):
+    """
+    Prints a report from `cascade_report`.
+    """
+    print(f"Cascade: {report['rows']} papers")
+    for model, n in report["answered_by"].items():
+        print(f"  answered by {model}: {n}")
+    print("  escalated: " + ", ".join(f"{reason} {n}" for reason, n in report["escalated"].items()))
+    for group, agreement in report["agreement"].items():
+        if not agreement["rows"]:
+            continue
+        print(f"  agreement with the large model on {agreement['rows']} {group} papers: {agreement['all']:.0%} all answers")
+        for col, share in agreement["columns"].items():
+            if share is not None:
+                print(f"    {col:<36}{share:>6.0%}")
+    for role in ROLES:
+        u = report["usage"][role]
+        cost = f", cost {u['cost']:.2f}" if u["cost"] is not None else ""
+        print(f"  {role} model {u['model']}: {u['requests']:.0f} requests, {u['seconds']:.1f}s, {u['tokens']:.0f} tokens{cost}")
+    if report["saved"]:
+        saved = report["saved"]
+        share = lambda value: f" ({value:.0%})" if value is not None else ""
+        cost = f", cost {saved['cost']:.2f}" if "cost" in saved else ""
+        print(
+            f"  saved compared to the large model only: {saved['seconds']:.1f}s{share(saved['share_of_seconds'])}, "
+            f"{saved['tokens']:.0f} tokens{share(saved['share_of_tokens'])}{cost}"
+        )
@@ -1,8 +1,11 @@
+import contextvars
 from tqdm import tqdm
 from pandas import DataFrame, Series
 from typing import Callable, Optional
-from openai import RateLimitError
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from academiccloud_api import OpenAIClient, extract_json
+from profiling import timer, count
+from storage.fts import get_active_index, update_index
 
 def annotate_df(
     df: DataFrame,
@@ -11,7 +14,8 @@ def annotate_df(
     prompt_fn: Callable,
     get_prompt_args: Callable,
     start: int = 0,
-    end: int = None
+    end: int = None,
+    max_workers: int = 1
 ) -> DataFrame:
     """
     Generic paper annotation using a user-defined prompt strategy.
@@ -23,40 +27,82 @@ def annotate_df(
         get_prompt_args:  returns the required arguments for `prompt_fn` from the rows of the df
         start:            optional index for continued annotation after encountering an error
         end:              optional index for continued annotation after encountering an error
+        max_workers:      number of rows prompted at the same time, the df is only written from this thread
 
     Returns the DataFrame with the new annotations added for each row.
     """
-    end = min(end, len(df)) if end is not None else len(df)
+    from openai import RateLimitError
 
-    for i, row in tqdm(df[start:end].iterrows(), desc="Annotating papers...", total=end-start):
-        if row.get('requires reannotation') is False:
-            continue
-
-        try:
-            args = get_prompt_args(row)
-            messages = prompt_fn(*args)
-            response = client.prompt_model(messages, model)
-            response_list = extract_json(response)
-
-            for entry in response_list:
-                for key, value in entry.items():
-                    if isinstance(value, str):
-                        df.loc[i, key] = value
-                    elif isinstance(value, list):
-                        df.loc[i, key] = ",\n".join(value)
-
-        except RateLimitError as e:
-            print(f"{e}.\nStopping early at index {i}. Resume later when rate limit resets.")
-            break
-
-        except Exception as e:
-            print(f"Error processing row {i}: {e}")
-            df.loc[i, "requires reannotation"] = True
-            continue
-
-        df.loc[i, "requires reannotation"] = False
+    end = min(end, len(df)) if end is not None else len(df)
+    index = get_active_index()
+
+    def query(row: Series) -> list[dict]:
+        args = get_prompt_args(row)
+        messages = prompt_fn(*args)
+        response = client.prompt_model(messages, model)
+        with timer("annotate.extract_json"):
+            return extract_json(response)
+
+    rows = df[start:end].iterrows()
+    running = {}
+    stopped = False
+    with ThreadPoolExecutor(max_workers=max_workers) as executor, \
+            tqdm(desc="Annotating papers...", total=end-start) as progress:
+        while True:
+            while not stopped and len(running) < max_workers:
+                i, row = next(rows, (None, None))
+                if row is None:
+                    break
+                if row.get('requires reannotation') is False:
+                    progress.update()
+                    continue
+                # in a copy of the context, so `profiling.scope` blocks around annotate_df see the requests
+                running[executor.submit(contextvars.copy_context().run, query, row)] = i
+
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                i = running.pop(future)
+                progress.update()
+                try:
+                    response_list = future.result()
+                    with timer("annotate.write"):
+                        _write_annotations(df, i, response_list)
+
+                except RateLimitError as e:
+                    if not stopped:
+                        print(f"{e}.\nStopping early at index {i}. Resume later when rate limit resets.")
+                    stopped = True
+                    count("annotate.rate_limited")
+                    continue
+
+                except Exception as e:
+                    print(f"Error processing row {i}: {e}")
+                    df.loc[i, "requires reannotation"] = True
+                    count("annotate.failed")
+                    continue
+
+                df.loc[i, "requires reannotation"] = False
+                count("annotate.annotated")
+                if index is not None:
+                    columns = list(dict.fromkeys(key for entry in response_list for key in entry if key in df.columns))
+                    update_index("add_annotations", df.loc[i].to_dict(), df.loc[i, columns].to_dict())
     return df
 
+
+def _write_annotations(df: DataFrame, i, response_list: list[dict]):
+    for entry in response_list:
+        for key, value in entry.items():
+            if isinstance(value, str):
+                df.loc[i, key] = value
+            elif isinstance(value, list):
+                df.loc[i, key] = ",\n".join(value)
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                # e.g. a confidence given as a number instead of a string
+                df.loc[i, key] = str(value)
+
 ############# String definitions for prompting #############
 # Edit these to fit your search and annotation 
 
@@ -153,6 +199,13 @@ ANSWER FORMAT
     ]
 
 
+def screening_prompt_args(row: Series) -> list:
+    """
+    Returns the arguments for `get_screening_prompt` from a row of the candidates.
+    """
+    return [row["title"], row["abstract"]]
+
+
 ############# Prompt for full text information extraction #############
 
 
@@ -277,4 +330,17 @@ ANSWER FORMAT
         {"role": "system", "content": SYSTEM_PROMPT},
         {"role": "user", "content": user_prompt}
     ]
-    
\ No newline at end of file
+
+
+def review_prompt_args(row: Series) -> list:
+    """
+    Returns the arguments for `get_review_prompt` from a row of the selection.
+    The paper is cut off at its references to save tokens.
+    """
+    full_paper = row["paper markdown"]
+    references = full_paper.find("**References**")
+    if references != -1:
+        full_paper = full_paper[:references]
+    topics = row.get("disinformation topics")
+    disinfo_topics = [t.strip() for t in topics.split(",")] if isinstance(topics, str) else ["Disinformation"]
+    return [full_paper, disinfo_topics]
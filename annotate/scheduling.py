@@ -0,0 +1,220 @@
+import os
+import re
+import json
+import math
+from datetime import date
+from typing import Callable
+import pandas as pd
+from pandas import DataFrame, Series
+from profiling import scope, count
+from storage.ids import paper_id
+
+# Gold papers come first: a gold match outweighs every other paper
+PRIORITY_WEIGHTS = {"gold": 4.0, "relevance": 2.0, "citations": 1.0}
+
+
+def _words(text: str) -> set[str]:
+    return set(re.findall(r"\w+", text.lower()))
+
+
+def gold_similarity(title: str, gold_titles: list[str]) -> float:
+    """
+    1 if the title contains or is contained in a gold title (like `nr_gold_papers_found`),
+    else the highest word overlap (Jaccard) with a gold title.
+    """
+    if not isinstance(title, str) or not title.strip() or not gold_titles:
+        return 0.0
+    title = title.lower().strip()
+    words = _words(title)
+    best = 0.0
+    for gold_title in gold_titles:
+        gold_title = gold_title.lower()
+        if gold_title in title or title in gold_title:
+            return 1.0
+        gold_words = _words(gold_title)
+        if words and gold_words:
+            best = max(best, len(words & gold_words) / len(words | gold_words))
+    return best
+
+
+def priority_scores(
+        df: DataFrame,
+        relevance_terms: list[list[str]]=None,
+        gold_titles: list[str]=None,
+        weights: dict=PRIORITY_WEIGHTS
+    ) -> Series:
+    """
+    Cheap estimate of how valuable annotating each paper is, higher first:
+        relevance:  share of `relevance_terms` groups matched in title and abstract
+        gold:       similarity of the title to the gold titles, see `gold_similarity`
+        citations:  log of the "citations" column (see `enrich_df`) relative to the most cited paper
+    """
+    titles = df["title"].fillna("").astype(str) if "title" in df.columns else Series("", index=df.index)
+    abstracts = df["abstract"].fillna("").astype(str) if "abstract" in df.columns else Series("", index=df.index)
+    texts = (titles + " " + abstracts).str.lower()
+
+    relevance = Series(0.0, index=df.index)
+    if relevance_terms:
+        for group in relevance_terms:
+            relevance += texts.map(lambda text: any(term in text for term in group))
+        relevance /= len(relevance_terms)
+
+    gold = titles.map(lambda title: gold_similarity(title, gold_titles)) if gold_titles else Series(0.0, index=df.index)
+
+    citations = Series(0.0, index=df.index)
+    if "citations" in df.columns:
+        logs = pd.to_numeric(df["citations"], errors="coerce").fillna(0).clip(lower=0).map(math.log1p)
+        if logs.max() > 0:
+            citations = logs / logs.max()
+
+    return weights["relevance"] * relevance + weights["gold"] * gold + weights["citations"] * citations
+
+
+def _tokens_used(run_report: dict) -> float:
+    """
+    Prompt and completion tokens of all models in a report, e.g. of a `profiling.scope`.
+    """
+    return sum(
+        value for name, value in run_report["counters"].items()
+        if name.startswith("llm.") and name.endswith(("prompt_tokens", "completion_tokens"))
+    )
+
+
+class AnnotationQueue:
+    def __init__(self, path: str):
+        """
+        State of prioritized annotation kept in a JSON file between sessions:
+        tokens used per day, the mean tokens per paper and failed attempts per paper (by `paper_id`).
+        """
+        self.path = path
+        self.tokens_per_day = {}
+        self.tokens_per_paper = None
+        self.attempts = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+            self.tokens_per_day = state.get("tokens_per_day", {})
+            self.tokens_per_paper = state.get("tokens_per_paper")
+            self.attempts = state.get("attempts", {})
+
+    def used_today(self) -> float:
+        return self.tokens_per_day.get(date.today().isoformat(), 0)
+
+    def add_usage(self, tokens: float, papers: int):
+        today = date.today().isoformat()
+        self.tokens_per_day[today] = self.tokens_per_day.get(today, 0) + tokens
+        if papers:
+            mean = tokens / papers
+            # running mean that follows changes of prompts and models
+            self.tokens_per_paper = mean if self.tokens_per_paper is None else 0.8 * self.tokens_per_paper + 0.2 * mean
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        state = {
+            "tokens_per_day": self.tokens_per_day,
+            "tokens_per_paper": self.tokens_per_paper,
+            "attempts": self.attempts,
+        }
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(self.path + ".tmp", self.path)
+
+
+def annotate_by_priority(
+        df: DataFrame,
+        annotate_fn: Callable,
+        state_path: str=None,
+        priority: Series=None,
+        daily_token_budget: int=None,
+        chunk_size: int=20,
+        max_attempts: int=3,
+        on_chunk: Callable=None
+    ) -> tuple[DataFrame, bool]:
+    """
+    Annotates the rows of `df` that still require annotation in order of `priority`
+    (e.g. from `priority_scores`, else in DataFrame order), one chunk at a time.
+
+        annotate_fn:          annotates a chunk and returns it, e.g.
+                              lambda chunk: annotate_df(chunk, client, model, prompt_fn, get_prompt_args)
+        state_path:           JSON file with the `AnnotationQueue` state, so budgets and attempts carry over
+        daily_token_budget:   stops before the tokens used today by `annotate_fn` (all models it prompts)
+                              would exceed this. Chunks are shrunk to what the budget still allows
+        max_attempts:         papers that failed this often are given up on, they keep
+                              "requires reannotation" but no longer hold up completion
+        on_chunk:             called with `df` and the annotated chunk, e.g. to save progress
+
+    Stops at the first chunk cut short by a rate limit.
+    Returns the DataFrame and whether all rows are annotated or given up on.
+    """
+    queue = AnnotationQueue(state_path)
+    if priority is None:
+        priority = Series(0.0, index=df.index)
+    keys = df["title"].map(paper_id)
+
+    def pending() -> list:
+        todo = df.index if "requires reannotation" not in df.columns else df.index[df["requires reannotation"] != False]
+        todo = [i for i in todo if queue.attempts.get(keys[i], 0) < max_attempts]
+        # stable, so equal scores keep the DataFrame order
+        return sorted(todo, key=lambda i: -priority.get(i, 0))
+
+    todo = pending()
+    print(f"{len(todo)} papers to annotate, best first")
+    while todo:
+        size = chunk_size
+        if daily_token_budget:
+            remaining = daily_token_budget - queue.used_today()
+            if queue.tokens_per_paper:
+                size = min(size, int(remaining // queue.tokens_per_paper))
+            else:
+                # a few papers first to learn how many tokens one takes
+                size = min(size, 4)
+            if remaining <= 0 or size < 1:
+                print(f"Daily token budget of {daily_token_budget} used up. Resume tomorrow.")
+                count("annotate.budget_stops")
+                break
+
+        rows = todo[:size]
+        # only the requests of this chunk, not other LLM use in the same process
+        with scope() as scoped:
+            chunk = annotate_fn(df.loc[rows].copy())
+        used = _tokens_used(scoped.report())
+
+        for col in chunk.columns:
+            values = chunk.loc[rows, col]
+            if col not in df.columns:
+                df[col] = None
+            elif values.equals(df.loc[rows, col]):
+                # e.g. "year" or "citations", which keep their dtype
+                continue
+            elif df[col].dtype != values.dtype and df[col].dtype != object:
+                df[col] = df[col].astype(object)
+            df.loc[rows, col] = values
+        status = chunk["requires reannotation"] if "requires reannotation" in chunk.columns else Series(None, index=rows)
+        for i in rows:
+            if status[i] == True:
+                queue.attempts[keys[i]] = queue.attempts.get(keys[i], 0) + 1
+        queue.add_usage(used, int(status.notna().sum()))
+        queue.save()
+        if on_chunk:
+            on_chunk(df, chunk)
+
+        if status.isna().any():
+            # stopped by a rate limit
+            break
+        todo = pending()
+
+    if "requires reannotation" not in df.columns:
+        return df, False
+    annotated = df["requires reannotation"] == False
+    attempts = keys.map(lambda key: queue.attempts.get(key, 0))
+    given_up = (df["requires reannotation"] == True) & (attempts >= max_attempts)
+    if given_up.any():
+        print(
+            f"Gave up on {int(given_up.sum())} papers that failed {max_attempts} times, "
+            f"they are still marked as requiring reannotation (raise max_attempts to retry them)"
+        )
+        count("annotate.given_up", int(given_up.sum()))
+    done = bool((annotated | given_up).all())
+    return df, done
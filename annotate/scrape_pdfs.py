@@ -1,16 +1,32 @@
 import os
-import requests
-import fitz
-from pymupdf4llm import to_markdown
-from pandas import Series
+from typing import TYPE_CHECKING
+from academiccloud_api import get_http_pool
+from profiling import timer, timed, count
+from storage.fts import update_index
 
-def scrape_paper(row: Series, timeout: int=15, do_not_overwrite: bool=True):
+if TYPE_CHECKING:
+    # only for annotations, importing pandas is left to the callers
+    from pandas import Series
+
+
+@timed("scrape.paper")
+def scrape_paper(row: "Series", timeout: int=15, do_not_overwrite: bool=True):
     md = row.get("paper markdown", None)
     if do_not_overwrite and isinstance(md, str) and md.strip() != "":
         return md
     
-    url = row["url"]
+    md = _url_to_markdown(row["url"], timeout)
+    if md:
+        update_index("add_markdown", row.to_dict(), md)
+    return md
+
+
+def _url_to_markdown(url: str, timeout: int):
     if isinstance(url, str) and url.strip() != "":
+        # PDF libraries take about a second to import
+        import fitz
+        from pymupdf4llm import to_markdown
+
         try:
             if url.startswith("file://"):
                 file_path = url.replace("file://", "")
@@ -22,18 +38,21 @@ def scrape_paper(row: Series, timeout: int=15, do_not_overwrite: bool=True):
             if file_path:
                 if not os.path.exists(file_path):
                     raise FileNotFoundError(f"File not found: {file_path}")
-                with fitz.open(file_path) as doc:
+                with timer("scrape.pdf_to_markdown"), fitz.open(file_path) as doc:
                     return to_markdown(doc)
             
             else: 
-                response = requests.get(url, timeout=timeout)
+                with timer("scrape.download"):
+                    response = get_http_pool().get(url, timeout=timeout)
                 response.raise_for_status()
+                count("scrape.downloaded_bytes", len(response.content))
                 content_type = response.headers.get('content-type', '')
                 if 'pdf' not in content_type.lower():
                     raise Exception(f"No PDF content found for URL: {url}")
-                with fitz.open(stream=response.content, filetype="pdf") as doc:
+                with timer("scrape.pdf_to_markdown"), fitz.open(stream=response.content, filetype="pdf") as doc:
                     return to_markdown(doc)
         
         except Exception as e:
             print(f"Failed to retrieve: {url}\nError: {e}")
-            return ""
\ No newline at end of file
+            count("scrape.failed")
+            return ""
@@ -0,0 +1,688 @@
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import sqlite3
+import argparse
+import importlib
+import threading
+import subprocess
+from contextlib import contextmanager
+from typing import Callable
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from profiling import timer, count
+from storage.ids import paper_id
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    prompt_fn TEXT NOT NULL,
+    max_attempts INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    job TEXT NOT NULL,
+    paper_id TEXT NOT NULL,
+    args TEXT NOT NULL,
+    priority REAL NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    expired INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    seconds REAL,
+    merged INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (job, paper_id)
+);
+CREATE INDEX IF NOT EXISTS tasks_claim ON tasks(status, priority DESC);
+CREATE TABLE IF NOT EXISTS workers (
+    worker TEXT PRIMARY KEY,
+    host TEXT,
+    pid INTEGER,
+    started REAL,
+    heartbeat REAL,
+    stopped REAL,
+    done INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def _function_path(fn: Callable) -> str:
+    path = f"{fn.__module__}:{fn.__qualname__}"
+    if "<" in path:
+        raise ValueError(f"Workers import the prompt function by name, {path} cannot be imported")
+    return path
+
+
+def _import_function(path: str) -> Callable:
+    module, name = path.split(":")
+    value = importlib.import_module(module)
+    for attr in name.split("."):
+        value = getattr(value, attr)
+    return value
+
+
+class WorkQueue:
+    def __init__(self, path: str, wal: bool=False):
+        """
+        Annotation tasks in a SQLite file shared by worker processes, one task per paper (`paper_id`) and job.
+        Workers lease a few tasks at a time and extend their leases with heartbeats, so the tasks of
+        a worker that crashed or lost its connection are handed to another worker once its lease expires.
+
+        By default the rollback journal is used, which works for workers on several machines sharing
+        the file over a network filesystem with working file locks. Only use `wal=True` if all workers
+        run on the same machine. Leases compare wall clock times, so the clocks of the machines must agree.
+        """
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        # transactions are started explicitly, see `_transaction`
+        self.db = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.db.execute(f"PRAGMA journal_mode={'WAL' if wal else 'DELETE'}")
+        with self._transaction() as db:
+            for statement in SCHEMA.split(";"):
+                if statement.strip():
+                    db.execute(statement)
+            # queues created before answers were marked as merged
+            if "merged" not in [column[1] for column in db.execute("PRAGMA table_info(tasks)")]:
+                db.execute("ALTER TABLE tasks ADD COLUMN merged INTEGER NOT NULL DEFAULT 0")
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers never lease the same task
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.db
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+
+    def submit(
+            self,
+            df,
+            job: str,
+            model: str,
+            prompt_fn: Callable,
+            get_prompt_args: Callable,
+            priority=None,
+            max_attempts: int=3
+        ) -> int:
+        """
+        Adds a task for every row of `df` that still requires annotation and is not queued yet.
+        The prompt arguments are stored with the task, `prompt_fn` is imported by the workers by name.
+        Tasks with a higher `priority` (Series aligned with `df`) are leased first.
+
+        Answered or failed tasks of rows not annotated yet (no "requires reannotation") are kept, so their
+        answers can be merged after an interrupted run. Rows with "requires reannotation" True, e.g. papers
+        that failed or were marked to be annotated again, are queued again with fresh prompt arguments,
+        unless their answer was not merged yet (see `merge_results`), e.g. after the coordinator crashed.
+        Returns the number of tasks added or queued again.
+        """
+        todo = df if "requires reannotation" not in df.columns else df[df["requires reannotation"] != False]
+        again = set(todo.index[todo["requires reannotation"] == True]) if "requires reannotation" in df.columns else set()
+        new_rows, again_rows = [], []
+        for i, row in todo.iterrows():
+            if not isinstance(row.get("title"), str) or not row["title"].strip():
+                continue
+            task = (
+                job, paper_id(row["title"]), json.dumps(list(get_prompt_args(row))),
+                float(priority.get(i, 0)) if priority is not None else 0.0,
+            )
+            (again_rows if i in again else new_rows).append(task)
+
+        with self._transaction() as db:
+            db.execute(
+                """
+                INSERT INTO jobs (job, model, prompt_fn, max_attempts) VALUES (?, ?, ?, ?)
+                ON CONFLICT(job) DO UPDATE SET
+                    model=excluded.model, prompt_fn=excluded.prompt_fn, max_attempts=excluded.max_attempts
+                """,
+                (job, model, _function_path(prompt_fn), max_attempts),
+            )
+            before = db.execute("SELECT COUNT(*) FROM tasks WHERE job=?", (job,)).fetchone()[0]
+            db.executemany(
+                """
+                INSERT INTO tasks (job, paper_id, args, priority) VALUES (?, ?, ?, ?)
+                ON CONFLICT(job, paper_id) DO UPDATE SET args=excluded.args, priority=excluded.priority
+                WHERE status='pending'
+                """,
+                new_rows,
+            )
+            finished = db.execute(
+                "SELECT COUNT(*) FROM tasks WHERE job=? AND status IN ('done', 'failed')", (job,)
+            ).fetchone()[0]
+            # tasks leased right now are left to their worker, answers not merged yet are kept
+            db.executemany(
+                """
+                INSERT INTO tasks (job, paper_id, args, priority) VALUES (?, ?, ?, ?)
+                ON CONFLICT(job, paper_id) DO UPDATE SET
+                    args=excluded.args, priority=excluded.priority, status='pending', attempts=0,
+                    result=NULL, error=NULL, worker=NULL, lease_expires=NULL, merged=0
+                WHERE status IN ('pending', 'failed') OR (status='done' AND merged=1)
+                """,
+                again_rows,
+            )
+            after = db.execute("SELECT COUNT(*) FROM tasks WHERE job=?", (job,)).fetchone()[0]
+            reset = finished - db.execute(
+                "SELECT COUNT(*) FROM tasks WHERE job=? AND status IN ('done', 'failed')", (job,)
+            ).fetchone()[0]
+        return after - before + reset
+
+    def jobs(self) -> dict:
+        with self._lock:
+            rows = self.db.execute("SELECT job, model, prompt_fn, max_attempts FROM jobs").fetchall()
+        return {job: {"model": model, "prompt_fn": fn, "max_attempts": n} for job, model, fn, n in rows}
+
+    def register(self, worker: str):
+        now = time.time()
+        with self._transaction() as db:
+            db.execute(
+                """
+                INSERT INTO workers (worker, host, pid, started, heartbeat) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(worker) DO UPDATE SET
+                    host=excluded.host, pid=excluded.pid, started=excluded.started,
+                    heartbeat=excluded.heartbeat, stopped=NULL
+                """,
+                (worker, socket.gethostname(), os.getpid(), now, now),
+            )
+
+    def claim(self, worker: str, n: int=1, lease_seconds: float=120, job: str=None) -> list[dict]:
+        """
+        Leases up to `n` tasks (of `job`, else of any job) with the highest priority for `lease_seconds`.
+        Tasks whose lease expired are leased again, unless they were already tried `max_attempts` times.
+        """
+        now = time.time()
+        job_filter = "job=? AND" if job else ""
+        with self._transaction() as db:
+            db.execute(
+                """
+                UPDATE tasks SET status='failed', worker=NULL, lease_expires=NULL, error='lease expired'
+                WHERE status='leased' AND lease_expires < ?
+                    AND attempts >= (SELECT max_attempts FROM jobs WHERE jobs.job=tasks.job)
+                """,
+                (now,),
+            )
+            rows = db.execute(
+                f"""
+                SELECT rowid, job, paper_id, args, status FROM tasks
+                WHERE {job_filter} (status='pending' OR (status='leased' AND lease_expires < ?))
+                ORDER BY priority DESC, rowid LIMIT ?
+                """,
+                ([job] if job else []) + [now, n],
+            ).fetchall()
+            db.executemany(
+                """
+                UPDATE tasks SET status='leased', worker=?, lease_expires=?,
+                    attempts=attempts + 1, expired=expired + ?
+                WHERE rowid=?
+                """,
+                [(worker, now + lease_seconds, status == "leased", rowid) for rowid, _, _, _, status in rows],
+            )
+        expired = sum(status == "leased" for *_, status in rows)
+        if expired:
+            count("workqueue.expired_leases", expired)
+        return [{"job": j, "paper_id": key, "args": json.loads(args)} for _, j, key, args, _ in rows]
+
+    def heartbeat(self, worker: str, lease_seconds: float=120):
+        """
+        Extends the leases of all tasks the worker holds.
+        """
+        now = time.time()
+        with self._transaction() as db:
+            db.execute("UPDATE workers SET heartbeat=? WHERE worker=?", (now, worker))
+            db.execute(
+                "UPDATE tasks SET lease_expires=? WHERE worker=? AND status='leased'", (now + lease_seconds, worker)
+            )
+
+    def complete(self, worker: str, task: dict, result: list[dict], seconds: float=None) -> bool:
+        """
+        Stores the answer of a task. Returns False if another worker already answered it,
+        e.g. after this worker's lease had expired.
+        """
+        with self._transaction() as db:
+            changed = db.execute(
+                """
+                UPDATE tasks SET status='done', result=?, error=NULL, worker=?, lease_expires=NULL, seconds=?, merged=0
+                WHERE job=? AND paper_id=? AND status!='done'
+                """,
+                (json.dumps(result), worker, seconds, task["job"], task["paper_id"]),
+            ).rowcount
+            db.execute("UPDATE workers SET done=done + ? WHERE worker=?", (changed, worker))
+        if not changed:
+            count("workqueue.duplicates")
+        return bool(changed)
+
+    def fail(self, worker: str, task: dict, error: str):
+        """
+        Returns a task to the queue, or marks it as failed after `max_attempts`.
+        """
+        with self._transaction() as db:
+            db.execute(
+                """
+                UPDATE tasks SET worker=NULL, lease_expires=NULL, error=?, merged=0,
+                    status=CASE WHEN attempts >= (SELECT max_attempts FROM jobs WHERE jobs.job=tasks.job)
+                        THEN 'failed' ELSE 'pending' END
+                WHERE job=? AND paper_id=? AND worker=? AND status='leased'
+                """,
+                (error, task["job"], task["paper_id"], worker),
+            )
+            db.execute("UPDATE workers SET failed=failed + 1 WHERE worker=?", (worker,))
+
+    def release(self, worker: str, tasks: list[dict]=None):
+        """
+        Returns leased tasks (by default all of the worker's) to the queue without counting the attempt,
+        e.g. after a rate limit or when the worker stops.
+        """
+        with self._transaction() as db:
+            if tasks is None:
+                db.execute(
+                    """
+                    UPDATE tasks SET status='pending', worker=NULL, lease_expires=NULL, attempts=attempts - 1
+                    WHERE worker=? AND status='leased'
+                    """,
+                    (worker,),
+                )
+                db.execute("UPDATE workers SET stopped=? WHERE worker=?", (time.time(), worker))
+            else:
+                db.executemany(
+                    """
+                    UPDATE tasks SET status='pending', worker=NULL, lease_expires=NULL, attempts=attempts - 1
+                    WHERE job=? AND paper_id=? AND worker=? AND status='leased'
+                    """,
+                    [(task["job"], task["paper_id"], worker) for task in tasks],
+                )
+
+    def retry_failed(self, job: str=None) -> int:
+        with self._transaction() as db:
+            return db.execute(
+                f"""
+                UPDATE tasks SET status='pending', attempts=0, error=NULL
+                WHERE status='failed' {'AND job=?' if job else ''}
+                """,
+                [job] if job else [],
+            ).rowcount
+
+    def progress(self, job: str=None) -> dict:
+        """
+        Number of tasks per status, and how many leases expired before the task was answered.
+        """
+        job_filter = "WHERE job=?" if job else ""
+        with self._lock:
+            rows = self.db.execute(
+                f"SELECT status, COUNT(*), SUM(expired) FROM tasks {job_filter} GROUP BY status", [job] if job else []
+            ).fetchall()
+        progress = {"pending": 0, "leased": 0, "done": 0, "failed": 0, "expired_leases": 0}
+        for status, n, expired in rows:
+            progress[status] = n
+            progress["expired_leases"] += expired or 0
+        return progress
+
+    def remaining(self, job: str=None) -> int:
+        progress = self.progress(job)
+        return progress["pending"] + progress["leased"]
+
+    def workers(self) -> list[dict]:
+        with self._lock:
+            cursor = self.db.execute("SELECT * FROM workers ORDER BY started")
+            columns = [c[0] for c in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def live_workers(self, within: float=120) -> list[dict]:
+        """
+        Workers that sent a heartbeat in the last `within` seconds and did not stop.
+        """
+        now = time.time()
+        return [w for w in self.workers() if w["stopped"] is None and now - (w["heartbeat"] or 0) < within]
+
+    def results(self, job: str, exclude: set=()) -> list[tuple]:
+        """
+        (paper_id, status, answers) of the answered and failed tasks of `job`, except the paper_ids in `exclude`.
+        """
+        with self._lock:
+            rows = self.db.execute(
+                "SELECT paper_id, status, result FROM tasks WHERE job=? AND status IN ('done', 'failed')", (job,)
+            ).fetchall()
+        return [
+            (key, status, json.loads(result) if result else None)
+            for key, status, result in rows if key not in exclude
+        ]
+
+    def mark_merged(self, job: str, keys: list[str]):
+        """
+        Records that the answers of these paper_ids were written into the DataFrame, see `submit`.
+        """
+        with self._transaction() as db:
+            db.executemany(
+                "UPDATE tasks SET merged=1 WHERE job=? AND paper_id=? AND status IN ('done', 'failed')",
+                [(job, key) for key in keys],
+            )
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+
+def rows_by_paper_id(df) -> dict:
+    """
+    Index labels of the rows of `df` per paper_id of their title, for `merge_results`.
+    """
+    rows = {}
+    for i, title in df["title"].items():
+        if isinstance(title, str) and title.strip():
+            rows.setdefault(paper_id(title), []).append(i)
+    return rows
+
+
+def merge_results(df, queue: WorkQueue, job: str, merged: set=None, rows_by_key: dict=None) -> list:
+    """
+    Writes the answers of finished tasks into `df` like `annotate_df`: "requires reannotation" is False
+    for answered rows and True for rows that failed `max_attempts` times.
+    Pass the same `merged` set on every call to only write new results, and `rows_by_key`
+    from `rows_by_paper_id(df)` when calling it repeatedly for the same `df`.
+    Returns the index labels of the rows written.
+    """
+    from storage.fts import get_active_index, update_index
+    from .prompting import _write_annotations
+
+    merged = set() if merged is None else merged
+    results = queue.results(job, exclude=merged)
+    if not results:
+        return []
+    if rows_by_key is None:
+        rows_by_key = rows_by_paper_id(df)
+
+    index = get_active_index()
+    written = []
+    with timer("annotate.write"):
+        for key, status, response_list in results:
+            merged.add(key)
+            for i in rows_by_key.get(key, []):
+                if status == "done":
+                    _write_annotations(df, i, response_list)
+                    df.loc[i, "requires reannotation"] = False
+                    if index is not None:
+                        columns = list(dict.fromkeys(k for entry in response_list for k in entry if k in df.columns))
+                        update_index("add_annotations", df.loc[i].to_dict(), df.loc[i, columns].to_dict())
+                else:
+                    df.loc[i, "requires reannotation"] = True
+                written.append(i)
+    queue.mark_merged(job, [key for key, _, _ in results if key in rows_by_key])
+    return written
+
+
+def run_worker(
+        queue_path: str,
+        api_key_path: str,
+        base_url: str=None,
+        job: str=None,
+        worker_id: str=None,
+        threads: int=4,
+        lease_seconds: float=120,
+        heartbeat_seconds: float=None,
+        poll_seconds: float=None,
+        exit_when_done: bool=True
+    ) -> dict:
+    """
+    Answers tasks of the queue at `queue_path` with its own `OpenAIClient` (and so its own API key),
+    `threads` at a time, until no task is left (or forever with `exit_when_done=False`).
+
+        base_url:           OpenAI compatible endpoint, by default the one of `OpenAIClient`
+        job:                only answer tasks of this job
+        lease_seconds:      time after which another worker may take over a task without a heartbeat
+        heartbeat_seconds:  how often leases are extended, by default a quarter of `lease_seconds`
+        poll_seconds:       wait between looking for tasks while other workers hold the remaining ones,
+                            by default a quarter of `lease_seconds` up to 10 seconds
+
+    After a rate limit the tasks are returned to the queue and the worker waits before leasing more.
+    Returns the number of answered, failed and rate limited tasks.
+    """
+    from openai import RateLimitError
+    from academiccloud_api import OpenAIClient, extract_json
+
+    client = OpenAIClient(api_key_path, **({"base_url": base_url} if base_url else {}))
+    queue = WorkQueue(queue_path)
+    worker = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    heartbeat_seconds = heartbeat_seconds or lease_seconds / 4
+    poll_seconds = poll_seconds or min(lease_seconds / 4, 10)
+    queue.register(worker)
+    jobs = {}
+
+    stop = threading.Event()
+
+    def send_heartbeats():
+        while not stop.wait(heartbeat_seconds):
+            try:
+                queue.heartbeat(worker, lease_seconds)
+            except sqlite3.OperationalError as e:
+                print(f"WARNING: Heartbeat of {worker} failed: {e}")
+
+    def answer(task: dict) -> tuple[list[dict], float]:
+        if task["job"] not in jobs:
+            jobs.update({
+                name: (spec["model"], _import_function(spec["prompt_fn"])) for name, spec in queue.jobs().items()
+            })
+        model, prompt_fn = jobs[task["job"]]
+        start = time.perf_counter()
+        messages = prompt_fn(*task["args"])
+        response = client.prompt_model(messages, model)
+        with timer("annotate.extract_json"):
+            return extract_json(response), time.perf_counter() - start
+
+    stats = {"done": 0, "failed": 0, "rate_limited": 0}
+    backoff = last_backoff = 0
+    heartbeats = threading.Thread(target=send_heartbeats, daemon=True)
+    heartbeats.start()
+    print(f"Worker {worker} answering tasks of {queue_path}")
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            running = {}
+            while True:
+                if len(running) < threads and not backoff:
+                    for task in queue.claim(worker, threads - len(running), lease_seconds, job):
+                        running[executor.submit(answer, task)] = task
+                if not running:
+                    if backoff:
+                        time.sleep(backoff)
+                        backoff = 0
+                        continue
+                    if exit_when_done and not queue.remaining(job):
+                        break
+                    # the remaining tasks are leased by other workers, take them over if their leases expire
+                    time.sleep(poll_seconds)
+                    continue
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    task = running.pop(future)
+                    try:
+                        response_list, seconds = future.result()
+                    except RateLimitError:
+                        queue.release(worker, [task])
+                        stats["rate_limited"] += 1
+                        count("workqueue.rate_limited")
+                        if not backoff:
+                            # longer after each rate limit in a row
+                            backoff = min(2 * last_backoff, 300) if last_backoff else 5
+                            last_backoff = backoff
+                            print(f"Rate limited, {worker} waits {backoff}s before leasing more tasks")
+                        continue
+                    except Exception as e:
+                        print(f"Error processing {task['job']} task {task['paper_id']}: {e}")
+                        queue.fail(worker, task, str(e))
+                        stats["failed"] += 1
+                        count("annotate.failed")
+                        continue
+                    last_backoff = 0
+                    if queue.complete(worker, task, response_list, seconds):
+                        stats["done"] += 1
+                        count("annotate.annotated")
+    finally:
+        stop.set()
+        queue.release(worker)
+        queue.close()
+    print(f"Worker {worker} stopped: {stats['done']} answered, {stats['failed']} failed")
+    return stats
+
+
+def start_local_workers(
+        queue_path: str,
+        api_key_paths: list[str],
+        n: int,
+        base_url: str=None,
+        job: str=None,
+        threads: int=4,
+        lease_seconds: float=120
+    ) -> list[subprocess.Popen]:
+    """
+    Starts `n` worker processes on this machine, using the API keys in turn.
+    """
+    if not api_key_paths:
+        raise ValueError("Workers need at least one API key path")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")]))}
+    processes = []
+    for k in range(n):
+        command = [
+            sys.executable, "-m", "annotate.workqueue", "worker", os.path.abspath(queue_path),
+            "--api-key", os.path.abspath(api_key_paths[k % len(api_key_paths)]),
+            "--threads", str(threads), "--lease-seconds", str(lease_seconds),
+        ]
+        if base_url:
+            command += ["--base-url", base_url]
+        if job:
+            command += ["--job", job]
+        processes.append(subprocess.Popen(command, env=env))
+    return processes
+
+
+def annotate_with_workers(
+        df,
+        queue_path: str,
+        job: str,
+        model: str,
+        prompt_fn: Callable,
+        get_prompt_args: Callable,
+        priority=None,
+        max_attempts: int=3,
+        local_workers: int=0,
+        api_key_paths: list[str]=None,
+        base_url: str=None,
+        threads: int=4,
+        lease_seconds: float=120,
+        poll_seconds: float=5,
+        on_merge: Callable=None
+    ):
+    """
+    Distributed version of `annotate_df`: submits the rows of `df` that still require annotation to the
+    `WorkQueue` at `queue_path` as `job`, starts `local_workers` worker processes (more can be started on
+    other machines with `python -m annotate.workqueue worker <queue_path> --api-key <path>`) and merges
+    their answers into `df` as they come in, calling `on_merge(df, rows)` with the newly written rows.
+
+    Returns once all tasks are answered or failed, or no worker is running anymore.
+    Returns the DataFrame and whether all rows are annotated.
+    """
+    from tqdm import tqdm
+
+    queue = WorkQueue(queue_path)
+    added = queue.submit(df, job, model, prompt_fn, get_prompt_args, priority, max_attempts)
+    if priority is not None and added:
+        print(f"{added} papers added to the {job} queue, best first")
+    processes = start_local_workers(
+        queue_path, api_key_paths, local_workers, base_url, job, threads, lease_seconds
+        ) if local_workers else []
+
+    merged = set()
+    rows_by_key = rows_by_paper_id(df)
+    progress = queue.progress(job)
+    total = progress["pending"] + progress["leased"] + progress["done"] + progress["failed"]
+    try:
+        with tqdm(desc=f"Annotating papers ({job} queue)...", total=total) as bar:
+            while True:
+                rows = merge_results(df, queue, job, merged, rows_by_key)
+                if rows and on_merge:
+                    on_merge(df, rows)
+                progress = queue.progress(job)
+                bar.n = progress["done"] + progress["failed"]
+                bar.set_postfix(workers=len(queue.live_workers(lease_seconds)), expired=progress["expired_leases"])
+                if not progress["pending"] + progress["leased"]:
+                    break
+                if all(p.poll() is not None for p in processes) and not queue.live_workers(lease_seconds):
+                    print(
+                        f"No workers are answering the {job} queue. Start workers with:\n"
+                        f"python -m annotate.workqueue worker {queue_path} --api-key <path>"
+                    )
+                    break
+                time.sleep(poll_seconds)
+    finally:
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+        for process in processes:
+            process.wait()
+        rows = merge_results(df, queue, job, merged, rows_by_key)
+        if rows and on_merge:
+            on_merge(df, rows)
+        queue.close()
+
+    done = "requires reannotation" in df.columns and bool((df["requires reannotation"] == False).all())
+    return df, done
+
+
+def print_status(queue: WorkQueue):
+    for job, spec in queue.jobs().items():
+        progress = queue.progress(job)
+        print(
+            f"{job} ({spec['model']}): {progress['done']} done, {progress['failed']} failed, "
+            f"{progress['leased']} leased, {progress['pending']} pending, {progress['expired_leases']} expired leases"
+        )
+    now = time.time()
+    for w in queue.workers():
+        state = "stopped" if w["stopped"] else f"last heartbeat {now - (w['heartbeat'] or 0):.0f}s ago"
+        print(f"  {w['worker']:<32}{w['done']:>7} done{w['failed']:>5} failed  {state}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m annotate.workqueue",
+        description="Answers annotation tasks of a shared work queue, e.g. on several machines sharing a filesystem."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    worker = commands.add_parser("worker", help="answer tasks until none are left")
+    worker.add_argument("queue", help="path to the queue, e.g. results/.pipeline/workqueue.sqlite")
+    worker.add_argument("--api-key", required=True, help="file with the API key of this worker")
+    worker.add_argument("--base-url", help="OpenAI compatible endpoint")
+    worker.add_argument("--job", help="only answer tasks of this job, e.g. screened")
+    worker.add_argument("--worker-id", help="name shown in the status, default host and process id")
+    worker.add_argument("--threads", type=int, default=4, help="tasks answered at the same time")
+    worker.add_argument("--lease-seconds", type=float, default=120)
+    worker.add_argument("--keep-running", action="store_true", help="wait for new tasks instead of exiting")
+    status = commands.add_parser("status", help="show progress per job and worker")
+    status.add_argument("queue")
+    retry = commands.add_parser("retry", help="queue failed tasks again")
+    retry.add_argument("queue")
+    retry.add_argument("--job")
+    args = parser.parse_args()
+
+    if args.command == "worker":
+        # terminating a worker returns its leased tasks to the queue
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        run_worker(
+            args.queue, args.api_key, args.base_url, args.job, args.worker_id, args.threads,
+            args.lease_seconds, exit_when_done=not args.keep_running
+        )
+    elif args.command == "status":
+        print_status(WorkQueue(args.queue))
+    else:
+        print(f"{WorkQueue(args.queue).retry_failed(args.job)} failed tasks queued again")
+
+
+if __name__ == "__main__":
+    main()
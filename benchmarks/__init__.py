@@ -0,0 +1,34 @@
+import importlib
+
+# Imported on first use, so `python -m benchmarks.<name>` only loads that benchmark
+_LAZY = {
+    "write_fixtures": "fixtures",
+    "synthetic_papers": "fixtures",
+    "ReplayServer": "replay",
+    "replay_backends": "replay",
+    "benchmark_search": "search_benchmark",
+    "MockLLMServer": "mock_llm",
+    "benchmark_annotation": "annotation_benchmark",
+}
+
+__all__ = [
+    "write_fixtures",
+    "synthetic_papers",
+    "ReplayServer",
+    "replay_backends",
+    "benchmark_search",
+    "MockLLMServer",
+    "benchmark_annotation",
+]
+
+
+def __getattr__(name: str):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_LAZY[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,137 @@
+import io
+import os
+import time
+import shutil
+import pkgutil
+import argparse
+import tempfile
+from html import escape
+from contextlib import redirect_stdout
+from .fixtures import synthetic_papers
+
+
+def write_anthology(repo_dir: str, papers: list[dict], per_volume: int=500) -> str:
+    """
+    Writes `papers` as Anthology XML (data/xml/<collection>.xml, one volume per collection)
+    in the format read by the acl_anthology library. Returns the data folder.
+    """
+    xml_dir = os.path.join(repo_dir, "data", "xml")
+    os.makedirs(xml_dir, exist_ok=True)
+    with open(os.path.join(xml_dir, "schema.rnc"), "wb") as f:
+        f.write(pkgutil.get_data("acl_anthology", "data/schema.rnc"))
+
+    for k in range(0, len(papers), per_volume):
+        volume = papers[k:k + per_volume]
+        year = volume[0]["year"]
+        collection_id = f"{year}.synth{k // per_volume}"
+        lines = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            f'<collection id="{collection_id}">',
+            '  <volume id="main" type="proceedings">',
+            "    <meta>",
+            f"      <booktitle>Proceedings of Synthetic Volume {k // per_volume}</booktitle>",
+            f"      <year>{year}</year>",
+            "      <venue>synth</venue>",
+            "    </meta>",
+        ]
+        for j, p in enumerate(volume, start=1):
+            lines += [
+                f'    <paper id="{j}">',
+                f"      <title>{escape(p['title'])}</title>",
+                *[
+                    f"      <author><first>{first}</first><last>{last}</last></author>"
+                    for first, last in p["authors"]
+                ],
+                # a share of papers has no abstract or PDF, like in the Anthology
+                *([f"      <abstract>{escape(p['abstract'])}</abstract>"] if j % 7 else []),
+                *(['      <pdf hash="0a1b2c3d"/>'] if j % 11 else []),
+                f"      <doi>{p['doi']}</doi>",
+                f"      <bibkey>synth-{k + j}</bibkey>",
+                "    </paper>",
+            ]
+        lines += ["  </volume>", "</collection>"]
+        with open(os.path.join(xml_dir, f"{collection_id}.xml"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+    return os.path.join(repo_dir, "data")
+
+
+def parse_like_before(datadir: str) -> list[tuple]:
+    """
+    Iterates all papers with the acl_anthology library in one process,
+    like `search_acl_anthology` did before the loader.
+    """
+    from acl_anthology import Anthology
+
+    papers = []
+    for paper in Anthology(datadir, verbose=False).papers():
+        if not all([paper.pdf, paper.abstract, paper.pdf and paper.pdf.url]):
+            continue
+        papers.append((
+            str(paper.title), str(paper.abstract), int(paper.year) or 0,
+            [a.name.as_first_last() for a in paper.authors], paper.doi or "", paper.pdf.url,
+        ))
+    return papers
+
+
+def benchmark_acl_loader(n_records: int=20000, max_workers: int=None) -> dict:
+    """
+    Times parsing a synthetic Anthology of `n_records` papers in one process,
+    with `load_acl_anthology` from scratch, from its cache and again in the same process.
+    """
+    from search import acl_loader
+
+    papers = synthetic_papers(n_records, seed=11, shared_share=0)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        repo_dir = os.path.join(tmp_dir, "acl-anthology")
+        write_anthology(repo_dir, papers)
+        cache_dir = os.path.join(tmp_dir, "cache")
+        load = lambda: acl_loader.load_acl_anthology(repo_dir, update=False, cache_dir=cache_dir, max_workers=max_workers)
+
+        seconds = {}
+        with redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            before = parse_like_before(os.path.join(repo_dir, "data"))
+            seconds["single process"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            loaded = load()
+            seconds["process pool"] = time.perf_counter() - start
+
+            acl_loader._loaded.clear()
+            start = time.perf_counter()
+            cached = load()
+            seconds["cache"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            load()
+            seconds["same process"] = time.perf_counter() - start
+        acl_loader._loaded.clear()
+
+        cache_file = os.listdir(cache_dir)[0]
+        return {
+            "records": n_records,
+            "kept": len(loaded),
+            "identical": sorted(before) == sorted(loaded) == sorted(cached),
+            "cache_megabytes": os.path.getsize(os.path.join(cache_dir, cache_file)) / 2**20,
+            "seconds": seconds,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.acl_benchmark",
+        description="Benchmarks loading the ACL Anthology with and without the parallel loader and its cache."
+    )
+    parser.add_argument("--records", type=int, default=20000, help="papers in the synthetic Anthology")
+    parser.add_argument("--max-workers", type=int, help="worker processes, default one per CPU")
+    args = parser.parse_args()
+
+    report = benchmark_acl_loader(args.records, args.max_workers)
+    print(f"{report['kept']} of {report['records']} papers kept, identical to the library: {report['identical']}")
+    print(f"cache: {report['cache_megabytes']:.1f} MB\n")
+    for step, seconds in report["seconds"].items():
+        print(f"{step:<18}{seconds:>8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
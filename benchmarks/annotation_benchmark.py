@@ -0,0 +1,117 @@
+import io
+import os
+import json
+import time
+import argparse
+import tempfile
+from contextlib import redirect_stdout
+import pandas as pd
+from .fixtures import synthetic_papers
+from .mock_llm import MockLLMServer
+from .timing import Timed
+
+
+def benchmark_annotation(
+        n_rows: int=200,
+        workers: list[int]=(1, 4, 16),
+        latency: float=0.2,
+        jitter: float=0.1,
+        rate_limit_rate: float=0.05,
+        malformed_rate: float=0.02,
+        max_retries: int=2
+    ) -> list[dict]:
+    """
+    Screens synthetic papers with `annotate_df` against a `MockLLMServer` once per worker count.
+    Reports rows per minute, requests per row (retry overhead), rate limited and malformed
+    responses and the time spent writing annotations into the DataFrame.
+    """
+    import annotate.prompting as prompting
+    from academiccloud_api import OpenAIClient
+
+    papers = synthetic_papers(n_rows)
+    reports = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        key_path = os.path.join(tmp_dir, "mock_api_key.txt")
+        with open(key_path, "w") as f:
+            f.write("mock")
+
+        for n_workers in workers:
+            server = MockLLMServer(latency, jitter, rate_limit_rate, malformed_rate).start()
+            client = OpenAIClient(key_path, base_url=server.url, max_retries=max_retries)
+            df = pd.DataFrame([{"title": p["title"], "abstract": p["abstract"]} for p in papers])
+
+            write_timer = Timed(prompting._write_annotations)
+            prompting._write_annotations = write_timer
+            start = time.perf_counter()
+            try:
+                with redirect_stdout(io.StringIO()):
+                    df = prompting.annotate_df(
+                        df,
+                        client=client,
+                        model="mock",
+                        prompt_fn=prompting.get_screening_prompt,
+                        get_prompt_args=prompting.screening_prompt_args,
+                        max_workers=n_workers,
+                    )
+            finally:
+                seconds = time.perf_counter() - start
+                prompting._write_annotations = write_timer.fn
+                server.stop()
+
+            flags = df["requires reannotation"] if "requires reannotation" in df.columns else pd.Series(dtype=object)
+            done = int((flags == False).sum())
+            reports.append({
+                "workers": n_workers,
+                "rows": n_rows,
+                "annotated": done,
+                "failed": int((flags == True).sum()),
+                "stopped_early": int(flags.isna().sum()) + n_rows - len(flags),
+                "seconds": seconds,
+                "rows_per_minute": done / seconds * 60 if seconds else 0.0,
+                "requests_per_row": server.stats["requests"] / n_rows,
+                "rate_limited": server.stats["rate_limited"],
+                "malformed": server.stats["malformed"],
+                "bookkeeping_seconds": write_timer.seconds,
+                "bookkeeping_share": write_timer.seconds / seconds if seconds else 0.0,
+            })
+    return reports
+
+
+def print_report(reports: list[dict]):
+    print(f"{'workers':>8}{'rows/min':>10}{'req/row':>9}{'429s':>6}{'malformed':>10}{'failed':>8}{'stopped':>8}{'bookkeeping':>13}")
+    for r in reports:
+        print(
+            f"{r['workers']:>8}{r['rows_per_minute']:>10.0f}{r['requests_per_row']:>9.2f}{r['rate_limited']:>6}"
+            f"{r['malformed']:>10}{r['failed']:>8}{r['stopped_early']:>8}"
+            f"{r['bookkeeping_seconds']:>8.2f}s {r['bookkeeping_share']:>3.0%}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.annotation_benchmark",
+        description="Benchmarks annotate_df offline against a local OpenAI compatible stand-in."
+    )
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 4, 16])
+    parser.add_argument("--latency", type=float, default=0.2, help="mean seconds per completion")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.05, help="share of requests answered with 429")
+    parser.add_argument("--malformed-rate", type=float, default=0.02, help="share of completions with invalid JSON")
+    parser.add_argument("--max-retries", type=int, default=2, help="retries of the OpenAI client")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    reports = benchmark_annotation(
+        args.rows, args.workers, args.latency, args.jitter,
+        args.rate_limit_rate, args.malformed_rate, args.max_retries
+    )
+    print_report(reports)
+    if args.json:
+        os.makedirs(os.path.dirname(args.json) or ".", exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
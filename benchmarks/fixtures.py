@@ -0,0 +1,211 @@
+import os
+import json
+import random
+from xml.sax.saxutils import escape
+
+# Backends with a fixture file, in the native response format of their API
+FIXTURE_FILES = {
+    "acl_anthology": "acl_anthology.json",
+    "arxiv": "arxiv.xml",
+    "crossref": "crossref.json",
+    "openalex": "openalex.json",
+    "sciencedirect": "sciencedirect.json",
+    "scopus": "scopus.json",
+    "semanticscholar": "semanticscholar.json",
+}
+
+# Enough of each relevance group from main.ipynb to let a share of papers pass the filter
+TOPIC_WORDS = ["narratives", "disinformation", "conspiracy theories", "propaganda", "fake news", "fact-checking"]
+TASK_WORDS = ["detection", "tracking", "classification", "extraction", "identification", "analysis"]
+METHOD_WORDS = ["NLP", "dataset", "graph", "network", "LLM", "algorithm"]
+FILLER_WORDS = (
+    "we study the role of social media platforms in shaping public opinion across "
+    "different countries and languages using a large collection of posts and articles "
+    "our results show strong effects for several groups while others remain stable over time "
+    "this work discusses implications for policy research and future studies in the field"
+).split()
+FIRST_NAMES = ["Ada", "Ben", "Chen", "Dana", "Emil", "Farah", "Goran", "Hana", "Ivan", "Jia"]
+LAST_NAMES = ["Abbott", "Berg", "Costa", "Dietrich", "Evans", "Fischer", "Garcia", "Huang", "Ito", "Jensen"]
+
+
+def synthetic_papers(n: int, seed: int=0, relevant_share: float=0.3, shared_share: float=0.2) -> list[dict]:
+    """
+    Generates `n` papers. About `relevant_share` of them contain a term of each relevance group.
+    About `shared_share` of them come from a pool of titles shared by all backends,
+    so merging sources exercises deduplication.
+    """
+    rng = random.Random(seed)
+    papers = []
+    for i in range(n):
+        relevant = rng.random() < relevant_share
+        words = rng.choices(FILLER_WORDS, k=rng.randint(120, 220))
+        if relevant:
+            for group in [TOPIC_WORDS, TASK_WORDS, METHOD_WORDS]:
+                words.insert(rng.randrange(len(words)), rng.choice(group))
+
+        if rng.random() < shared_share:
+            shared = rng.randrange(max(1, int(n * shared_share)))
+            title = f"Shared study {shared} of {TOPIC_WORDS[shared % len(TOPIC_WORDS)]} online"
+        else:
+            title = f"{' '.join(rng.choices(FILLER_WORDS, k=6)).capitalize()} ({seed}-{i})"
+
+        papers.append({
+            "id": f"{seed}{i:07d}",
+            "title": title,
+            "abstract": " ".join(words).capitalize() + ".",
+            "authors": [
+                (rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)) for _ in range(rng.randint(1, 6))
+                ],
+            "doi": f"10.5555/synthetic.{seed}.{i}",
+            "year": rng.randint(2005, 2025),
+            "citations": int(rng.paretovariate(1.2)) - 1,
+        })
+    return papers
+
+
+def inverted_index(text: str) -> dict:
+    index = {}
+    for pos, word in enumerate(text.split()):
+        index.setdefault(word, []).append(pos)
+    return index
+
+
+def openalex_response(papers: list[dict]) -> dict:
+    return {
+        "meta": {"count": len(papers), "page": 1, "per_page": len(papers)},
+        "results": [{
+            "id": f"https://openalex.org/W{p['id']}",
+            "doi": f"https://doi.org/{p['doi']}",
+            "title": p["title"],
+            "display_name": p["title"],
+            "publication_year": p["year"],
+            "abstract_inverted_index": inverted_index(p["abstract"]),
+            "authorships": [{"author": {"display_name": f"{first} {last}"}} for first, last in p["authors"]],
+            "cited_by_count": p["citations"],
+            "referenced_works": [],
+        } for p in papers],
+    }
+
+
+def crossref_response(papers: list[dict]) -> dict:
+    return {
+        "status": "ok",
+        "message": {
+            "total-results": len(papers),
+            "items": [{
+                "DOI": p["doi"],
+                "title": [p["title"]],
+                "abstract": f"<jats:title>Abstract</jats:title><jats:p>{escape(p['abstract'])}</jats:p>",
+                "issued": {"date-parts": [[p["year"], 1, 1]]},
+                "link": [{"URL": f"https://example.org/pdf/{p['id']}.pdf", "content-type": "application/pdf"}],
+                "author": [{"given": first, "family": last} for first, last in p["authors"]],
+                "is-referenced-by-count": p["citations"],
+            } for p in papers],
+        },
+    }
+
+
+def semanticscholar_response(papers: list[dict]) -> dict:
+    return {
+        "total": len(papers),
+        "offset": 0,
+        "data": [{
+            "paperId": f"s2{p['id']}",
+            "title": p["title"],
+            "abstract": p["abstract"],
+            "year": p["year"],
+            "authors": [{"authorId": str(j), "name": f"{first} {last}"} for j, (first, last) in enumerate(p["authors"])],
+            "citationCount": p["citations"],
+            "externalIds": {"DOI": p["doi"]},
+        } for p in papers],
+    }
+
+
+def arxiv_response(papers: list[dict]) -> str:
+    entries = []
+    for p in papers:
+        authors = "".join(f"<author><name>{first} {last}</name></author>" for first, last in p["authors"])
+        entries.append(
+            f"<entry><id>http://arxiv.org/abs/{p['id'][:4]}.{p['id'][4:]}v1</id>"
+            f"<updated>{p['year']}-01-02T00:00:00Z</updated><published>{p['year']}-01-01T00:00:00Z</published>"
+            f"<title>{escape(p['title'])}</title><summary>{escape(p['abstract'])}</summary>{authors}"
+            f"<arxiv:doi>{p['doi']}</arxiv:doi>"
+            f"<link href=\"http://arxiv.org/abs/{p['id']}v1\" rel=\"alternate\" type=\"text/html\"/>"
+            f"<link title=\"pdf\" href=\"http://arxiv.org/pdf/{p['id']}v1\" rel=\"related\" type=\"application/pdf\"/>"
+            f"<arxiv:primary_category term=\"cs.CL\"/><category term=\"cs.CL\"/></entry>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/" '
+        'xmlns:arxiv="http://arxiv.org/schemas/atom">'
+        f"<opensearch:totalResults>{len(papers)}</opensearch:totalResults>"
+        "<opensearch:startIndex>0</opensearch:startIndex>"
+        f"<opensearch:itemsPerPage>{len(papers)}</opensearch:itemsPerPage>"
+        + "\n".join(entries) + "</feed>"
+    )
+
+
+def scopus_response(papers: list[dict]) -> list[dict]:
+    return [{
+        "title": p["title"],
+        "description": p["abstract"],
+        "doi": p["doi"],
+        "coverDate": f"{p['year']}-01-01",
+        "author_names": ";".join(f"{last}, {first}" for first, last in p["authors"]),
+        "citedby_count": p["citations"],
+    } for p in papers]
+
+
+def sciencedirect_response(papers: list[dict]) -> list[dict]:
+    return [{
+        "title": p["title"],
+        "abstract_text": p["abstract"],
+        "link": f"https://www.sciencedirect.com/science/article/pii/{p['id']}",
+        "coverDate": f"{p['year']}-01-01",
+        "authors": ";".join(f"{last}, {first}" for first, last in p["authors"]),
+        "doi": p["doi"],
+    } for p in papers]
+
+
+def acl_anthology_response(papers: list[dict]) -> list[dict]:
+    return [{
+        "title": p["title"],
+        "abstract": p["abstract"],
+        "year": p["year"],
+        "authors": [f"{first} {last}" for first, last in p["authors"]],
+        "doi": p["doi"],
+        "pdf_url": f"https://aclanthology.org/{p['id']}.pdf",
+    } for p in papers]
+
+
+RENDERERS = {
+    "acl_anthology": acl_anthology_response,
+    "arxiv": arxiv_response,
+    "crossref": crossref_response,
+    "openalex": openalex_response,
+    "sciencedirect": sciencedirect_response,
+    "scopus": scopus_response,
+    "semanticscholar": semanticscholar_response,
+}
+
+
+def write_fixtures(out_dir: str, n_records: int=1000, seed: int=0, backends: list[str]=None):
+    """
+    Writes one synthetic fixture per backend. Recorded API responses
+    of the same shape can be saved under the same file names instead.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    for k, backend in enumerate(backends or list(FIXTURE_FILES)):
+        papers = synthetic_papers(n_records, seed=seed * 100 + k + 1)
+        rendered = RENDERERS[backend](papers)
+        with open(os.path.join(out_dir, FIXTURE_FILES[backend]), "w", encoding="utf-8") as f:
+            if isinstance(rendered, str):
+                f.write(rendered)
+            else:
+                json.dump(rendered, f)
+
+
+def load_fixture(fixtures_dir: str, backend: str):
+    path = os.path.join(fixtures_dir, FIXTURE_FILES[backend])
+    with open(path, encoding="utf-8") as f:
+        return f.read() if path.endswith(".xml") else json.load(f)
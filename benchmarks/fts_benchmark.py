@@ -0,0 +1,105 @@
+import os
+import time
+import random
+import argparse
+import tempfile
+import statistics
+from .fixtures import synthetic_papers, TOPIC_WORDS, TASK_WORDS
+
+QUERIES = [
+    "disinformation",
+    '"conspiracy theories"',
+    "propaganda OR disinformation",
+    "narrat* NOT graph",
+    "NEAR(disinformation detection, 10)",
+    "disinformation AND detection AND graph",
+]
+
+ANSWERS = ["Yes", "No"]
+
+
+def build_index(path: str, n_records: int, annotated_share: float=0.2, scraped_share: float=0.05) -> dict:
+    """
+    Indexes `n_records` synthetic papers, annotating and scraping a share of them
+    one paper at a time like `annotate_df` and `scrape_paper` do. Returns the time spent per step.
+    """
+    from storage import PaperIndex
+
+    rng = random.Random(3)
+    papers = synthetic_papers(n_records, seed=3, shared_share=0)
+    index = PaperIndex(path)
+    seconds = {}
+
+    start = time.perf_counter()
+    for k in range(0, len(papers), 1000):
+        index.add_papers(papers[k:k + 1000])
+    seconds["add_papers"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for paper in rng.sample(papers, int(n_records * annotated_share)):
+        index.add_annotations(paper, {
+            "disinformation focused": rng.choice(ANSWERS),
+            "tasks": f"{rng.choice(TASK_WORDS)} of {rng.choice(TOPIC_WORDS)}",
+        })
+    seconds["add_annotations"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for paper in rng.sample(papers, int(n_records * scraped_share)):
+        index.add_markdown(paper, "\n\n".join([f"# {paper['title']}", paper["abstract"]] * 20))
+    seconds["add_markdown"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index.optimize()
+    seconds["optimize"] = time.perf_counter() - start
+    index.close()
+    return seconds
+
+
+def benchmark_queries(path: str, repeat: int=20, limit: int=20) -> list[dict]:
+    """
+    Median and worst latency of each query in `QUERIES` over `repeat` runs.
+    """
+    from storage import PaperIndex
+
+    index = PaperIndex(path)
+    reports = []
+    for query in QUERIES:
+        latencies = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results = index.search(query, limit=limit)
+            latencies.append(time.perf_counter() - start)
+        reports.append({
+            "query": query,
+            "matches": index.count(query),
+            "returned": len(results),
+            "median_ms": statistics.median(latencies) * 1000,
+            "max_ms": max(latencies) * 1000,
+        })
+    index.close()
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.fts_benchmark",
+        description="Benchmarks building and querying the full-text index of candidates."
+    )
+    parser.add_argument("--records", type=int, default=100000, help="synthetic papers to index")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per query")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "papers.sqlite")
+        seconds = build_index(path, args.records)
+        for step, s in seconds.items():
+            print(f"{step:<18}{s:>8.2f}s")
+        print(f"{'index size':<18}{os.path.getsize(path) / 2**20:>8.0f}MB\n")
+
+        print(f"{'query':<42}{'matches':>9}{'median ms':>11}{'max ms':>9}")
+        for r in benchmark_queries(path, args.repeat):
+            print(f"{r['query']:<42}{r['matches']:>9}{r['median_ms']:>11.2f}{r['max_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
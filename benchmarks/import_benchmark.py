@@ -0,0 +1,98 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+# typical entry points of scripts and notebooks
+STATEMENTS = [
+    "import search",
+    "from search import search_openalex",
+    "from search import *",
+    "from annotate import annotate_df",
+    "from annotate import scrape_paper",
+    "from academiccloud_api import OpenAIClient",
+    "import pipeline",
+]
+
+REPORT_RSS = "; import resource; print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+
+
+def parse_importtime(stderr: str) -> dict[str, tuple[int, int]]:
+    """
+    Parses the output of `python -X importtime` into {module: (self µs, cumulative µs)}.
+    Nested modules are indented, top-level imports are not.
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue
+        modules[name[1:].rstrip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def measure_import(statement: str, repeat: int=3, top: int=5) -> dict:
+    """
+    Runs `statement` in fresh interpreters and reports the best import time, the peak
+    resident memory and the modules taking the longest to import themselves.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")]))}
+    best = None
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", statement + REPORT_RSS],
+            capture_output=True, text=True, cwd=root, env=env,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"'{statement}' failed:\n{result.stderr[-2000:]}")
+        modules = parse_importtime(result.stderr)
+        run = {
+            # top-level imports include everything they import in turn
+            "seconds": sum(c for name, (_, c) in modules.items() if not name.startswith(" ")) / 1e6,
+            "modules": len(modules),
+            "peak_rss_mb": int(result.stdout.split()[-1]) / 1024,
+            "slowest": [
+                (name.strip(), self_us / 1e6)
+                for name, (self_us, _) in sorted(modules.items(), key=lambda item: -item[1][0])[:top]
+            ],
+        }
+        if best is None or run["seconds"] < best["seconds"]:
+            best = run
+    return {"statement": statement, **best}
+
+
+def benchmark_imports(statements: list[str]=STATEMENTS, repeat: int=3) -> list[dict]:
+    return [measure_import(statement, repeat) for statement in statements]
+
+
+def print_report(reports: list[dict]):
+    print(f"{'statement':<46}{'import s':>10}{'modules':>9}{'peak MB':>9}  slowest")
+    for r in reports:
+        slowest = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in r["slowest"][:3])
+        print(f"{r['statement']:<46}{r['seconds']:>10.2f}{r['modules']:>9}{r['peak_rss_mb']:>9.0f}  {slowest}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.import_benchmark",
+        description="Measures how long typical imports of this repo take in a fresh interpreter."
+    )
+    parser.add_argument("statements", nargs="*", default=STATEMENTS, help="import statements to measure")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per statement, the fastest is reported")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    reports = benchmark_imports(args.statements, args.repeat)
+    print_report(reports)
+    if args.json:
+        os.makedirs(os.path.dirname(args.json) or ".", exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
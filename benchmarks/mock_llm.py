@@ -0,0 +1,148 @@
+import re
+import json
+import time
+import random
+import threading
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+def mock_answer(prompt: str, rng: random.Random) -> list[dict]:
+    """
+    Answers the ANSWER FORMAT block of a prompt from annotate/prompting.py:
+    "Yes|No" fields get a random choice, "0-100" a random number,
+    lists get one or two of the listed examples.
+    """
+    answer_format = prompt[prompt.find("ANSWER FORMAT"):]
+    answer = []
+    for block in re.findall(r"\{(.*?)\}", answer_format, re.DOTALL):
+        entry = {}
+        for key, value in re.findall(r'"([^"]+)":\s*(".*?"|\[.*?\])', block, re.DOTALL):
+            if value == '"Yes|No"':
+                entry[key] = rng.choice(["Yes", "No"])
+            elif value == '"0-100"':
+                entry[key] = str(rng.randint(0, 100))
+            elif value.startswith("["):
+                examples = [v for v in re.findall(r'"(.*?)"', value) if v != "..."] or ["mock answer"]
+                entry[key] = rng.sample(examples, k=min(len(examples), rng.randint(1, 2)))
+            else:
+                entry[key] = "mock answer"
+        answer.append(entry)
+    return answer
+
+
+class MockLLMServer:
+    def __init__(
+            self,
+            latency: float=0.5,
+            jitter: float=0.2,
+            rate_limit_rate: float=0.0,
+            malformed_rate: float=0.0,
+            retry_after: float=0.05,
+            seed: int=0,
+            host: str="127.0.0.1",
+            port: int=0
+        ):
+        """
+        Local OpenAI compatible chat completions endpoint.
+
+            latency:          mean seconds per completion
+            jitter:           completions take latency +- jitter seconds
+            rate_limit_rate:  share of requests answered with HTTP 429
+            malformed_rate:   share of completions with invalid JSON
+            retry_after:      seconds the client is asked to wait after a 429
+
+        `stats` counts requests, rate limited and malformed responses and tokens.
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_rate = rate_limit_rate
+        self.malformed_rate = malformed_rate
+        self.retry_after = retry_after
+        self.stats = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if not self.path.endswith("/chat/completions"):
+                    self._send(404, {"error": {"message": "not found"}})
+                    return
+                status, payload, headers = server.complete(json.loads(body))
+                self._send(status, payload, headers)
+
+            def _send(self, status: int, payload: dict, headers: dict=None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}/v1"
+
+    def complete(self, request: dict) -> tuple[int, dict, dict]:
+        with self._lock:
+            self.stats["requests"] += 1
+            rate_limited = self._rng.random() < self.rate_limit_rate
+            malformed = self._rng.random() < self.malformed_rate
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            rng = random.Random(self._rng.random())
+
+        if rate_limited:
+            with self._lock:
+                self.stats["rate_limited"] += 1
+            error = {"error": {"message": "Rate limit exceeded", "type": "rate_limit_exceeded", "code": "429"}}
+            return 429, error, {"retry-after-ms": str(int(self.retry_after * 1000))}
+
+        time.sleep(delay)
+        prompt = "\n".join(str(m.get("content", "")) for m in request.get("messages", []))
+        answer = json.dumps(mock_answer(prompt, rng), indent=2)
+        if malformed:
+            # trailing comma, like the invalid JSON models occasionally return
+            answer = answer[:answer.rfind("}") + 1] + ",\n]"
+        content = f"<think>Mock reasoning.</think>\n```json\n{answer}\n```"
+
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(content) // 4
+        with self._lock:
+            self.stats["malformed"] += malformed
+            self.stats["prompt_tokens"] += prompt_tokens
+            self.stats["completion_tokens"] += completion_tokens
+
+        return 200, {
+            "id": f"chatcmpl-mock{self.stats['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }, {}
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
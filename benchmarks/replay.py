@@ -0,0 +1,200 @@
+import re
+import json
+import threading
+import importlib
+from collections import namedtuple, Counter
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+from .fixtures import load_fixture
+
+
+class ReplayServer:
+    def __init__(self, fixtures_dir: str, host: str="127.0.0.1", port: int=0):
+        """
+        Local stand-in for the HTTP APIs of arXiv, Crossref, OpenAlex and Semantic Scholar.
+        Every query is answered with the fixture of the backend, paged like the real API.
+        `served` counts the records handed out per backend.
+        """
+        self.fixtures_dir = fixtures_dir
+        self.served = Counter()
+        self._lock = threading.Lock()
+        self._items = {}
+
+        feed = load_fixture(fixtures_dir, "arxiv")
+        self._arxiv_entries = re.findall(r"<entry>.*?</entry>", feed, re.DOTALL)
+        self._arxiv_head = feed[:feed.find("<opensearch:totalResults>")]
+        self._items["openalex"] = load_fixture(fixtures_dir, "openalex")["results"]
+        self._items["crossref"] = load_fixture(fixtures_dir, "crossref")["message"]["items"]
+        self._items["semanticscholar"] = load_fixture(fixtures_dir, "semanticscholar")["data"]
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                try:
+                    content_type, body = server.respond(url.path, params)
+                except KeyError:
+                    self.send_error(404)
+                    return
+                body = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+
+    def _page(self, backend: str, items: list, offset: int, size: int) -> list:
+        page = items[offset:offset + size]
+        with self._lock:
+            self.served[backend] += len(page)
+        return page
+
+    def respond(self, path: str, params: dict) -> tuple[str, str]:
+        if path.startswith("/openalex/works"):
+            items = self._items["openalex"]
+            size = int(params.get("per-page", 25))
+            page = int(params.get("page", 1))
+            results = self._page("openalex", items, (page - 1) * size, size)
+            meta = {"count": len(items), "page": page, "per_page": size}
+            return "application/json", json.dumps({"meta": meta, "results": results})
+
+        if path.startswith("/crossref/works"):
+            items = self._items["crossref"]
+            offset = 0 if params.get("cursor", "*") == "*" else int(params["cursor"])
+            size = int(params.get("rows", 20))
+            page = self._page("crossref", items, offset, size)
+            message = {"next-cursor": str(offset + size), "total-results": len(items), "items": page}
+            return "application/json", json.dumps({"status": "ok", "message": message})
+
+        if path.startswith("/arxiv/query"):
+            start = int(params.get("start", 0))
+            size = int(params.get("max_results", 100))
+            entries = self._page("arxiv", self._arxiv_entries, start, size)
+            feed = (
+                self._arxiv_head
+                + f"<opensearch:totalResults>{len(self._arxiv_entries)}</opensearch:totalResults>"
+                + f"<opensearch:startIndex>{start}</opensearch:startIndex>"
+                + f"<opensearch:itemsPerPage>{size}</opensearch:itemsPerPage>"
+                + "\n".join(entries) + "</feed>"
+            )
+            return "application/atom+xml", feed
+
+        if path.startswith("/graph/v1/paper/search"):
+            items = self._items["semanticscholar"]
+            offset = int(params.get("offset", 0))
+            size = int(params.get("limit", 100))
+            body = {"total": len(items), "offset": offset, "data": self._page("semanticscholar", items, offset, size)}
+            if offset + size < len(items):
+                body["next"] = offset + size
+            return "application/json", json.dumps(body)
+
+        raise KeyError(path)
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _redirecting_session(prefix: str, target: str):
+    """
+    Returns a factory of requests sessions that send requests for `prefix` to `target` instead.
+    """
+    import requests
+
+    class RedirectAdapter(requests.adapters.HTTPAdapter):
+        def send(self, request, **kwargs):
+            request.url = target + request.url[len(prefix):]
+            return super().send(request, **kwargs)
+
+    def get_session():
+        session = requests.Session()
+        session.mount(prefix, RedirectAdapter())
+        return session
+
+    return get_session
+
+
+def _replay_pybliometrics(records: list[dict], served: Counter, backend: str):
+    Document = namedtuple("Document", list(records[0].keys()) if records else ["title"])
+
+    class ReplaySearch:
+        def __init__(self, query: str, download: bool=True, subscriber: bool=True, **kwargs):
+            self.results = [Document(**record) for record in records]
+            served[backend] += len(self.results)
+
+    return ReplaySearch
+
+
+def _replay_anthology(records: list[dict], served: Counter):
+    def load_acl_anthology(*args, **kwargs) -> list[tuple]:
+        served["acl_anthology"] += len(records)
+        return [
+            (r["title"], r["abstract"], int(r["year"]), list(r["authors"]), r["doi"], r["pdf_url"])
+            for r in records
+        ]
+
+    return load_acl_anthology
+
+
+@contextmanager
+def replay_backends(fixtures_dir: str):
+    """
+    Points every search backend at the fixtures in `fixtures_dir` while the context is open.
+    HTTP backends are redirected to a local `ReplayServer`, pybliometrics and the ACL Anthology loader
+    (which have no HTTP endpoint to redirect) are replaced by objects serving the fixtures.
+    Rate limit delays are disabled. Yields the server, whose `served` counts records per backend.
+    """
+    import arxiv
+    import pyalex.api
+    import crossref_commons.iteration
+    from semanticscholar.AsyncSemanticScholar import AsyncSemanticScholar
+
+    server = ReplayServer(fixtures_dir)
+    server.start()
+    modules = {
+        name: importlib.import_module(f"search.{name}")
+        for name in ["acl", "arxiv", "scopus", "sciencedirect", "semantic_scholar"]
+    }
+
+    patches = [
+        # pyalex builds its URLs with a fixed host, so its sessions are redirected instead
+        (pyalex.api, "_get_requests_session",
+            _redirecting_session("https://api.openalex.org", f"{server.url}/openalex")),
+        (crossref_commons.iteration, "API_URL", f"{server.url}/crossref"),
+        (arxiv.Client, "query_url_format", f"{server.url}/arxiv/query?{{}}"),
+        (modules["arxiv"], "_arxiv_client", arxiv.Client(delay_seconds=0)),
+        (AsyncSemanticScholar, "DEFAULT_API_URL", server.url),
+        (modules["semantic_scholar"], "sleep", lambda seconds: None),
+        (modules["scopus"], "ScopusSearch",
+            _replay_pybliometrics(load_fixture(fixtures_dir, "scopus"), server.served, "scopus")),
+        (modules["sciencedirect"], "ArticleMetadata",
+            _replay_pybliometrics(load_fixture(fixtures_dir, "sciencedirect"), server.served, "sciencedirect")),
+        (modules["acl"], "load_acl_anthology",
+            _replay_anthology(load_fixture(fixtures_dir, "acl_anthology"), server.served)),
+    ]
+
+    originals = [(obj, name, getattr(obj, name)) for obj, name, _ in patches]
+    try:
+        for obj, name, value in patches:
+            setattr(obj, name, value)
+        yield server
+    finally:
+        for obj, name, value in reversed(originals):
+            setattr(obj, name, value)
+        server.stop()
+
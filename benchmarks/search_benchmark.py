@@ -0,0 +1,153 @@
+import io
+import os
+import json
+import time
+import argparse
+import tempfile
+import importlib
+import tracemalloc
+from contextlib import redirect_stdout
+from .fixtures import write_fixtures, FIXTURE_FILES
+from .replay import replay_backends
+from .timing import Timed
+
+# search function and module of each backend
+BACKENDS = {
+    "acl_anthology": ("acl", "search_acl_anthology"),
+    "arxiv": ("arxiv", "search_arxiv"),
+    "crossref": ("crossref", "search_crossref"),
+    "openalex": ("openalex", "search_openalex"),
+    "sciencedirect": ("sciencedirect", "search_sciencedirect"),
+    "scopus": ("scopus", "search_scopus"),
+    "semanticscholar": ("semantic_scholar", "search_semanticscholar"),
+}
+
+KEYWORDS = ["disinformation narratives", "conspiracy theories", "propaganda detection"]
+
+# relevance terms from main.ipynb
+RELEVANCE_TERMS = [
+    ["narrat", "isinformat", "conspira", "propagand", "fake news", "fact-check"],
+    ["detect", "track", "model", "predict", "classif", "extract", "identif", "recognition", "analys"],
+    ["nlp", "natural language processing", "ai", "dataset", "algorithm", "graph", "network", "comput",
+     "llm", "large language model"],
+]
+
+
+def run_backend(backend: str, server, max_results: int, keywords: list[str], measure_memory: bool) -> dict:
+    module_name, fn_name = BACKENDS[backend]
+    module = importlib.import_module(f"search.{module_name}")
+    filter_timer = Timed(module.is_relevant)
+    dedup_timer = Timed(module.add_to_all_results)
+    module.is_relevant, module.add_to_all_results = filter_timer, dedup_timer
+
+    kwargs = {
+        "keywords": keywords,
+        "seen_keys": set(),
+        "all_results": [],
+        "relevance_terms": RELEVANCE_TERMS,
+        "min_year": 0,
+    }
+    if backend == "openalex":
+        # OpenAlex pages hold at most 200 works and search_openalex fetches one page
+        kwargs["max_results"] = min(max_results, 200)
+    elif backend != "acl_anthology":
+        kwargs["max_results"] = max_results
+    if backend == "semanticscholar":
+        kwargs["semanticscholar_api_key_path"] = None
+
+    served_before = server.served[backend]
+    if measure_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        with redirect_stdout(io.StringIO()):
+            getattr(module, fn_name)(**kwargs)
+    finally:
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if measure_memory else None
+        if measure_memory:
+            tracemalloc.stop()
+        module.is_relevant, module.add_to_all_results = filter_timer.fn, dedup_timer.fn
+
+    records = server.served[backend] - served_before
+    return {
+        "backend": backend,
+        "records": records,
+        "kept": len(kwargs["all_results"]),
+        "seconds": seconds,
+        "records_per_second": records / seconds if seconds else 0.0,
+        "filter_seconds": filter_timer.seconds,
+        "filter_calls": filter_timer.calls,
+        "dedup_seconds": dedup_timer.seconds,
+        "peak_memory_mb": peak / 2**20 if peak is not None else None,
+    }
+
+
+def benchmark_search(
+        fixtures_dir: str=None,
+        n_records: int=1000,
+        backends: list[str]=None,
+        keywords: list[str]=KEYWORDS,
+        measure_memory: bool=True
+    ) -> list[dict]:
+    """
+    Runs each search backend against replayed responses and reports throughput,
+    time spent in `is_relevant` (filter) and `add_to_all_results` (dedup) and peak
+    Python memory. Fixtures are generated in a temporary folder unless `fixtures_dir` is given.
+    Memory is measured in a second run since tracing slows down the first.
+    """
+    backends = backends or list(BACKENDS)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if fixtures_dir is None:
+            fixtures_dir = tmp_dir
+            write_fixtures(fixtures_dir, n_records)
+
+        reports = []
+        with replay_backends(fixtures_dir) as server:
+            for backend in backends:
+                report = run_backend(backend, server, n_records, keywords, measure_memory=False)
+                if measure_memory:
+                    report["peak_memory_mb"] = run_backend(
+                        backend, server, n_records, keywords, measure_memory=True
+                        )["peak_memory_mb"]
+                reports.append(report)
+    return reports
+
+
+def print_report(reports: list[dict]):
+    print(f"{'backend':<16}{'records':>9}{'kept':>7}{'rec/s':>10}{'filter s':>10}{'dedup s':>9}{'peak MB':>9}")
+    for r in reports:
+        peak = f"{r['peak_memory_mb']:.1f}" if r["peak_memory_mb"] is not None else "-"
+        print(
+            f"{r['backend']:<16}{r['records']:>9}{r['kept']:>7}{r['records_per_second']:>10.0f}"
+            f"{r['filter_seconds']:>10.3f}{r['dedup_seconds']:>9.3f}{peak:>9}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.search_benchmark",
+        description="Benchmarks the search backends offline against replayed API responses."
+    )
+    parser.add_argument("--fixtures", help=f"folder with recorded responses named {', '.join(FIXTURE_FILES.values())}")
+    parser.add_argument("--records", type=int, default=1000, help="records per generated fixture")
+    parser.add_argument("--backends", nargs="*", choices=list(BACKENDS), help="backends to run, default all")
+    parser.add_argument("--no-memory", action="store_true", help="skip the memory measurement run")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--write-fixtures", help="only generate fixtures into this folder")
+    args = parser.parse_args()
+
+    if args.write_fixtures:
+        write_fixtures(args.write_fixtures, args.records)
+        return
+
+    reports = benchmark_search(args.fixtures, args.records, args.backends, measure_memory=not args.no_memory)
+    print_report(reports)
+    if args.json:
+        os.makedirs(os.path.dirname(args.json) or ".", exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
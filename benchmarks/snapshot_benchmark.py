@@ -0,0 +1,145 @@
+import io
+import os
+import gzip
+import json
+import time
+import argparse
+import tempfile
+from contextlib import redirect_stdout
+from .fixtures import write_fixtures, synthetic_papers, openalex_response, arxiv_response, FIXTURE_FILES
+from .replay import replay_backends
+from .search_benchmark import RELEVANCE_TERMS
+
+
+def arxiv_snapshot_lines(papers: list[dict]) -> list[str]:
+    """
+    Papers in the format of the arXiv metadata dump, one JSON object per line.
+    """
+    return [json.dumps({
+        "id": p["id"],
+        "title": p["title"],
+        "abstract": f"  {p['abstract']}\n",
+        "authors": ", ".join(f"{first} {last}" for first, last in p["authors"]),
+        "authors_parsed": [[last, first, ""] for first, last in p["authors"]],
+        "doi": p["doi"],
+        "versions": [{"version": "v1", "created": f"Mon, 1 Jan {p['year']} 00:00:00 GMT"}],
+    }) for p in papers]
+
+
+def write_snapshots(out_dir: str, papers: list[dict], shards: int=4) -> tuple[str, str]:
+    """
+    Writes `papers` as an OpenAlex works snapshot (gzipped JSON lines in `updated_date=` partitions)
+    and as an arXiv metadata dump. Returns both paths.
+    """
+    works = openalex_response(papers)["results"]
+    works_dir = os.path.join(out_dir, "openalex", "data", "works")
+    shard_size = -(-len(works) // shards)
+    for k in range(shards):
+        partition = os.path.join(works_dir, f"updated_date=2024-01-{k + 1:02d}")
+        os.makedirs(partition, exist_ok=True)
+        with gzip.open(os.path.join(partition, "part_000.gz"), "wt", encoding="utf-8") as f:
+            for work in works[k * shard_size:(k + 1) * shard_size]:
+                f.write(json.dumps(work) + "\n")
+
+    arxiv_path = os.path.join(out_dir, "arxiv-metadata-oai-snapshot.json")
+    with open(arxiv_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(arxiv_snapshot_lines(papers)) + "\n")
+    return works_dir, arxiv_path
+
+
+def check_parity(n_records: int=200) -> dict:
+    """
+    Runs `search_openalex`/`search_arxiv` against replayed responses and the snapshot searches
+    against snapshots of the same papers. Returns the number of records that differ per source.
+    """
+    from search import search_openalex, search_arxiv, search_openalex_snapshot, search_arxiv_snapshot
+
+    papers = synthetic_papers(n_records, seed=7)
+    differences = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        fixtures_dir = os.path.join(tmp_dir, "fixtures")
+        write_fixtures(fixtures_dir, n_records=1)
+        with open(os.path.join(fixtures_dir, FIXTURE_FILES["openalex"]), "w", encoding="utf-8") as f:
+            json.dump(openalex_response(papers), f)
+        with open(os.path.join(fixtures_dir, FIXTURE_FILES["arxiv"]), "w", encoding="utf-8") as f:
+            f.write(arxiv_response(papers))
+        works_dir, arxiv_path = write_snapshots(tmp_dir, papers)
+
+        runs = {
+            # the replayed API answers every query with all papers, so online keywords do not filter
+            "openalex": (search_openalex, ["any"], search_openalex_snapshot, works_dir),
+            "arxiv": (search_arxiv, ["any"], search_arxiv_snapshot, arxiv_path),
+        }
+        for source, (online_fn, keywords, snapshot_fn, path) in runs.items():
+            online, offline = [], []
+            with redirect_stdout(io.StringIO()):
+                with replay_backends(fixtures_dir):
+                    online_fn(keywords, set(), online, relevance_terms=RELEVANCE_TERMS, max_results=n_records)
+                snapshot_fn(path, [], set(), offline, relevance_terms=RELEVANCE_TERMS)
+            key = lambda r: r["title"]
+            online, offline = sorted(online, key=key), sorted(offline, key=key)
+            differences[source] = {
+                "online": len(online),
+                "offline": len(offline),
+                "different": sum(a != b for a, b in zip(online, offline)) + abs(len(online) - len(offline)),
+            }
+    return differences
+
+
+def benchmark_snapshot(n_records: int=100000, shards: int=8, max_workers: int=None) -> list[dict]:
+    """
+    Scans synthetic snapshots of `n_records` papers and reports throughput.
+    """
+    from search.snapshot import scan_snapshot, openalex_snapshot_files
+
+    papers = synthetic_papers(n_records, seed=7)
+    reports = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        works_dir, arxiv_path = write_snapshots(tmp_dir, papers, shards)
+        runs = {
+            "openalex": openalex_snapshot_files(works_dir),
+            "arxiv": [arxiv_path],
+        }
+        for kind, paths in runs.items():
+            size = sum(os.path.getsize(path) for path in paths)
+            start = time.perf_counter()
+            with redirect_stdout(io.StringIO()):
+                matches = scan_snapshot(kind, paths, ["disinformation"], RELEVANCE_TERMS, max_workers=max_workers)
+            seconds = time.perf_counter() - start
+            reports.append({
+                "snapshot": kind,
+                "records": n_records,
+                "matches": len(matches),
+                "megabytes": size / 2**20,
+                "seconds": seconds,
+                "records_per_second": n_records / seconds,
+                "megabytes_per_minute": size / 2**20 / seconds * 60,
+            })
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.snapshot_benchmark",
+        description="Benchmarks the offline snapshot search and checks it against the online search."
+    )
+    parser.add_argument("--records", type=int, default=100000, help="papers per synthetic snapshot")
+    parser.add_argument("--shards", type=int, default=8, help="gzipped shards of the OpenAlex snapshot")
+    parser.add_argument("--max-workers", type=int, help="worker processes, default one per CPU")
+    args = parser.parse_args()
+
+    parity = check_parity()
+    for source, result in parity.items():
+        print(f"{source}: {result['online']} online, {result['offline']} offline, {result['different']} different")
+
+    reports = benchmark_snapshot(args.records, args.shards, args.max_workers)
+    print(f"\n{'snapshot':<10}{'records':>9}{'matches':>9}{'MB':>8}{'rec/s':>10}{'MB/min':>9}")
+    for r in reports:
+        print(
+            f"{r['snapshot']:<10}{r['records']:>9}{r['matches']:>9}{r['megabytes']:>8.0f}"
+            f"{r['records_per_second']:>10.0f}{r['megabytes_per_minute']:>9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import signal
+import argparse
+import tempfile
+import threading
+import pandas as pd
+from .fixtures import synthetic_papers
+from .mock_llm import MockLLMServer
+
+
+def benchmark_workqueue(
+        n_rows: int=200,
+        workers: list[int]=(1, 2, 4),
+        threads: int=4,
+        latency: float=0.2,
+        jitter: float=0.1,
+        rate_limit_rate: float=0.02,
+        malformed_rate: float=0.02,
+        lease_seconds: float=4,
+        kill_after: float=None
+    ) -> list[dict]:
+    """
+    Screens synthetic papers with worker processes sharing a `WorkQueue` against a `MockLLMServer`,
+    once per number of workers. With `kill_after`, one worker is killed (SIGKILL) after that many seconds,
+    so its leases expire and the other workers take over its tasks.
+    Reports rows per minute, requests per row, expired leases and whether every row was merged once.
+    """
+    from annotate.prompting import get_screening_prompt, screening_prompt_args
+    from annotate.workqueue import WorkQueue, merge_results, start_local_workers
+
+    papers = synthetic_papers(n_rows, seed=5, shared_share=0)
+    reports = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        key_paths = []
+        for k in range(max(workers)):
+            # one key per worker, like separate accounts
+            key_paths.append(os.path.join(tmp_dir, f"mock_api_key_{k}.txt"))
+            with open(key_paths[-1], "w") as f:
+                f.write(f"mock{k}")
+
+        for n_workers in workers:
+            server = MockLLMServer(latency, jitter, rate_limit_rate, malformed_rate).start()
+            df = pd.DataFrame([{"title": p["title"], "abstract": p["abstract"]} for p in papers])
+            queue_path = os.path.join(tmp_dir, f"queue_{n_workers}.sqlite")
+            queue = WorkQueue(queue_path)
+            queue.submit(df, "screened", "mock", get_screening_prompt, screening_prompt_args)
+
+            start = time.perf_counter()
+            processes = start_local_workers(
+                queue_path, key_paths, n_workers, server.url, threads=threads, lease_seconds=lease_seconds
+                )
+            killed = None
+            if kill_after and n_workers > 1:
+                killed = threading.Timer(kill_after, lambda: processes[0].send_signal(signal.SIGKILL))
+                killed.start()
+            try:
+                while queue.remaining("screened") and any(p.poll() is None for p in processes):
+                    time.sleep(0.2)
+                seconds = time.perf_counter() - start
+            finally:
+                if killed:
+                    killed.cancel()
+                for process in processes:
+                    if process.poll() is None:
+                        process.terminate()
+                    process.wait()
+                server.stop()
+
+            merged = merge_results(df, queue, "screened")
+            progress = queue.progress("screened")
+            queue.close()
+            flags = df["requires reannotation"] if "requires reannotation" in df.columns else pd.Series(dtype=object)
+            reports.append({
+                "workers": n_workers,
+                "threads": threads,
+                "rows": n_rows,
+                "annotated": int((flags == False).sum()),
+                "failed": int((flags == True).sum()),
+                "merged_once": len(merged) == len(set(merged)) == progress["done"] + progress["failed"],
+                "seconds": seconds,
+                "rows_per_minute": progress["done"] / seconds * 60 if seconds else 0.0,
+                "requests_per_row": server.stats["requests"] / n_rows,
+                "expired_leases": progress["expired_leases"],
+                "killed_worker": bool(kill_after and n_workers > 1),
+            })
+    return reports
+
+
+def print_report(reports: list[dict]):
+    print(f"{'workers':>8}{'threads':>8}{'rows/min':>10}{'req/row':>9}{'annotated':>10}{'failed':>8}{'expired':>9}{'merged once':>13}")
+    for r in reports:
+        print(
+            f"{r['workers']:>8}{r['threads']:>8}{r['rows_per_minute']:>10.0f}{r['requests_per_row']:>9.2f}"
+            f"{r['annotated']:>10}{r['failed']:>8}{r['expired_leases']:>9}{str(r['merged_once']):>13}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.workqueue_benchmark",
+        description="Benchmarks annotation worker processes sharing a work queue against a local OpenAI compatible stand-in."
+    )
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 2, 4], help="worker processes per run")
+    parser.add_argument("--threads", type=int, default=4, help="tasks answered at the same time per worker")
+    parser.add_argument("--latency", type=float, default=0.2, help="mean seconds per completion")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.02, help="share of requests answered with 429")
+    parser.add_argument("--malformed-rate", type=float, default=0.02, help="share of completions with invalid JSON")
+    parser.add_argument("--lease-seconds", type=float, default=4)
+    parser.add_argument("--kill-after", type=float, help="kill one worker after this many seconds")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    reports = benchmark_workqueue(
+        args.rows, args.workers, args.threads, args.latency, args.jitter,
+        args.rate_limit_rate, args.malformed_rate, args.lease_seconds, args.kill_after
+    )
+    print_report(reports)
+    if args.json:
+        os.makedirs(os.path.dirname(args.json) or ".", exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
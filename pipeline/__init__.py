@@ -0,0 +1,11 @@
+from .tasks import Task, run_tasks
+from .stages import build_pipeline, run_pipeline, deduplicate_df, select_df
+
+__all__ = [
+    "Task",
+    "run_tasks",
+    "build_pipeline",
+    "run_pipeline",
+    "deduplicate_df",
+    "select_df",
+]
@@ -0,0 +1,28 @@
+import json
+import argparse
+from .stages import run_pipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m pipeline",
+        description="Runs search, deduplication, screening, selection, scraping and review headless. "
+                    "Stages whose inputs did not change since the last run are skipped."
+    )
+    parser.add_argument("config", help="path to a JSON config, see pipeline/example_config.json")
+    parser.add_argument("--until", help="stop after this stage, e.g. 'dedup' to only search")
+    parser.add_argument("--force", nargs="*", default=[], help="stages to rerun even if cached")
+    parser.add_argument("--max-workers", type=int, default=4, help="stages that may run at the same time")
+    parser.add_argument("--profile", action="store_true", help="run each stage under cProfile")
+    args = parser.parse_args()
+
+    with open(args.config, encoding="utf-8") as f:
+        config = json.load(f)
+
+    status = run_pipeline(config, until=args.until, force=args.force, max_workers=args.max_workers, profile=args.profile)
+    if any(state in ("failed", "blocked") for state in status.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,611 @@
+import os
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from pandas import DataFrame, Series
+from tqdm import tqdm
+import search
+from search.utils import add_to_all_results, init_gold_titles, setup_elsevier_api
+import profiling
+from storage import read_parquet, write_parquet, PaperIndex, set_active_index, update_index
+from .tasks import Task, run_tasks
+
+RESULT_FIELDS = ["title", "authors", "doi", "abstract", "url", "year", "source"]
+
+# Maps source names to the search function and the defaults of arguments unique to it
+SEARCH_SOURCES = {
+    "acl_anthology": ("search_acl_anthology", {}),
+    "arxiv": ("search_arxiv", {"max_results": 100}),
+    "crossref": ("search_crossref", {"max_results": 100}),
+    "google_scholar": ("search_scholar", {"max_results": 100}),
+    "openalex": ("search_openalex", {"max_results": 100, "email": None}),
+    "sciencedirect": ("search_sciencedirect", {"max_results": 100}),
+    "scopus": ("search_scopus", {"max_results": 100}),
+    "semanticscholar": ("search_semanticscholar", {"max_results": 100, "semanticscholar_api_key_path": None}),
+}
+
+# The selection used in main.ipynb
+DEFAULT_SELECTION = {
+    "require": {
+        "disinformation focused": "Yes",
+        "narrative focused": "Yes",
+        "tasks present": "Yes",
+    },
+    "exclude": {
+        "shared task": "Yes",
+        "survey": "Yes",
+    },
+}
+
+
+def write_results(results: list[dict], path: str):
+    write_parquet(DataFrame(results) if results else DataFrame(columns=RESULT_FIELDS), path)
+
+
+def run_search(config: dict, source: str, out_path: str) -> bool:
+    """
+    Runs a single source search and saves its results.
+    Every source keeps its own seen titles so sources can run side by side.
+    """
+    fn_name, extra_args = SEARCH_SOURCES[source]
+    kwargs = {
+        "keywords": config["keywords"],
+        "seen_keys": set(),
+        "all_results": [],
+        "relevance_terms": config.get("relevance_terms"),
+        "min_year": config.get("min_year", 0),
+    }
+    for arg, default in extra_args.items():
+        kwargs[arg] = config.get(arg, default)
+
+    getattr(search, fn_name)(**kwargs)
+    write_results(kwargs["all_results"], out_path)
+    return True
+
+
+def run_snowball(config: dict, out_path: str, selection_path: str=None) -> bool:
+    """
+    Expands the citation graph around the gold papers, see `search.search_snowball`.
+    Configured by the "snowball" entry of the config, e.g.
+    {"sources": ["openalex"], "directions": ["backward", "forward"], "max_depth": 1, "max_results": 5000}
+    With "seed_selection": true, the papers selected in the previous run are seeds as well,
+    so each run snowballs from the relevant papers found so far.
+    """
+    options = dict(config["snowball"])
+    gold_titles_path = config.get("gold_titles_path")
+    seed_titles = init_gold_titles(gold_titles_path) if gold_titles_path else []
+    seed_dois = list(options.pop("seed_dois", None) or [])
+    if options.pop("seed_selection", False) and selection_path and os.path.exists(selection_path):
+        selected = read_parquet(selection_path, ["title", "doi"])
+        print(f"Snowballing from {len(selected)} selected papers of the previous run")
+        # DOIs are looked up in batches, titles one by one
+        has_doi = selected["doi"].fillna("").astype(str).str.strip().ne("") if "doi" in selected.columns \
+            else Series(False, index=selected.index)
+        seed_titles += list(selected.loc[~has_doi, "title"])
+        seed_dois += list(selected.loc[has_doi, "doi"])
+    all_results = []
+    search.search_snowball(
+        seed_titles=seed_titles,
+        seen_keys=set(),
+        all_results=all_results,
+        relevance_terms=config.get("relevance_terms"),
+        min_year=config.get("min_year", 0),
+        seed_dois=seed_dois,
+        semanticscholar_api_key_path=config.get("semanticscholar_api_key_path"),
+        **options,
+    )
+    write_results(all_results, out_path)
+    return True
+
+
+def merge_searches(search_paths: list[str], out_path: str, gold_titles: list[str]=None) -> bool:
+    """
+    Combines per-source results in source order, keeping the first paper with a given title.
+    """
+    seen_keys = set()
+    all_results = []
+    for path in search_paths:
+        add_to_all_results(read_parquet(path).to_dict("records"), seen_keys, all_results, gold_titles)
+    print(f"Found {len(all_results)} papers in total\n")
+    write_results(all_results, out_path)
+    return True
+
+
+@profiling.timed("dedup.deduplicate_df")
+def deduplicate_df(df: DataFrame) -> DataFrame:
+    """
+    Removes papers without abstracts and duplicates by abstract, title and non-empty DOI.
+    """
+    before = len(df)
+    df = df[df["abstract"].notna() & df["abstract"].astype(str).str.strip().ne("")]
+    print(f"Removed {before - len(df)} papers with missing or empty abstracts")
+
+    for col in ["abstract", "title"]:
+        if col in df.columns:
+            before = len(df)
+            df = df.drop_duplicates(subset=col, keep="first")
+            print(f"Removed {before - len(df)} duplicates by '{col}'")
+
+    if "doi" in df.columns:
+        has_doi = df["doi"].notna() & df["doi"].astype(str).str.strip().ne("")
+        df_with_doi = df[has_doi]
+        before = len(df_with_doi)
+        # DOIs come as URLs from some sources and bare from others
+        doi_keys = df_with_doi["doi"].astype(str).str.strip().str.lower() \
+            .str.replace(r"^(https?://(dx\.)?doi\.org/|doi:)", "", regex=True)
+        df_with_doi = df_with_doi[~doi_keys.duplicated(keep="first")]
+        df = pd.concat([df_with_doi, df[~has_doi]], ignore_index=True)
+        print(f"Removed {before - len(df_with_doi)} duplicates by 'doi'")
+
+    return df.reset_index(drop=True)
+
+
+def run_dedup(in_path: str, out_path: str) -> bool:
+    write_parquet(deduplicate_df(read_parquet(in_path)), out_path)
+    return True
+
+
+def run_enrich(config: dict, in_path: str, out_path: str, cache_path: str) -> bool:
+    """
+    Backfills missing metadata of all candidates, see `search.enrich_records`.
+    Configured by the "enrich" entry of the config, e.g. {"sources": ["openalex", "semanticscholar"]}
+    """
+    options = config["enrich"] if isinstance(config["enrich"], dict) else {}
+    df = search.enrich_df(
+        read_parquet(in_path),
+        cache_path=cache_path,
+        semanticscholar_api_key_path=config.get("semanticscholar_api_key_path"),
+        **options,
+    )
+    write_parquet(df, out_path)
+    return True
+
+
+def select_df(df: DataFrame, selection: dict) -> DataFrame:
+    """
+    Keeps rows with a source whose columns equal every `require` value
+    and differ from every `exclude` value.
+    """
+    mask = df["source"].notna()
+    for col, value in selection.get("require", {}).items():
+        mask &= df[col] == value if col in df.columns else False
+    for col, value in selection.get("exclude", {}).items():
+        if col in df.columns:
+            mask &= df[col] != value
+    return df[mask]
+
+
+def run_selection(selection: dict, in_path: str, out_path: str) -> bool:
+    selected = select_df(read_parquet(in_path), selection)
+    print(f"Selected {len(selected)} papers")
+    write_parquet(selected, out_path)
+    return True
+
+
+def resume_from(df: DataFrame, out_path: str) -> DataFrame:
+    """
+    Continues from a previous stage output: annotated rows are taken from `out_path`
+    and rows from `df` with a title not yet in that file are appended.
+    Rows that are no longer part of `df` are dropped.
+    """
+    if not os.path.exists(out_path):
+        return df.reset_index(drop=True)
+    previous = read_parquet(out_path)
+    previous = previous[previous["title"].isin(df["title"])]
+    new_rows = df[~df["title"].isin(previous["title"])]
+    print(f"Resuming with {len(previous)} known and {len(new_rows)} new papers")
+    return pd.concat([previous, new_rows], ignore_index=True)
+
+
+def markdown_cache_path(markdown_dir: str, url: str) -> str:
+    return os.path.join(markdown_dir, hashlib.sha1(url.encode()).hexdigest() + ".md")
+
+
+def fetch_markdown(row: Series, markdown_dir: str) -> str:
+    """
+    Scrapes a paper once and keeps the markdown on disk for later runs.
+    """
+    from annotate import scrape_paper
+
+    url = row.get("url")
+    if not isinstance(url, str) or url.strip() == "":
+        return ""
+    path = markdown_cache_path(markdown_dir, url)
+    if os.path.exists(path):
+        profiling.count("scrape.cache_hits")
+        with open(path, encoding="utf-8") as f:
+            md = f.read()
+        update_index("add_markdown", row.to_dict(), md)
+        return md
+
+    md = scrape_paper(row) or ""
+    if md:
+        os.makedirs(markdown_dir, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(md)
+    return md
+
+
+def annotate_in_chunks(
+        df: DataFrame,
+        config: dict,
+        prompt_fn,
+        get_prompt_args,
+        out_path: str,
+        on_chunk=None,
+        cascade: dict=None
+    ) -> tuple[DataFrame, bool]:
+    """
+    Annotates `df` in chunks and saves after each so an interrupted run loses little work.
+    Stops at the first chunk cut short by a rate limit.
+    With `cascade` (arguments of `cascade_annotate_df`, including "small_model" and a "usage"
+    dict that collects the usage of all chunks) a small model answers first and config["model"]
+    only for the escalated rows.
+    With a "priority" entry in the config, the most promising papers are annotated first
+    within a daily token budget (see `annotate_by_priority`).
+    With a "workers" entry, the rows are answered by worker processes sharing a work queue
+    (see `annotate_with_workers`), here and on other machines.
+
+    Returns the DataFrame and whether all rows are annotated.
+    """
+    from academiccloud_api import OpenAIClient
+    from annotate import annotate_df, cascade_annotate_df, annotate_by_priority, priority_scores
+
+    if len(df) == 0:
+        write_parquet(df, out_path)
+        return df, True
+
+    chunk_size = config.get("chunk_size", 20)
+    state_dir = os.path.join(os.path.dirname(out_path), ".pipeline")
+    name = os.path.splitext(os.path.basename(out_path))[0]
+    options = config["priority"] if isinstance(config.get("priority"), dict) else {}
+    priority = None
+    if config.get("priority"):
+        gold_titles_path = config.get("gold_titles_path")
+        priority = priority_scores(
+            df,
+            relevance_terms=config.get("relevance_terms"),
+            gold_titles=init_gold_titles(gold_titles_path) if gold_titles_path else None,
+            **({"weights": options["weights"]} if "weights" in options else {}),
+        )
+
+    if config.get("workers"):
+        from annotate.workqueue import annotate_with_workers
+
+        workers = config["workers"] if isinstance(config["workers"], dict) else {}
+        if options.get("daily_token_budget"):
+            print("WARNING: Workers do not keep to the daily token budget, the priority only orders the queue.")
+
+        def save_rows(df: DataFrame, rows: list):
+            write_parquet(df, out_path)
+            if on_chunk:
+                on_chunk(df.loc[rows])
+
+        df, done = annotate_with_workers(
+            df,
+            workers.get("queue_path", os.path.join(state_dir, "workqueue.sqlite")),
+            job=name,
+            model=config["model"],
+            prompt_fn=prompt_fn,
+            get_prompt_args=get_prompt_args,
+            priority=priority,
+            max_attempts=options.get("max_attempts", 3),
+            local_workers=workers.get("local_workers", 0),
+            api_key_paths=workers.get("api_key_paths", [config["llm_api_key_path"]]),
+            base_url=workers.get("base_url"),
+            threads=workers.get("threads", 4),
+            lease_seconds=workers.get("lease_seconds", 120),
+            on_merge=save_rows,
+            )
+        write_parquet(df, out_path)
+        if not done:
+            print("Some papers still require annotation. Run the pipeline again to continue.")
+        return df, done
+
+    client = OpenAIClient(config["llm_api_key_path"])
+
+    def annotate_rows(df: DataFrame, start: int, end: int) -> DataFrame:
+        if cascade:
+            df, _ = cascade_annotate_df(
+                df, client, large_model=config["model"], prompt_fn=prompt_fn, get_prompt_args=get_prompt_args,
+                start=start, end=end, **cascade
+                )
+            return df
+        return annotate_df(df, client, config["model"], prompt_fn, get_prompt_args, start, end)
+
+    if config.get("priority"):
+        def save_chunk(df: DataFrame, chunk: DataFrame):
+            write_parquet(df, out_path)
+            if on_chunk:
+                on_chunk(chunk)
+
+        df, done = annotate_by_priority(
+            df,
+            lambda chunk: annotate_rows(chunk, 0, len(chunk)),
+            state_path=os.path.join(state_dir, f"{name}_queue.json"),
+            priority=priority,
+            daily_token_budget=options.get("daily_token_budget"),
+            chunk_size=chunk_size,
+            max_attempts=options.get("max_attempts", 3),
+            on_chunk=save_chunk,
+            )
+    else:
+        for start in range(0, len(df), chunk_size):
+            end = min(start + chunk_size, len(df))
+            df = annotate_rows(df, start, end)
+            write_parquet(df, out_path)
+            if on_chunk:
+                on_chunk(df.iloc[start:end])
+            if "requires reannotation" not in df.columns or df["requires reannotation"].iloc[start:end].isna().any():
+                break
+        done = "requires reannotation" in df.columns and bool((df["requires reannotation"] == False).all())
+
+    if not done:
+        print("Some papers still require annotation. Run the pipeline again to continue.")
+    return df, done
+
+
+def run_screening(config: dict, in_path: str, out_path: str, markdown_dir: str) -> bool:
+    """
+    Screens titles and abstracts. PDFs of papers passing the selection are
+    scraped in the background while later chunks are still being screened.
+    """
+    from annotate import get_screening_prompt, screening_prompt_args, cascade_report, print_cascade_report
+
+    df = resume_from(read_parquet(in_path), out_path)
+    selection = config.get("selection", DEFAULT_SELECTION)
+    cascade = None
+    if config.get("cascade") and config.get("workers"):
+        print("WARNING: The cascade is not supported by workers, all papers are screened by the large model.")
+    elif config.get("cascade"):
+        # papers the small model would select are always checked by the large model
+        cascade = {"escalate_on": selection.get("require"), **config["cascade"], "usage": {}}
+
+    with ThreadPoolExecutor(max_workers=config.get("scrape_workers", 4)) as prefetch:
+        def prefetch_selected(chunk: DataFrame):
+            for _, row in select_df(chunk, selection).iterrows():
+                prefetch.submit(fetch_markdown, row, markdown_dir)
+
+        df, done = annotate_in_chunks(
+            df, config, get_screening_prompt, screening_prompt_args, out_path, prefetch_selected, cascade
+            )
+    if cascade and cascade["usage"]:
+        report = cascade_report(df, cascade["usage"], prices=config.get("prices"))
+        print_cascade_report(report)
+        with open(os.path.join(os.path.dirname(out_path), ".pipeline", "cascade_report.json"), "w") as f:
+            json.dump(report, f, indent=2)
+    return done
+
+
+def run_scrape(config: dict, in_path: str, out_path: str, markdown_dir: str) -> bool:
+    """
+    Adds the paper markdown to the selection, reusing anything scraped before.
+    Papers that could not be retrieved are dropped.
+    """
+    df = read_parquet(in_path)
+    rows = [row for _, row in df.iterrows()]
+    with ThreadPoolExecutor(max_workers=config.get("scrape_workers", 4)) as executor:
+        markdown = list(tqdm(
+            executor.map(lambda row: fetch_markdown(row, markdown_dir), rows),
+            desc="Scraping papers...",
+            total=len(rows)
+        ))
+    df["paper markdown"] = markdown
+    df = df[[md.strip() != "" for md in markdown]]
+    print(f"Retrieved {len(df)} of {len(rows)} papers")
+    write_parquet(df, out_path)
+    return True
+
+
+def run_review(config: dict, in_path: str, out_path: str) -> bool:
+    from annotate import get_review_prompt, review_prompt_args
+
+    # the screening marker has to be reset before the review annotations
+    df = read_parquet(in_path).drop(columns=["requires reannotation"], errors="ignore")
+    df = resume_from(df, out_path)
+    _, done = annotate_in_chunks(df, config, get_review_prompt, review_prompt_args, out_path)
+    return done
+
+
+def build_pipeline(config: dict) -> list[Task]:
+    """
+    Builds the stage graph:
+    search (one task per source) -> merge -> (enrich) -> dedup -> screen -> select -> scrape -> review
+    With a "snowball" entry in the config, snowballing from the gold papers runs as another search
+    (also from the previous selection with "seed_selection", which reruns it once the selection changed).
+    With an "enrich" entry, missing metadata is filled in before deduplication.
+    """
+    results_dir = config.get("results_dir", "results")
+    state_dir = os.path.join(results_dir, ".pipeline")
+    markdown_dir = os.path.join(state_dir, "markdown")
+    os.makedirs(state_dir, exist_ok=True)
+
+    paths = {
+        "candidates": os.path.join(results_dir, "candidate_papers.parquet"),
+        "enriched": os.path.join(results_dir, "enriched.parquet"),
+        "deduplicated": os.path.join(results_dir, "deduplicated.parquet"),
+        "screened": os.path.join(results_dir, "screened.parquet"),
+        "selection": os.path.join(results_dir, "selection.parquet"),
+        "scraped": os.path.join(results_dir, "scraped.parquet"),
+        "reviewed": os.path.join(results_dir, "reviewed.parquet"),
+    }
+    search_params = {
+        key: config.get(key)
+        for key in ["keywords", "relevance_terms", "min_year", "max_results", "email"]
+    }
+    llm_params = {key: config.get(key) for key in ["model", "chunk_size", "priority"]}
+    selection = config.get("selection", DEFAULT_SELECTION)
+
+    tasks = []
+    search_paths = []
+    for source in config.get("sources", list(SEARCH_SOURCES)):
+        if source not in SEARCH_SOURCES:
+            raise ValueError(f"Unknown source '{source}', choose from {list(SEARCH_SOURCES)}")
+        path = os.path.join(state_dir, f"search_{source}.parquet")
+        search_paths.append(path)
+        tasks.append(Task(
+            f"search_{source}",
+            lambda source=source, path=path: run_search(config, source, path),
+            outputs=[path],
+            params={"source": source, **search_params},
+        ))
+
+    gold_titles_path = config.get("gold_titles_path")
+    gold_titles = init_gold_titles(gold_titles_path) if gold_titles_path else None
+
+    if config.get("snowball"):
+        path = os.path.join(state_dir, "search_snowball.parquet")
+        search_paths.append(path)
+        tasks.append(Task(
+            "search_snowball",
+            lambda path=path: run_snowball(config, path, paths["selection"]),
+            inputs=([gold_titles_path] if gold_titles_path else [])
+                + ([paths["selection"]] if config["snowball"].get("seed_selection") else []),
+            outputs=[path],
+            params={"snowball": config["snowball"], **search_params},
+        ))
+
+    tasks += [
+        Task(
+            "merge",
+            lambda: merge_searches(search_paths, paths["candidates"], gold_titles),
+            deps=[task.name for task in tasks],
+            inputs=search_paths,
+            outputs=[paths["candidates"]],
+        ),
+    ]
+
+    dedup_input, dedup_dep = paths["candidates"], "merge"
+    if config.get("enrich"):
+        tasks.append(Task(
+            "enrich",
+            lambda: run_enrich(
+                config, paths["candidates"], paths["enriched"], os.path.join(state_dir, "metadata_cache.jsonl")
+            ),
+            deps=["merge"],
+            inputs=[paths["candidates"]],
+            outputs=[paths["enriched"]],
+            params={"enrich": config["enrich"]},
+        ))
+        dedup_input, dedup_dep = paths["enriched"], "enrich"
+
+    tasks += [
+        Task(
+            "dedup",
+            lambda: run_dedup(dedup_input, paths["deduplicated"]),
+            deps=[dedup_dep],
+            inputs=[dedup_input],
+            outputs=[paths["deduplicated"]],
+        ),
+        Task(
+            "screen",
+            lambda: run_screening(config, paths["deduplicated"], paths["screened"], markdown_dir),
+            deps=["dedup"],
+            inputs=[paths["deduplicated"]],
+            outputs=[paths["screened"]],
+            params={**llm_params, "selection": selection, "cascade": config.get("cascade")},
+        ),
+        Task(
+            "select",
+            lambda: run_selection(selection, paths["screened"], paths["selection"]),
+            deps=["screen"],
+            inputs=[paths["screened"]],
+            outputs=[paths["selection"]],
+            params={"selection": selection},
+        ),
+        Task(
+            "scrape",
+            lambda: run_scrape(config, paths["selection"], paths["scraped"], markdown_dir),
+            deps=["select"],
+            inputs=[paths["selection"]],
+            outputs=[paths["scraped"]],
+        ),
+        Task(
+            "review",
+            lambda: run_review(config, paths["scraped"], paths["reviewed"]),
+            deps=["scrape"],
+            inputs=[paths["scraped"]],
+            outputs=[paths["reviewed"]],
+            params=llm_params,
+        ),
+    ]
+    return tasks
+
+
+def index_outputs(index: PaperIndex, tasks: list[Task], status: dict):
+    """
+    Adds the outputs of stages that were skipped as up to date to the index,
+    stages that ran have added their results while running.
+    """
+    for task in tasks:
+        if status.get(task.name) != "cached":
+            continue
+        for path in task.outputs:
+            if path.endswith(".parquet") and os.path.exists(path):
+                index.add_df(read_parquet(path))
+    index.optimize()
+
+
+def run_pipeline(
+        config: dict,
+        until: str=None,
+        force: list[str]=(),
+        max_workers: int=4,
+        profile: bool=False
+    ) -> dict:
+    """
+    Runs the pipeline described by `config`, skipping stages whose inputs have not changed.
+    `until` stops after the named stage (e.g. "dedup" to only search).
+    Timers and counters of the run are printed and saved to .pipeline/run_report.json.
+    With "index" in the config, candidates, annotations and scraped papers are added to a full-text
+    index (`PaperIndex`) at results/papers.sqlite, or at the path given as "index".
+    With `profile` (or "profile": true in the config) each stage is also run under cProfile
+    and its stats are saved to .pipeline/profiles/<stage>.prof.
+    """
+    state_dir = os.path.join(config.get("results_dir", "results"), ".pipeline")
+    profiling.reset()
+    if profile or config.get("profile"):
+        profiling.enable_cprofile(os.path.join(state_dir, "profiles"))
+
+    if any(source in config.get("sources", list(SEARCH_SOURCES)) for source in ["scopus", "sciencedirect"]):
+        setup_elsevier_api(config.get("elsevier_api_key_path"))
+
+    index = None
+    if config.get("index"):
+        index_path = config["index"] if isinstance(config["index"], str) \
+            else os.path.join(config.get("results_dir", "results"), "papers.sqlite")
+        index = PaperIndex(index_path)
+        set_active_index(index)
+
+    tasks = build_pipeline(config)
+    if until:
+        names = {task.name: task for task in tasks}
+        if until not in names:
+            raise ValueError(f"Unknown stage '{until}', choose from {list(names)}")
+        keep = set()
+        stack = [until]
+        while stack:
+            name = stack.pop()
+            if name not in keep:
+                keep.add(name)
+                stack += names[name].deps
+        tasks = [task for task in tasks if task.name in keep]
+
+    manifest_path = os.path.join(state_dir, "manifest.json")
+    try:
+        status = run_tasks(tasks, manifest_path, force=force, max_workers=max_workers)
+    finally:
+        profiling.disable_cprofile()
+        if index is not None:
+            set_active_index(None)
+    if index is not None:
+        with profiling.timer("index.update"):
+            index_outputs(index, tasks, status)
+        index.close()
+    for name, state in status.items():
+        print(f"{name:<28}{state}")
+    print()
+    profiling.save_report(os.path.join(state_dir, "run_report.json"))
+    profiling.print_report()
+    return status
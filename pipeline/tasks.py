@@ -0,0 +1,145 @@
+import os
+import json
+import hashlib
+from typing import Callable
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from profiling import profile_stage, cprofile_enabled
+
+
+def file_hash(path: str) -> str:
+    """
+    Content hash of a file, or "missing" if it does not exist.
+    """
+    if not os.path.exists(path):
+        return "missing"
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Task:
+    def __init__(
+            self,
+            name: str,
+            fn: Callable[[], bool],
+            deps: list[str]=(),
+            inputs: list[str]=(),
+            outputs: list[str]=(),
+            params: dict=None
+        ):
+        """
+        One cached pipeline stage.
+
+            name:     unique stage name
+            fn:       runs the stage, returns False if work is left for a later run
+            deps:     names of stages that must finish first
+            inputs:   files whose contents are part of the cache key
+            outputs:  files that must exist for a cached result to be reused
+            params:   JSON-serializable settings that are part of the cache key
+        """
+        self.name = name
+        self.fn = fn
+        self.deps = list(deps)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = params or {}
+
+    def input_hash(self) -> str:
+        digest = hashlib.sha256()
+        digest.update(json.dumps(self.params, sort_keys=True, default=str).encode())
+        for path in self.inputs:
+            digest.update(f"{path}:{file_hash(path)}".encode())
+        return digest.hexdigest()
+
+
+def run_task(task: Task):
+    with profile_stage(task.name):
+        return task.fn()
+
+
+def run_tasks(
+        tasks: list[Task],
+        manifest_path: str,
+        force: list[str]=(),
+        max_workers: int=4
+    ) -> dict:
+    """
+    Runs tasks in dependency order, overlapping tasks that do not depend on each other.
+    A task is skipped if its input hash, recorded in the manifest, is unchanged and it
+    previously completed. Tasks reporting unfinished work are rerun next time.
+
+    Returns a dict mapping task names to "cached", "done", "incomplete", "failed" or "blocked".
+    With cProfile enabled, tasks run one at a time, since only one profiler can be active.
+    """
+    if cprofile_enabled():
+        max_workers = 1
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+
+    def save_manifest():
+        os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+        tmp_path = manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, manifest_path)
+
+    pending = {task.name: task for task in tasks}
+    status = {}
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            progressed = False
+            for name, task in list(pending.items()):
+                if any(status.get(dep) in ("failed", "blocked") for dep in task.deps):
+                    print(f"Skipping '{name}': a dependency failed")
+                    status[name] = "blocked"
+                    del pending[name]
+                    progressed = True
+                    continue
+                if not all(dep in status for dep in task.deps):
+                    continue
+
+                del pending[name]
+                progressed = True
+                key = task.input_hash()
+                entry = manifest.get(name, {})
+                deps_complete = all(status[dep] in ("cached", "done") for dep in task.deps)
+                if (
+                    name not in force
+                    and deps_complete
+                    and entry.get("input_hash") == key
+                    and entry.get("complete")
+                    and all(os.path.exists(path) for path in task.outputs)
+                ):
+                    print(f"Skipping '{name}': inputs unchanged")
+                    status[name] = "cached"
+                    continue
+
+                print(f"Running '{name}'...")
+                running[executor.submit(run_task, task)] = (task, key, deps_complete)
+
+            if not running:
+                if pending and not progressed:
+                    raise ValueError(f"Unresolvable dependencies for: {', '.join(pending)}")
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                task, key, deps_complete = running.pop(future)
+                try:
+                    complete = future.result() is not False and deps_complete
+                except Exception as e:
+                    print(f"Stage '{task.name}' failed: {e}")
+                    status[task.name] = "failed"
+                    continue
+
+                status[task.name] = "done" if complete else "incomplete"
+                manifest[task.name] = {"input_hash": key, "complete": complete}
+                save_manifest()
+
+    return status
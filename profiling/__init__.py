@@ -0,0 +1,33 @@
+from .recorder import (
+    timer,
+    timed,
+    timed_iter,
+    Stopwatch,
+    count,
+    scope,
+    reset,
+    get_report,
+    save_report,
+    print_report,
+    profile_stage,
+    enable_cprofile,
+    cprofile_enabled,
+    disable_cprofile,
+)
+
+__all__ = [
+    "timer",
+    "timed",
+    "timed_iter",
+    "Stopwatch",
+    "count",
+    "scope",
+    "reset",
+    "get_report",
+    "save_report",
+    "print_report",
+    "profile_stage",
+    "enable_cprofile",
+    "cprofile_enabled",
+    "disable_cprofile",
+]
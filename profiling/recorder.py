@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import cProfile
+import threading
+import contextvars
+from functools import wraps
+from contextlib import contextmanager
+
+
+class Recorder:
+    def __init__(self):
+        """
+        Thread-safe collection of named timers and counters for one run.
+        """
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.timers = {}
+            self.counters = {}
+            self.started = time.time()
+
+    def add_time(self, name: str, seconds: float, calls: int=1, longest: float=None):
+        longest = seconds if longest is None else longest
+        with self._lock:
+            stats = self.timers.get(name)
+            if stats is None:
+                self.timers[name] = [calls, seconds, longest]
+            else:
+                stats[0] += calls
+                stats[1] += seconds
+                if longest > stats[2]:
+                    stats[2] = longest
+
+    def count(self, name: str, n: float=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def report(self) -> dict:
+        with self._lock:
+            timers = {
+                name: {
+                    "calls": calls,
+                    "seconds": seconds,
+                    "mean_ms": seconds / calls * 1000,
+                    "max_ms": longest * 1000,
+                }
+                for name, (calls, seconds, longest) in sorted(self.timers.items())
+            }
+            return {
+                "started": self.started,
+                "wall_seconds": time.time() - self.started,
+                "timers": timers,
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+
+recorder = Recorder()
+
+# Recorders of the `scope` blocks the current code runs in
+_scopes = contextvars.ContextVar("profiling_scopes", default=())
+
+
+def _add_time(name: str, seconds: float, calls: int=1, longest: float=None):
+    recorder.add_time(name, seconds, calls, longest)
+    for scoped in _scopes.get():
+        scoped.add_time(name, seconds, calls, longest)
+
+# Set READING_LIST_PROFILE=1 or call enable_cprofile() to profile each stage with cProfile
+_cprofile_dir = "results/profiles" if os.environ.get("READING_LIST_PROFILE") else None
+
+
+@contextmanager
+def timer(name: str):
+    """
+    Adds the time spent in the block to the timer `name`.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _add_time(name, time.perf_counter() - start)
+
+
+def timed(name: str):
+    """
+    Decorator version of `timer`.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _add_time(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def timed_iter(iterable, name: str):
+    """
+    Yields from `iterable` while timing each step, e.g. for paginated API results
+    that only hit the network when the next page is needed.
+    """
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _add_time(name, time.perf_counter() - start)
+        yield item
+
+
+class Stopwatch:
+    def __init__(self, name: str, fn):
+        """
+        Calls `fn` and adds up the time of the calls in this object, e.g. for a check run on every record
+        of a search. `record()` adds them to the timer `name` at once, so hot loops do not take the
+        recorder's lock on every call. Use one Stopwatch per loop and thread.
+        """
+        self.name = name
+        self.fn = fn
+        self.calls = 0
+        self.seconds = 0.0
+        self.longest = 0.0
+
+    def __call__(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self.fn(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.calls += 1
+            self.seconds += elapsed
+            if elapsed > self.longest:
+                self.longest = elapsed
+
+    def record(self):
+        if self.calls:
+            _add_time(self.name, self.seconds, self.calls, self.longest)
+        self.calls, self.seconds, self.longest = 0, 0.0, 0.0
+
+
+def count(name: str, n: float=1):
+    recorder.count(name, n)
+    for scoped in _scopes.get():
+        scoped.count(name, n)
+
+
+@contextmanager
+def scope():
+    """
+    Also records the timers and counters of the block in a separate `Recorder`, e.g. the requests and
+    tokens of one annotation call without those of other calls running at the same time.
+    Work the block hands to other threads is included if it runs in a copy of the context,
+    e.g. `executor.submit(contextvars.copy_context().run, fn, ...)`.
+    """
+    scoped = Recorder()
+    token = _scopes.set(_scopes.get() + (scoped,))
+    try:
+        yield scoped
+    finally:
+        _scopes.reset(token)
+
+
+def reset():
+    recorder.reset()
+
+
+def get_report() -> dict:
+    return recorder.report()
+
+
+def save_report(path: str) -> dict:
+    """
+    Writes the report of the current run as JSON and returns it.
+    """
+    run_report = get_report()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(run_report, f, indent=2)
+    return run_report
+
+
+def print_report(top: int=None):
+    """
+    Prints timers sorted by total time, followed by the counters.
+    """
+    run_report = get_report()
+    timers = sorted(run_report["timers"].items(), key=lambda item: -item[1]["seconds"])[:top]
+    print(f"Run time: {run_report['wall_seconds']:.1f}s\n")
+    print(f"{'timer':<44}{'calls':>9}{'total s':>10}{'mean ms':>10}{'max ms':>10}")
+    for name, stats in timers:
+        print(f"{name:<44}{stats['calls']:>9}{stats['seconds']:>10.2f}{stats['mean_ms']:>10.2f}{stats['max_ms']:>10.1f}")
+    if run_report["counters"]:
+        print(f"\n{'counter':<44}{'value':>12}")
+        for name, value in run_report["counters"].items():
+            print(f"{name:<44}{value:>12.0f}")
+
+
+def enable_cprofile(out_dir: str="results/profiles"):
+    """
+    Makes every `profile_stage` also run cProfile and save the stats to `out_dir`.
+    """
+    global _cprofile_dir
+    _cprofile_dir = out_dir
+
+
+def cprofile_enabled() -> bool:
+    return _cprofile_dir is not None
+
+
+def disable_cprofile():
+    global _cprofile_dir
+    _cprofile_dir = None
+
+
+@contextmanager
+def profile_stage(name: str):
+    """
+    Times a pipeline stage as "stage.<name>". With cProfile enabled, also profiles the
+    current thread and saves the stats to <name>.prof (view with `python -m pstats` or snakeviz).
+    Only one profiler can be active at a time (from Python 3.12 on), so profiled stages must not overlap.
+    """
+    profiler = None
+    if _cprofile_dir:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        with timer(f"stage.{name}"):
+            yield
+    finally:
+        if profiler:
+            profiler.disable()
+            os.makedirs(_cprofile_dir, exist_ok=True)
+            profiler.dump_stats(os.path.join(_cprofile_dir, f"{name}.prof"))
@@ -1,17 +1,31 @@
-from .utils import setup_elsevier_api, init_gold_titles, nr_gold_papers_found
-from .acl import search_acl_anthology
-from .arxiv import search_arxiv
-from .crossref import search_crossref
-from .google_scholar import search_scholar
-from .openalex import search_openalex
-from .sciencedirect import search_sciencedirect
-from .scopus import search_scopus
-from .semantic_scholar import search_semanticscholar
+import importlib
+
+# Backends are imported on first use, so scripts only pay for the clients they need
+_LAZY = {
+    "setup_elsevier_api": "utils",
+    "init_gold_titles": "utils",
+    "nr_gold_papers_found": "utils",
+    "search_acl_anthology": "acl",
+    "load_acl_anthology": "acl_loader",
+    "search_arxiv": "arxiv",
+    "search_crossref": "crossref",
+    "search_scholar": "google_scholar",
+    "search_openalex": "openalex",
+    "search_sciencedirect": "sciencedirect",
+    "search_scopus": "scopus",
+    "search_semanticscholar": "semantic_scholar",
+    "search_snowball": "snowball",
+    "search_openalex_snapshot": "snapshot",
+    "search_arxiv_snapshot": "snapshot",
+    "enrich_records": "enrich",
+    "enrich_df": "enrich",
+}
 
 __all__ = [
     "setup_elsevier_api",
     "init_gold_titles",
     "search_acl_anthology",
+    "load_acl_anthology",
     "search_arxiv",
     "search_crossref",
     "search_scholar",
@@ -19,5 +33,22 @@ __all__ = [
     "search_sciencedirect",
     "search_scopus",
     "search_semanticscholar",
+    "search_snowball",
+    "search_openalex_snapshot",
+    "search_arxiv_snapshot",
+    "enrich_records",
+    "enrich_df",
     "nr_gold_papers_found",
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name: str):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_LAZY[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,8 +1,10 @@
-from acl_anthology import Anthology
-from .utils import is_relevant, add_to_all_results
+from .utils import is_relevant, add_to_all_results, contains_keywords
+from profiling import timer, timed, Stopwatch, count
+from .acl_loader import load_acl_anthology
 from tqdm import tqdm
 
 
+@timed("search.acl_anthology")
 def search_acl_anthology(
         keywords: list[str],
         seen_keys: list[str],
@@ -13,45 +15,35 @@ def search_acl_anthology(
         ):
     """
     Searching ACL Anthology works a little differently. There is no API-based search.
-    The client object presents all papers (>100.000) with metadata (do not ask me how).
-    We can perform keyword matching directly on all titles and abstracts.
+    The Anthology repo holds all papers (>100.000) with metadata, which `load_acl_anthology`
+    parses once per commit. We can perform keyword matching directly on all titles and abstracts.
     """
-    def contains_keywords(search_text: str, keywords: list[str]):
-        search_text = search_text.lower()
-        for keyword in keywords:
-            words = keyword.lower().split()
-            if all(word in search_text for word in words):
-                return True
-        return False
-    acl_client = Anthology.from_repo()
+    with timer("search.acl_anthology.load"):
+        papers = load_acl_anthology()
 
     acl_results = []
-    for paper in tqdm(acl_client.papers(), desc="Searching ACL Anthology..."):
-        if not all([paper.pdf, paper.abstract, paper.pdf and paper.pdf.url]):
-            continue
-
-        year = int(paper.year) or 0
+    relevant = Stopwatch("search.is_relevant", is_relevant)
+    for title, abstract, year, authors, doi, url in tqdm(papers, desc="Searching ACL Anthology..."):
+        count("search.acl_anthology.records")
         if year < min_year:
             continue
 
-        title = str(paper.title)
-        abstract = str(paper.abstract)
-
         if not contains_keywords(f"{title} {abstract}", keywords):
             continue
 
-        if relevance_terms and not is_relevant(title, abstract, relevance_terms):
+        if relevance_terms and not relevant(title, abstract, relevance_terms):
             continue
 
         acl_results.append({
             "title": title,
-            "authors": [a.name for a in paper.authors],
-            "doi": paper.doi or "",
+            "authors": authors,
+            "doi": doi,
             "abstract": abstract,
-            "url": paper.pdf.url,
+            "url": url,
             "year": year,
             "source": "acl_anthology"
         })
 
     print(f"Found {len(acl_results)} candidate papers\n")
+    relevant.record()
     add_to_all_results(acl_results, seen_keys, all_results, gold_titles)
@@ -0,0 +1,144 @@
+import os
+import pickle
+import hashlib
+from glob import glob
+from concurrent.futures import ProcessPoolExecutor
+from tqdm import tqdm
+from profiling import timer, count
+
+ACL_REPO_URL = "https://github.com/acl-org/acl-anthology.git"
+ACL_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "reading_list")
+
+# Fields kept per paper, in this order. Bump CACHE_FORMAT when they change
+FIELDS = ["title", "abstract", "year", "authors", "doi", "url"]
+CACHE_FORMAT = 1
+
+# Papers loaded in this process by (repo_path, repo_url)
+_loaded = {}
+
+
+def _project_collection(task: tuple) -> tuple[list[tuple], int, bool]:
+    """
+    Parses one collection file in a worker process and keeps the fields in `FIELDS`
+    of papers with an abstract and a PDF. Returns them, the number of papers parsed
+    and whether the whole collection could be parsed.
+    """
+    from acl_anthology import Anthology
+    from acl_anthology.config import config
+
+    datadir, collection_id = task
+    # `PDFReference.url` resolves this template for every paper, which takes most of the parsing time
+    pdf_template = config["pdf_location_template"]
+    # a fresh index per file, so workers do not keep every parsed collection in memory
+    collection = Anthology(datadir, verbose=False).collections.get(collection_id)
+    papers = []
+    parsed = 0
+    try:
+        for volume in collection.volumes():
+            for paper in volume.papers():
+                parsed += 1
+                pdf = paper.pdf
+                if not all([pdf, paper.abstract, pdf and pdf.name]):
+                    continue
+                papers.append((
+                    str(paper.title),
+                    str(paper.abstract),
+                    int(paper.year) or 0,
+                    [a.name.as_first_last() for a in paper.authors],
+                    paper.doi or "",
+                    pdf.name if "://" in pdf.name else pdf_template.format(pdf.name),
+                ))
+    except Exception as e:
+        print(f"WARNING: Could not parse ACL Anthology collection {collection_id}: {e}")
+        return papers, parsed, False
+    return papers, parsed, True
+
+
+def _data_version(datadir: str) -> str:
+    """
+    Commit of the Anthology repo, or for a data folder outside of git the number of files and the last change.
+    """
+    try:
+        from git import Repo
+
+        return Repo(os.path.dirname(os.path.abspath(datadir))).head.commit.hexsha
+    except Exception:
+        files = glob(os.path.join(datadir, "xml", "*.xml"))
+        return f"files{len(files)}-{max((os.path.getmtime(f) for f in files), default=0):.0f}"
+
+
+def _parse_anthology(datadir: str, max_workers: int=None) -> tuple[list[tuple], int]:
+    """
+    Papers of all collections and the number of collections that could not be parsed.
+    """
+    collection_ids = sorted(
+        os.path.basename(path)[:-len(".xml")] for path in glob(os.path.join(datadir, "xml", "*.xml"))
+    )
+    tasks = [(str(datadir), collection_id) for collection_id in collection_ids]
+    papers = []
+    parsed = 0
+    failed = 0
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(_project_collection, tasks, chunksize=8)
+        for collection_papers, n, complete in tqdm(results, total=len(tasks), desc="Parsing ACL Anthology..."):
+            papers += collection_papers
+            parsed += n
+            failed += not complete
+    count("search.acl_anthology.parsed", parsed)
+    return papers, failed
+
+
+def load_acl_anthology(
+        repo_path: str=None,
+        repo_url: str=ACL_REPO_URL,
+        update: bool=True,
+        cache_dir: str=ACL_CACHE_DIR,
+        max_workers: int=None
+    ) -> list[tuple]:
+    """
+    Papers of the ACL Anthology that have an abstract and a PDF, as tuples of `FIELDS`.
+
+    The repo is cloned or pulled like with `Anthology.from_repo` (to `repo_path` if given,
+    with `update=False` an existing `repo_path` is used as it is). The XML file of each
+    collection is parsed in a process pool and the papers are cached in `cache_dir`
+    for the current commit, so the Anthology is only parsed again after it changed.
+    Within a process, the papers are loaded and pulled only once.
+    """
+    key = (repo_path, repo_url)
+    if key in _loaded:
+        return _loaded[key]
+
+    if update or repo_path is None:
+        from acl_anthology import Anthology
+
+        with timer("search.acl_anthology.pull"):
+            datadir = str(Anthology.from_repo(repo_url, repo_path, verbose=False).datadir)
+    else:
+        datadir = os.path.join(repo_path, "data")
+
+    version = _data_version(datadir)
+    # checkouts in different places share the cache dir, each keeps its own cache
+    checkout = hashlib.sha1(os.path.abspath(datadir).encode()).hexdigest()[:8]
+    cache_path = os.path.join(cache_dir, f"acl_anthology_{checkout}_{version[:16]}_v{CACHE_FORMAT}.pickle")
+    if os.path.exists(cache_path):
+        with timer("search.acl_anthology.read_cache"), open(cache_path, "rb") as f:
+            papers = pickle.load(f)
+        count("search.acl_anthology.cache_hits")
+    else:
+        with timer("search.acl_anthology.parse"):
+            papers, failed = _parse_anthology(datadir, max_workers)
+        if failed:
+            # parsed again next time instead of caching the missing collections for this commit
+            print(f"WARNING: {failed} ACL Anthology collections could not be parsed, the papers are not cached")
+        else:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(cache_path + ".tmp", "wb") as f:
+                pickle.dump(papers, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(cache_path + ".tmp", cache_path)
+            # papers of older commits of this checkout are not needed anymore
+            for path in glob(os.path.join(cache_dir, f"acl_anthology_{checkout}_*.pickle")):
+                if path != cache_path:
+                    os.remove(path)
+
+    _loaded[key] = papers
+    return papers
@@ -1,8 +1,34 @@
 import arxiv
 from .utils import is_relevant, add_to_all_results
+from profiling import timed, timed_iter, Stopwatch, count
 from tqdm import tqdm
 
+# The arxiv library sends through its own requests session, not the shared HTTP pool
+# of academiccloud_api, so one client is used for all searches to keep its connections
+# alive and respect its request delay across calls
+_arxiv_client = None
 
+
+def get_arxiv_client() -> arxiv.Client:
+    global _arxiv_client
+    if _arxiv_client is None:
+        _arxiv_client = arxiv.Client()
+    return _arxiv_client
+
+
+def arxiv_record(paper: arxiv.Result) -> dict:
+    return {
+        "title": str(paper.title),
+        "authors": [str(a) for a in paper.authors],
+        "doi": paper.doi or "",
+        "abstract": paper.summary,
+        "url": paper.pdf_url,
+        "year": paper.published.year,
+        "source": "arxiv"
+    }
+
+
+@timed("search.arxiv")
 def search_arxiv(
         keywords: list[str],
         seen_keys: list[str],
@@ -17,6 +43,7 @@ def search_arxiv(
     """
 
     arxiv_results = []
+    relevant = Stopwatch("search.is_relevant", is_relevant)
     for keyword in tqdm(keywords, desc="Searching arXiv..."):
         arxiv_results = []
         search = arxiv.Search(
@@ -26,29 +53,23 @@ def search_arxiv(
         )
 
         try:
-            for paper in arxiv.Client().results(search):
+            for paper in timed_iter(get_arxiv_client().results(search), "search.arxiv.fetch"):
+                count("search.arxiv.records")
                 if paper.published.year < min_year:
                     continue
 
-                title = str(paper.title)
-                abstract = str(paper.summary).replace("\n", " ")
+                record = arxiv_record(paper)
+                abstract = record["abstract"].replace("\n", " ")
 
-                if relevance_terms and not is_relevant(title, abstract, relevance_terms):
+                if relevance_terms and not relevant(record["title"], abstract, relevance_terms):
                     continue
-                
-                arxiv_results.append({
-                    "title": title,
-                    "authors": [str(a) for a in paper.authors],
-                    "doi": paper.doi or "",
-                    "abstract": paper.summary,
-                    "url": paper.pdf_url,
-                    "year": paper.published.year,
-                    "source": "arxiv"
-                })
+
+                arxiv_results.append(record)
 
         except Exception as e:
             print(e)
             continue
 
     print(f"Found {len(arxiv_results)} candidate papers\n")
+    relevant.record()
     add_to_all_results(arxiv_results, seen_keys, all_results, gold_titles)
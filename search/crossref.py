@@ -1,9 +1,10 @@
 from crossref_commons.iteration import iterate_publications_as_json
-from .utils import is_relevant, add_to_all_results
+from .utils import is_relevant, add_to_all_results, clean_jats_abstract
+from profiling import timed, timed_iter, Stopwatch, count
 from tqdm import tqdm
-import re
 
 
+@timed("search.crossref")
 def search_crossref(
         keywords: list[str],
         seen_keys: list[str],
@@ -18,12 +19,14 @@ def search_crossref(
     """
 
     crossref_results = []
+    relevant = Stopwatch("search.is_relevant", is_relevant)
     for keyword in tqdm(keywords, desc="Searching Crossref..."):
-        iter = iterate_publications_as_json(
+        # pages are only downloaded when the iterator runs out of buffered records
+        iter = timed_iter(iterate_publications_as_json(
             max_results=max_results,
             queries={'query.bibliographic': keyword},
             filter={"has-full-text": "true"}
-        )
+        ), "search.crossref.fetch")
 
         while True:
             try:
@@ -33,21 +36,20 @@ def search_crossref(
                 continue
             except StopIteration:
                 break
+            count("search.crossref.records")
 
             year = paper.get("issued", {}).get("date-parts", [[None]])[0][0]
             if year is None or year < min_year:
                 continue
 
             title = (paper.get("title", [""])[0] or "")
-            raw_abstract = paper.get("abstract", "")
-            match = re.search(r"<jats:p>(.*?)</jats:p>", raw_abstract or "", re.DOTALL)
-            abstract = (match.group(1).strip() if match else None)
+            abstract = clean_jats_abstract(paper.get("abstract", ""))
             url = paper.get("link", "")[0].get("URL", None)
 
             if not all([title, abstract, url]):
                 continue
                 
-            if relevance_terms and not is_relevant(title, abstract, relevance_terms):
+            if relevance_terms and not relevant(title, abstract, relevance_terms):
                 continue
 
             crossref_results.append({
@@ -64,4 +66,5 @@ def search_crossref(
             })
 
     print(f"Found {len(crossref_results)} candidate papers\n")
+    relevant.record()
     add_to_all_results(crossref_results, seen_keys, all_results, gold_titles)
@@ -0,0 +1,217 @@
+import os
+import re
+import json
+from time import sleep
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pandas as pd
+from pandas import DataFrame
+from pyalex import Works as PyAlexWorks
+from tqdm import tqdm
+from profiling import timer, timed, count
+from storage import normalize_authors
+from .utils import reconstruct_inverted_abstract
+from .semantic_scholar import get_semanticscholar_client
+from .snowball import batched, bare_doi, OPENALEX_BATCH_SIZE, SEMANTICSCHOLAR_BATCH_SIZE
+
+ENRICHED_FIELDS = ["doi", "year", "authors", "abstract", "citations"]
+
+OPENALEX_FIELDS = ["id", "doi", "publication_year", "authorships", "abstract_inverted_index", "cited_by_count"]
+SEMANTICSCHOLAR_FIELDS = ["externalIds", "year", "authors", "abstract", "citationCount"]
+
+
+class MetadataCache:
+    def __init__(self, path: str=None):
+        """
+        Lookups by key (e.g. "openalex:doi:10.18653/v1/2020.acl-main.1") kept in a JSON lines file,
+        including papers that were not found, so no identifier is requested twice.
+        Without a `path` the cache only lives in memory.
+        """
+        self.path = path
+        self.entries = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # last line of an interrupted run
+                        continue
+                    self.entries[entry["key"]] = entry["metadata"]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def get(self, key: str) -> dict:
+        return self.entries.get(key)
+
+    def update(self, entries: dict):
+        self.entries.update(entries)
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                for key, metadata in entries.items():
+                    f.write(json.dumps({"key": key, "metadata": metadata}) + "\n")
+
+
+def semanticscholar_id(record: dict) -> str:
+    """
+    Identifier for the Semantic Scholar batch API: the DOI, else the arXiv or ACL Anthology id from the URL.
+    """
+    doi = record.get("doi")
+    if isinstance(doi, str) and doi.strip():
+        return f"DOI:{bare_doi(doi)}"
+    url = record.get("url")
+    if not isinstance(url, str):
+        return None
+    match = re.search(r"arxiv\.org/(?:abs|pdf)/([^/?#]+?)(?:v\d+)?(?:\.pdf)?$", url)
+    if match:
+        return f"ARXIV:{match.group(1)}"
+    match = re.search(r"aclanthology\.org/([^/?#]+?)(?:\.pdf)?/?$", url)
+    if match:
+        return f"ACL:{match.group(1)}"
+    return None
+
+
+def _openalex_metadata(work: dict) -> dict:
+    return {
+        "doi": bare_doi(work["doi"]) if work.get("doi") else None,
+        "year": work.get("publication_year"),
+        "authors": [a["author"]["display_name"] for a in work.get("authorships") or []],
+        "abstract": reconstruct_inverted_abstract(work.get("abstract_inverted_index")),
+        "citations": work.get("cited_by_count"),
+    }
+
+
+def _semanticscholar_metadata(paper) -> dict:
+    external_ids = getattr(paper, "externalIds", None) or {}
+    return {
+        "doi": bare_doi(external_ids["DOI"]) if external_ids.get("DOI") else None,
+        "year": getattr(paper, "year", None),
+        "authors": [a.name for a in getattr(paper, "authors", None) or []],
+        "abstract": getattr(paper, "abstract", None),
+        "citations": getattr(paper, "citationCount", None),
+    }
+
+
+def _lookup_openalex(dois: list[str]) -> dict:
+    with timer("search.enrich.openalex.fetch"):
+        works = PyAlexWorks().filter_or(doi=dois).select(OPENALEX_FIELDS).get(per_page=len(dois))
+    found = {bare_doi(work["doi"]): _openalex_metadata(work) for work in works if work.get("doi")}
+    return {f"openalex:doi:{doi}": found.get(doi) for doi in dois}
+
+
+def _lookup_semanticscholar(client, ids: list[str]) -> dict:
+    with timer("search.enrich.semanticscholar.fetch"):
+        papers = client.get_papers(ids, fields=SEMANTICSCHOLAR_FIELDS)
+    # the batch API drops unknown ids, so papers are matched by their external ids
+    found = {}
+    for paper in papers:
+        external_ids = getattr(paper, "externalIds", None) or {}
+        for prefix, name in [("DOI", "DOI"), ("ARXIV", "ArXiv"), ("ACL", "ACL")]:
+            if external_ids.get(name):
+                value = bare_doi(external_ids[name]) if prefix == "DOI" else external_ids[name]
+                found[f"{prefix}:{value}"] = _semanticscholar_metadata(paper)
+    return {f"semanticscholar:{paper_id}": found.get(paper_id) for paper_id in ids}
+
+
+def _missing(value, field: str=None) -> bool:
+    if isinstance(value, str):
+        return value.strip() == ""
+    if hasattr(value, "__len__"):
+        return len(value) == 0
+    if value is None or pd.isna(value):
+        return True
+    # some backends use 0 for an unknown year, while 0 citations is a valid count
+    return field == "year" and value == 0
+
+
+def _needs_enrichment(record: dict) -> bool:
+    return any(_missing(record.get(field), field) for field in ENRICHED_FIELDS)
+
+
+def _fill(record: dict, metadata: dict) -> int:
+    """
+    Fills missing fields of `record` from `metadata` and replaces shorter author lists.
+    Returns the number of fields changed.
+    """
+    changed = 0
+    for field in ENRICHED_FIELDS:
+        value = metadata.get(field)
+        if _missing(value, field):
+            continue
+        current = record.get(field)
+        if _missing(current, field) or (field == "authors" and len(value) > len(current)):
+            record[field] = value
+            changed += 1
+    return changed
+
+
+@timed("search.enrich")
+def enrich_records(
+        records: list[dict],
+        cache_path: str=None,
+        sources: list[str]=("openalex", "semanticscholar"),
+        semanticscholar_api_key_path: str=None,
+        max_workers: int=8,
+    ) -> list[dict]:
+    """
+    Backfills missing DOIs, years, authors and abstracts of search results and adds
+    a "citations" count. Papers with a DOI are looked up on OpenAlex (50 DOIs per request),
+    whatever is still missing is looked up with the Semantic Scholar batch API
+    (500 DOIs, arXiv or ACL Anthology ids per request). Lookups are cached in `cache_path`.
+
+    Returns the records, which are updated in place.
+    """
+    cache = MetadataCache(cache_path)
+    changed = 0
+
+    if "openalex" in sources:
+        dois = list(dict.fromkeys(
+            bare_doi(r["doi"]) for r in records
+            if _needs_enrichment(r) and isinstance(r.get("doi"), str) and r["doi"].strip()
+        ))
+        todo = [doi for doi in dois if f"openalex:doi:{doi}" not in cache]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            jobs = [executor.submit(_lookup_openalex, batch) for batch in batched(todo, OPENALEX_BATCH_SIZE)]
+            for job in tqdm(as_completed(jobs), total=len(jobs), desc="Enriching from OpenAlex..."):
+                try:
+                    cache.update(job.result())
+                except Exception as e:
+                    print(f"WARNING: OpenAlex lookup failed: {e}")
+        for record in records:
+            doi = record.get("doi")
+            if isinstance(doi, str) and doi.strip() and _needs_enrichment(record):
+                changed += _fill(record, cache.get(f"openalex:doi:{bare_doi(doi)}") or {})
+
+    if "semanticscholar" in sources:
+        ids = list(dict.fromkeys(
+            semanticscholar_id(r) for r in records if _needs_enrichment(r) and semanticscholar_id(r)
+        ))
+        todo = [paper_id for paper_id in ids if f"semanticscholar:{paper_id}" not in cache]
+        if todo:
+            client = get_semanticscholar_client(semanticscholar_api_key_path, timeout=30)
+            # one request at a time to respect the rate limit
+            for batch in tqdm(batched(todo, SEMANTICSCHOLAR_BATCH_SIZE), desc="Enriching from Semantic Scholar..."):
+                try:
+                    cache.update(_lookup_semanticscholar(client, batch))
+                except Exception as e:
+                    print(f"WARNING: Semantic Scholar lookup failed: {e}")
+                sleep(1)
+        for record in records:
+            paper_id = semanticscholar_id(record)
+            if paper_id and _needs_enrichment(record):
+                changed += _fill(record, cache.get(f"semanticscholar:{paper_id}") or {})
+
+    count("search.enrich.fields_filled", changed)
+    print(f"Filled {changed} missing fields of {len(records)} papers\n")
+    return records
+
+
+def enrich_df(df: DataFrame, **kwargs) -> DataFrame:
+    """
+    `enrich_records` for a DataFrame of candidates, see there for the arguments.
+    """
+    records = df.to_dict("records")
+    for record in records:
+        record["authors"] = normalize_authors(record.get("authors"))
+    return DataFrame(enrich_records(records, **kwargs), columns=list(dict.fromkeys([*df.columns, *ENRICHED_FIELDS])))
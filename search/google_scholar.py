@@ -1,6 +1,7 @@
 from scholarly import scholarly, ProxyGenerator
 from .utils import is_relevant, add_to_all_results
 from tqdm import tqdm
+from profiling import Stopwatch
 
 def search_scholar(
         keywords: list[str],
@@ -20,6 +21,7 @@ def search_scholar(
     scholarly.use_proxy(pg)
 
     scholar_results = []
+    relevant = Stopwatch("search.is_relevant", is_relevant)
     for keyword in tqdm(keywords, desc="Searching Google Scholar..."):
         search_query = scholarly.search_pubs(keyword, year_low=min_year)
 
@@ -43,7 +45,7 @@ def search_scholar(
             if year < min_year:
                 continue
 
-            if relevance_terms and not is_relevant(title, abstract, relevance_terms):
+            if relevance_terms and not relevant(title, abstract, relevance_terms):
                 continue
             
             scholar_results.append({
@@ -56,4 +58,5 @@ def search_scholar(
             })
 
     print(f"Found {len(scholar_results)} candidate papers\n")
+    relevant.record()
     add_to_all_results(scholar_results, seen_keys, all_results, gold_titles)
@@ -5,8 +5,37 @@ from .utils import (
     add_to_all_results,
     reconstruct_inverted_abstract
     )
+from profiling import timer, timed, Stopwatch, count
 from tqdm import tqdm
 
+def openalex_record(work: dict) -> dict:
+    """
+    Builds a result record from an OpenAlex work.
+    Returns None if the work has no DOI, title or abstract.
+    """
+    doi = work.get("doi", None)
+    title = work.get("title", None)
+    raw_abstract = work.get("abstract", None)
+
+    # Handle OpenAlex abstract inversion
+    abstract = raw_abstract if raw_abstract and len(raw_abstract) > 5 \
+        else reconstruct_inverted_abstract(work.get("abstract_inverted_index", {}))
+
+    if not all([doi, title, abstract]):
+        return None
+
+    return {
+        "title": title,
+        "authors": [a["author"]["display_name"] for a in work.get("authorships", [])],
+        "doi": doi,
+        "abstract": abstract,
+        "url": doi,
+        "year": work.get("publication_year", 0),
+        "source": "openalex",
+    }
+
+
+@timed("search.openalex")
 def search_openalex(
         keywords: list[str],
         seen_keys: list[str],
@@ -25,41 +54,29 @@ def search_openalex(
         pyalex.config.email = email
 
     openalex_results = []
+    relevant = Stopwatch("search.is_relevant", is_relevant)
     for keyword in tqdm(keywords, desc="Searching OpenAlex..."):
-        works = PyAlexWorks() \
-            .search(keyword) \
-            .filter(publication_year=f">{min_year - 1}") \
-            .sort(cited_by_count="desc") \
-            .get(per_page=max_results)
+        with timer("search.openalex.fetch"):
+            works = PyAlexWorks() \
+                .search(keyword) \
+                .filter(publication_year=f">{min_year - 1}") \
+                .sort(cited_by_count="desc") \
+                .get(per_page=max_results)
+        count("search.openalex.records", len(works))
 
         for work in works:
-            doi = work.get("doi", None)
-            title = work.get("title", None)
-            raw_abstract = work.get("abstract", None)
-
-            # Handle OpenAlex abstract inversion
-            abstract = raw_abstract if raw_abstract and len(raw_abstract) > 5 \
-                else reconstruct_inverted_abstract(work.get("abstract_inverted_index", {}))
-
-            if not all([doi, title, abstract]):
+            record = openalex_record(work)
+            if record is None:
                 continue
 
-            year = work.get("publication_year", 0)
-            if year < min_year:
+            if record["year"] < min_year:
                 continue
 
-            if relevance_terms and not is_relevant(title, abstract, relevance_terms):
+            if relevance_terms and not relevant(record["title"], record["abstract"], relevance_terms):
                     continue
-            
-            openalex_results.append({
-                "title": title,
-                "authors": [a["author"]["display_name"] for a in work.get("authorships", [])],
-                "doi": doi,
-                "abstract": abstract,
-                "url": doi,
-                "year": year,
-                "source": "openalex",
-            })
+
+            openalex_results.append(record)
 
     print(f"Found {len(openalex_results)} candidate papers\n")
+    relevant.record()
     add_to_all_results(openalex_results, seen_keys, all_results, gold_titles)
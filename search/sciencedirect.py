@@ -1,8 +1,10 @@
 from pybliometrics.sciencedirect import ArticleMetadata
 from .utils import is_relevant, add_to_all_results
+from profiling import timer, timed, Stopwatch, count
 from tqdm import tqdm
 
 
+@timed("search.sciencedirect")
 def search_sciencedirect(
         keywords: list[str],
         seen_keys: list[str],
@@ -17,13 +19,15 @@ def search_sciencedirect(
     """
     
     sciencedirect_results = []
+    relevant = Stopwatch("search.is_relevant", is_relevant)
     for keyword in tqdm(keywords, desc="Searching ScienceDirect..."):
         try:
-            search = ArticleMetadata(
-                query=f'TITLE("{keyword}") OR ABS("{keyword}") OR KEY("{keyword}")',
-                download=True,
-                subscriber=True
-            )
+            with timer("search.sciencedirect.fetch"):
+                search = ArticleMetadata(
+                    query=f'TITLE("{keyword}") OR ABS("{keyword}") OR KEY("{keyword}")',
+                    download=True,
+                    subscriber=True
+                )
         except Exception as e:
             print(e)
             continue
@@ -31,7 +35,10 @@ def search_sciencedirect(
         if not search.results:
             continue
 
-        for paper in search.results[:min(max_results, len(search.results))]:
+        papers = search.results[:min(max_results, len(search.results))]
+        count("search.sciencedirect.records", len(papers))
+
+        for paper in papers:
             title = getattr(paper, 'title', None)
             abstract = getattr(paper, 'abstract_text', None)
             link = getattr(paper, 'link', None)
@@ -44,7 +51,7 @@ def search_sciencedirect(
             if year < min_year:
                 continue
                 
-            if relevance_terms and not is_relevant(title, abstract, relevance_terms):
+            if relevance_terms and not relevant(title, abstract, relevance_terms):
                 continue
 
             sciencedirect_results.append({
@@ -58,4 +65,5 @@ def search_sciencedirect(
             })
 
     print(f"Found {len(sciencedirect_results)} candidate papers\n")
+    relevant.record()
     add_to_all_results(sciencedirect_results, seen_keys, all_results, gold_titles)
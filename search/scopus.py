@@ -1,8 +1,10 @@
 from pybliometrics.scopus import ScopusSearch
 from .utils import is_relevant, add_to_all_results
+from profiling import timer, timed, Stopwatch, count
 from tqdm import tqdm
 
 
+@timed("search.scopus")
 def search_scopus(
         keywords: list[str],
         seen_keys: list[str],
@@ -17,20 +19,25 @@ def search_scopus(
     """
     
     scopus_results = []
+    relevant = Stopwatch("search.is_relevant", is_relevant)
     for keyword in tqdm(keywords, desc="Searching Scopus..."):
         try:
-            search = ScopusSearch(
-                query=f'TITLE-ABS-KEY("{keyword}")',
-                download=True,
-                subscriber=True
-            )
+            with timer("search.scopus.fetch"):
+                search = ScopusSearch(
+                    query=f'TITLE-ABS-KEY("{keyword}")',
+                    download=True,
+                    subscriber=True
+                )
             if not search.results:
                 continue
         except Exception as e:
             print(e)
             continue
 
-        for paper in search.results[:min(max_results, len(search.results))]:
+        papers = search.results[:min(max_results, len(search.results))]
+        count("search.scopus.records", len(papers))
+
+        for paper in papers:
             title = getattr(paper, 'title', None)
             abstract = getattr(paper, 'description', None)
             doi = getattr(paper, 'doi', None)
@@ -43,7 +50,7 @@ def search_scopus(
             if year < min_year:
                 continue
 
-            if relevance_terms and not is_relevant(title, abstract, relevance_terms):
+            if relevance_terms and not relevant(title, abstract, relevance_terms):
                 continue
             
             scopus_results.append({
@@ -57,4 +64,5 @@ def search_scopus(
             })
 
     print(f"Found {len(scopus_results)} candidate papers\n")
+    relevant.record()
     add_to_all_results(scopus_results, seen_keys, all_results, gold_titles)
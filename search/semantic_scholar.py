@@ -1,9 +1,46 @@
 from semanticscholar import SemanticScholar
 from .utils import is_relevant, add_to_all_results
+from profiling import timer, timed, Stopwatch, count
 from tqdm import tqdm
 from time import sleep
 
 
+def get_semanticscholar_client(api_key_path: str, timeout: int=10) -> SemanticScholar:
+    try:
+        with open(api_key_path) as f:
+            api_key = f.readline().strip()
+    except:
+        print("Could not find Semantic Scholar API key (recommended). Continuing without...")
+        api_key = None
+    return SemanticScholar(api_key=api_key, timeout=timeout)
+
+
+def semanticscholar_record(paper) -> dict:
+    """
+    Builds a result record from a Semantic Scholar paper.
+    Returns None if the paper has no title, abstract, DOI or year.
+    """
+    title = getattr(paper, 'title', None)
+    abstract = getattr(paper, 'abstract', None)
+    external_ids = getattr(paper, 'externalIds', None) or {}
+    doi = external_ids.get('DOI', None)
+    year = getattr(paper, "year", None)
+
+    if not all([title, abstract, doi, year]):
+        return None
+
+    return {
+        "title": title,
+        "authors": [a.name for a in paper.authors] if getattr(paper, 'authors', None) else [],
+        "doi": doi,
+        "abstract": abstract,
+        "url": f"https://doi.org/{doi}",
+        "year": int(year),
+        "source": "semanticscholar",
+    }
+
+
+@timed("search.semanticscholar")
 def search_semanticscholar(
         keywords: list[str],
         seen_keys: list[str],
@@ -17,47 +54,29 @@ def search_semanticscholar(
     """
     Performs keyword-based searches on Semantic Scholar.
     """
-    try:
-        with open(semanticscholar_api_key_path) as f:
-            semanticscholar_api_key = f.readline().strip()
-    except:
-        print("Could not find Semantic Scholar API key (recommended). Continuing without...")
-        semanticscholar_api_key = None
-    semanticscholar_client = SemanticScholar(api_key=semanticscholar_api_key, timeout=10)
+    semanticscholar_client = get_semanticscholar_client(semanticscholar_api_key_path)
 
     semanticscholar_results = []
+    relevant = Stopwatch("search.is_relevant", is_relevant)
     for keyword in tqdm(keywords, desc="Searching Semantic Scholar..."):
         try:
-            search = semanticscholar_client.search_paper(
-                query=keyword,
-                fields=["title", "authors", "abstract", "year", "paperId", "citationCount", "externalIds"]
-            )
+            with timer("search.semanticscholar.fetch"):
+                search = semanticscholar_client.search_paper(
+                    query=keyword,
+                    fields=["title", "authors", "abstract", "year", "paperId", "citationCount", "externalIds"]
+                )
+            papers = search[:min(max_results, search.total)]
+            count("search.semanticscholar.records", len(papers))
 
-            for paper in search[:min(max_results, search.total)]:
-                title = getattr(paper, 'title', None)
-                abstract = getattr(paper, 'abstract', None)
-                doi = paper.externalIds.get('DOI', None) if hasattr(paper, 'externalIds') else None
-
-                if not all([title, abstract, doi]):
+            for paper in papers:
+                record = semanticscholar_record(paper)
+                if record is None or record["year"] < min_year:
                     continue
 
-                year = getattr(paper, "year", None)
-                year = int(year) if year else None
-                if not year or year < min_year:
+                if relevance_terms and not relevant(record["title"], record["abstract"], relevance_terms):
                     continue
 
-                if relevance_terms and not is_relevant(title, abstract, relevance_terms):
-                    continue
-                
-                semanticscholar_results.append({
-                    "title": title,
-                    "authors": [a.name for a in paper.authors] if hasattr(paper, 'authors') else [],
-                    "doi": doi,
-                    "abstract": abstract,
-                    "url": f"https://doi.org/{doi}",
-                    "year": year,
-                    "source": "semanticscholar",
-                })
+                semanticscholar_results.append(record)
 
         except Exception as e:
             print(f"Error searching '{keyword}': {e}")
@@ -67,4 +86,5 @@ def search_semanticscholar(
         sleep(1)
 
     print(f"Found {len(semanticscholar_results)} candidate papers\n")
+    relevant.record()
     add_to_all_results(semanticscholar_results, seen_keys, all_results, gold_titles)
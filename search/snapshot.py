@@ -0,0 +1,240 @@
+import os
+import gzip
+import json
+import time
+from glob import glob
+from concurrent.futures import ProcessPoolExecutor
+from tqdm import tqdm
+from profiling import timed, Stopwatch, count
+from .utils import is_relevant, add_to_all_results, contains_keywords
+from .openalex import openalex_record
+
+# Uncompressed files are split into chunks of this many bytes, compressed files are read whole
+CHUNK_SIZE = 64 * 2**20
+
+
+def _prefilter_words(terms: list[str]) -> list[list[bytes]]:
+    """
+    Lower case words of each term as bytes. Terms that may be escaped in JSON
+    (non-ASCII, quotes, backslashes) get no words, so they never rule out a line.
+    """
+    words = []
+    for term in terms:
+        if not term.isascii() or '"' in term or "\\" in term:
+            words.append([])
+        else:
+            words.append([w.encode() for w in term.lower().split()])
+    return words
+
+
+def _may_match(line: bytes, keyword_words: list[list[bytes]], relevance_words: list[list[list[bytes]]]) -> bool:
+    """
+    Cheap test on the raw JSON line: all words of some keyword and of some term of every
+    relevance group occur anywhere in it. Never rejects a line the exact filters would keep.
+    """
+    if keyword_words and not any(all(w in line for w in words) for words in keyword_words):
+        return False
+    return all(any(all(w in line for w in words) for words in group) for group in relevance_words)
+
+
+def arxiv_snapshot_record(entry: dict) -> dict:
+    """
+    Builds a record like `arxiv_record` from an entry of the arXiv metadata dump
+    (arxiv-metadata-oai-snapshot.json as published on Kaggle).
+    """
+    versions = entry.get("versions") or [{"version": "v1", "created": ""}]
+    # "Mon, 2 Apr 2007 19:18:42 GMT"
+    created = versions[0].get("created", "").split()
+    authors = [
+        " ".join(filter(None, [first, last, suffix]))
+        for last, first, suffix in (entry.get("authors_parsed") or [])
+    ]
+    abstract = "\n".join(line.strip() for line in (entry.get("abstract") or "").strip().splitlines())
+    return {
+        "title": " ".join((entry.get("title") or "").split()),
+        "authors": authors,
+        "doi": entry.get("doi") or "",
+        "abstract": abstract,
+        "url": f"http://arxiv.org/pdf/{entry['id']}{versions[-1]['version']}",
+        "year": int(created[3]) if len(created) > 3 else 0,
+        "source": "arxiv",
+    }
+
+
+def _openalex_line(line: bytes, min_year: int) -> tuple[str, dict]:
+    work = json.loads(line)
+    inverted_index = work.get("abstract_inverted_index")
+    # older snapshots wrap the index
+    if isinstance(inverted_index, dict) and "InvertedIndex" in inverted_index:
+        work["abstract_inverted_index"] = inverted_index["InvertedIndex"]
+    if (work.get("publication_year") or 0) < min_year:
+        return None, None
+    return work.get("id"), openalex_record(work)
+
+
+def _arxiv_line(line: bytes, min_year: int) -> tuple[str, dict]:
+    entry = json.loads(line)
+    record = arxiv_snapshot_record(entry)
+    if record["year"] < min_year:
+        return None, None
+    return entry.get("id"), record
+
+
+PARSERS = {"openalex": _openalex_line, "arxiv": _arxiv_line}
+
+
+def _read_lines(path: str, start: int, end: int):
+    """
+    Yields the lines starting in the byte range [start, end) of a file, or all lines if `end` is None.
+    """
+    if path.endswith(".gz"):
+        with gzip.open(path, "rb") as f:
+            yield from f
+        return
+    with open(path, "rb") as f:
+        position = start
+        if start > 0:
+            # a line belongs to the chunk it starts in
+            f.seek(start - 1)
+            position += len(f.readline()) - 1
+        for line in f:
+            if end is not None and position >= end:
+                break
+            position += len(line)
+            yield line
+
+
+def _scan(task: tuple) -> tuple[list[tuple[str, dict]], int, Stopwatch]:
+    """
+    Filters one file or chunk in a worker process. Returns the matching (id, record) pairs
+    in file order, the number of lines read and the time spent parsing records, which
+    is recorded by the main process (timers of worker processes are lost).
+    """
+    kind, path, start, end, keywords, relevance_terms, min_year = task
+    keyword_words = [w for w in _prefilter_words(keywords) if w]
+    relevance_words = [_prefilter_words(group) for group in relevance_terms or []]
+    parse = Stopwatch(f"search.snapshot.{kind}.parse", PARSERS[kind])
+
+    matches = []
+    lines = 0
+    for line in _read_lines(path, start, end):
+        lines += 1
+        if not _may_match(line.lower(), keyword_words, relevance_words):
+            continue
+        try:
+            key, record = parse(line, min_year)
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+            continue
+        if record is None:
+            continue
+        abstract = record["abstract"].replace("\n", " ")
+        if keywords and not contains_keywords(f"{record['title']} {abstract}", keywords):
+            continue
+        if relevance_terms and not is_relevant(record["title"], abstract, relevance_terms):
+            continue
+        matches.append((key or f"{path}:{start}:{lines}", record))
+    return matches, lines, parse
+
+
+def _tasks(kind: str, paths: list[str], keywords, relevance_terms, min_year) -> list[tuple]:
+    tasks = []
+    for path in paths:
+        size = os.path.getsize(path)
+        if path.endswith(".gz"):
+            tasks.append((kind, path, 0, None, keywords, relevance_terms, min_year))
+            continue
+        for start in range(0, max(size, 1), CHUNK_SIZE):
+            tasks.append((kind, path, start, start + CHUNK_SIZE, keywords, relevance_terms, min_year))
+    return tasks
+
+
+@timed("search.snapshot")
+def scan_snapshot(
+        kind: str,
+        paths: list[str],
+        keywords: list[str],
+        relevance_terms: list[list[str]]=None,
+        min_year: int=0,
+        max_workers: int=None,
+    ) -> list[dict]:
+    """
+    Streams snapshot files through a process pool and returns the matching records.
+    Files are processed in the given order and later versions of a paper replace
+    earlier ones, as in the `updated_date=...` partitions of the OpenAlex snapshot.
+    """
+    tasks = _tasks(kind, paths, keywords, relevance_terms, min_year)
+    total_bytes = sum(os.path.getsize(path) for path in paths)
+    start = time.perf_counter()
+    records = {}
+    lines = 0
+    with ProcessPoolExecutor(max_workers=max_workers) as executor, \
+            tqdm(total=total_bytes, unit="B", unit_scale=True, desc=f"Scanning {kind} snapshot...") as progress:
+        # map keeps the task order, so results do not depend on which worker finishes first
+        for task, (matches, n_lines, parsed) in zip(tasks, executor.map(_scan, tasks)):
+            parsed.record()
+            for key, record in matches:
+                records.pop(key, None)
+                records[key] = record
+            lines += n_lines
+            _, path, chunk_start, chunk_end, *_ = task
+            size = os.path.getsize(path)
+            progress.update((size if chunk_end is None else min(chunk_end, size)) - chunk_start)
+
+    seconds = time.perf_counter() - start
+    count(f"search.snapshot.{kind}.records", lines)
+    count(f"search.snapshot.{kind}.bytes", total_bytes)
+    print(f"Scanned {lines} records ({total_bytes / 2**30:.2f} GB) in {seconds:.1f}s")
+    return list(records.values())
+
+
+def openalex_snapshot_files(snapshot_path: str) -> list[str]:
+    """
+    Works files of an OpenAlex snapshot, e.g. openalex-snapshot/data/works, oldest partition first.
+    """
+    if os.path.isfile(snapshot_path):
+        return [snapshot_path]
+    files = glob(os.path.join(snapshot_path, "**", "*.gz"), recursive=True) \
+        + glob(os.path.join(snapshot_path, "**", "*.jsonl"), recursive=True)
+    return sorted(files)
+
+
+def search_openalex_snapshot(
+        snapshot_path: str,
+        keywords: list[str],
+        seen_keys: list[str],
+        all_results: list[dict],
+        relevance_terms: list[list[str]]=None,
+        min_year: int=0,
+        gold_titles: list[str]=None,
+        max_workers: int=None,
+    ):
+    """
+    Offline version of `search_openalex` over a local copy of the OpenAlex works snapshot
+    (JSON lines, gzipped shards). Instead of the ranked API search, a work matches a keyword
+    if its title and abstract contain all words of it, and every match is kept.
+    Records and relevance filtering are the same as online.
+    """
+    openalex_results = scan_snapshot(
+        "openalex", openalex_snapshot_files(snapshot_path), keywords, relevance_terms, min_year, max_workers
+    )
+    print(f"Found {len(openalex_results)} candidate papers\n")
+    add_to_all_results(openalex_results, seen_keys, all_results, gold_titles)
+
+
+def search_arxiv_snapshot(
+        snapshot_path: str,
+        keywords: list[str],
+        seen_keys: list[str],
+        all_results: list[dict],
+        relevance_terms: list[list[str]]=None,
+        min_year: int=0,
+        gold_titles: list[str]=None,
+        max_workers: int=None,
+    ):
+    """
+    Offline version of `search_arxiv` over the arXiv metadata dump (one JSON object per line).
+    Keywords match like in `search_openalex_snapshot`.
+    """
+    arxiv_results = scan_snapshot("arxiv", [snapshot_path], keywords, relevance_terms, min_year, max_workers)
+    print(f"Found {len(arxiv_results)} candidate papers\n")
+    add_to_all_results(arxiv_results, seen_keys, all_results, gold_titles)
@@ -0,0 +1,304 @@
+from time import sleep
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pyalex import Works as PyAlexWorks
+from tqdm import tqdm
+from profiling import timer, timed, Stopwatch, count
+from .utils import is_relevant, add_to_all_results
+from .openalex import openalex_record
+from .semantic_scholar import get_semanticscholar_client, semanticscholar_record
+
+# OpenAlex accepts up to 50 values in an OR filter, the Semantic Scholar batch endpoint up to 500 ids
+OPENALEX_BATCH_SIZE = 50
+SEMANTICSCHOLAR_BATCH_SIZE = 500
+
+# Only what records and the next expansion step need, which keeps responses small
+OPENALEX_FIELDS = [
+    "id", "doi", "title", "abstract_inverted_index", "publication_year",
+    "authorships", "referenced_works", "cited_by_count",
+]
+SEMANTICSCHOLAR_FIELDS = ["paperId", "title", "abstract", "year", "authors", "externalIds"]
+
+
+def batched(items: list, size: int) -> list[list]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def bare_doi(doi: str) -> str:
+    doi = doi.strip().lower()
+    for prefix in ["https://doi.org/", "http://doi.org/", "doi:"]:
+        if doi.startswith(prefix):
+            return doi[len(prefix):]
+    return doi
+
+
+def openalex_id(work: dict) -> str:
+    return work["id"].rsplit("/", 1)[-1]
+
+
+def _openalex_works(**filter_or) -> PyAlexWorks:
+    return PyAlexWorks().filter_or(**filter_or).select(OPENALEX_FIELDS)
+
+
+def _openalex_by_ids(ids: list[str]) -> list[dict]:
+    with timer("search.snowball.openalex.fetch"):
+        return _openalex_works(openalex_id=ids).get(per_page=len(ids))
+
+
+def _openalex_by_dois(dois: list[str]) -> list[dict]:
+    with timer("search.snowball.openalex.fetch"):
+        return _openalex_works(doi=dois).get(per_page=len(dois))
+
+
+def _openalex_by_title(title: str) -> list[dict]:
+    with timer("search.snowball.openalex.fetch"):
+        return PyAlexWorks().search_filter(title=title).select(OPENALEX_FIELDS).get(per_page=1)
+
+
+def _openalex_citing(ids: list[str], max_results: int) -> list[dict]:
+    """
+    Works citing any of `ids`, most cited first.
+    """
+    works = _openalex_works(cites=ids).sort(cited_by_count="desc")
+    citing = []
+    with timer("search.snowball.openalex.fetch"):
+        for page in works.paginate(per_page=200, n_max=max_results):
+            citing.extend(page)
+    return citing
+
+
+def _expandable(record: dict, relevance_terms: list[list[str]], min_year: int) -> bool:
+    return record is not None and record["year"] >= min_year and (
+        not relevance_terms or is_relevant(record["title"], record["abstract"], relevance_terms)
+    )
+
+
+def snowball_openalex(
+        seed_titles: list[str],
+        seed_dois: list[str],
+        relevance_terms: list[list[str]]=None,
+        min_year: int=0,
+        directions: list[str]=("backward", "forward"),
+        max_depth: int=1,
+        max_nodes: int=10000,
+        max_citing: int=100,
+        max_workers: int=8,
+    ) -> list[dict]:
+    """
+    Breadth-first expansion of the citation graph on OpenAlex.
+    Backward steps fetch the `referenced_works` of the frontier in batches of 50 ids,
+    forward steps fetch works citing a batch of the frontier with a `cites:` filter, the most cited
+    first and up to `max_citing` times the batch size per batch. This is no cap per paper: a highly
+    cited paper can take up the share of the others in its batch. Only seeds and relevant works are
+    expanded further.
+    Every work is fetched at most once and at most `max_nodes` works are collected.
+
+    Returns the collected OpenAlex works, seeds included.
+    """
+    collected = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        jobs = [executor.submit(_openalex_by_dois, batch) for batch in batched(seed_dois, OPENALEX_BATCH_SIZE)]
+        jobs += [executor.submit(_openalex_by_title, title) for title in seed_titles]
+        for job in as_completed(jobs):
+            try:
+                works = job.result()
+            except Exception as e:
+                print(f"WARNING: Could not resolve seed papers on OpenAlex: {e}")
+                continue
+            for work in works:
+                collected[openalex_id(work)] = work
+        print(f"Resolved {len(collected)} seed papers on OpenAlex")
+
+        # ids that were collected or are being fetched, so nothing is requested twice
+        seen = set(collected)
+        frontier = list(collected.values())
+        for depth in range(1, max_depth + 1):
+            if depth > 1:
+                frontier = [w for w in frontier if _expandable(openalex_record(w), relevance_terms, min_year)]
+            budget = max_nodes - len(collected)
+            if not frontier or budget <= 0:
+                break
+
+            jobs = []
+            if "backward" in directions:
+                referenced = []
+                for work in frontier:
+                    for url in work.get("referenced_works") or []:
+                        ref_id = url.rsplit("/", 1)[-1]
+                        if ref_id not in seen:
+                            seen.add(ref_id)
+                            referenced.append(ref_id)
+                jobs += [
+                    executor.submit(_openalex_by_ids, batch)
+                    for batch in batched(referenced[:budget], OPENALEX_BATCH_SIZE)
+                ]
+            if "forward" in directions:
+                jobs += [
+                    executor.submit(_openalex_citing, batch, max_citing * len(batch))
+                    for batch in batched([openalex_id(w) for w in frontier], OPENALEX_BATCH_SIZE)
+                ]
+
+            frontier = []
+            for job in tqdm(as_completed(jobs), total=len(jobs), desc=f"Snowballing OpenAlex (depth {depth})..."):
+                try:
+                    works = job.result()
+                except Exception as e:
+                    print(f"WARNING: Snowballing request failed: {e}")
+                    continue
+                for work in works:
+                    work_id = openalex_id(work)
+                    if work_id in collected or len(collected) >= max_nodes:
+                        continue
+                    seen.add(work_id)
+                    collected[work_id] = work
+                    frontier.append(work)
+            count("search.snowball.openalex.nodes", len(frontier))
+
+    return list(collected.values())
+
+
+def snowball_semanticscholar(
+        seed_titles: list[str],
+        seed_dois: list[str],
+        semanticscholar_api_key_path: str=None,
+        relevance_terms: list[list[str]]=None,
+        min_year: int=0,
+        directions: list[str]=("backward", "forward"),
+        max_depth: int=1,
+        max_nodes: int=10000,
+        max_citing: int=100,
+    ) -> list:
+    """
+    Breadth-first expansion of the citation graph on Semantic Scholar.
+    Papers are fetched with the batch endpoint (500 ids per request) together with the ids
+    of their references and citations (up to `max_citing` citations per paper are followed).
+    Requests run one after another to respect the rate limit.
+
+    Returns the collected Semantic Scholar papers, seeds included.
+    """
+    client = get_semanticscholar_client(semanticscholar_api_key_path, timeout=30)
+    fields = SEMANTICSCHOLAR_FIELDS \
+        + (["references.paperId"] if "backward" in directions else []) \
+        + (["citations.paperId"] if "forward" in directions else [])
+
+    def get_papers(ids: list[str]) -> list:
+        papers = []
+        for batch in batched(ids, SEMANTICSCHOLAR_BATCH_SIZE):
+            try:
+                with timer("search.snowball.semanticscholar.fetch"):
+                    papers += [p for p in client.get_papers(batch, fields=fields) if p]
+            except Exception as e:
+                print(f"WARNING: Semantic Scholar batch request failed: {e}")
+            sleep(1)
+        return papers
+
+    # title matching does not return references or citations, those come from the batch endpoint
+    seed_ids = [f"DOI:{bare_doi(doi)}" for doi in seed_dois]
+    for title in seed_titles:
+        try:
+            with timer("search.snowball.semanticscholar.fetch"):
+                seed_ids.append(client.search_paper(title, match_title=True, fields=["paperId"]).paperId)
+        except Exception as e:
+            print(f"WARNING: Could not find '{title}' on Semantic Scholar: {e}")
+        sleep(1)
+    collected = {p.paperId: p for p in get_papers(list(dict.fromkeys(seed_ids)))}
+    print(f"Resolved {len(collected)} seed papers on Semantic Scholar")
+
+    seen = set(collected)
+    frontier = list(collected.values())
+    for depth in range(1, max_depth + 1):
+        if depth > 1:
+            frontier = [p for p in frontier if _expandable(semanticscholar_record(p), relevance_terms, min_year)]
+        budget = max_nodes - len(collected)
+        if not frontier or budget <= 0:
+            break
+
+        new_ids = []
+        for paper in frontier:
+            linked = []
+            if "backward" in directions:
+                linked += getattr(paper, "references", None) or []
+            if "forward" in directions:
+                linked += (getattr(paper, "citations", None) or [])[:max_citing]
+            for other in linked:
+                if other.paperId and other.paperId not in seen:
+                    seen.add(other.paperId)
+                    new_ids.append(other.paperId)
+
+        print(f"Fetching {min(len(new_ids), budget)} papers from Semantic Scholar (depth {depth})...")
+        frontier = [p for p in get_papers(new_ids[:budget]) if p.paperId not in collected]
+        for paper in frontier:
+            collected[paper.paperId] = paper
+        count("search.snowball.semanticscholar.nodes", len(frontier))
+
+    return list(collected.values())
+
+
+@timed("search.snowball")
+def search_snowball(
+        seed_titles: list[str],
+        seen_keys: list[str],
+        all_results: list[dict],
+        relevance_terms: list[list[str]]=None,
+        min_year: int=0,
+        max_results: int=10000,
+        gold_titles: list[str]=None,
+        seed_dois: list[str]=None,
+        sources: list[str]=("openalex", "semanticscholar"),
+        directions: list[str]=("backward", "forward"),
+        max_depth: int=1,
+        max_citing: int=100,
+        semanticscholar_api_key_path: str=None,
+        max_workers: int=8,
+    ):
+    """
+    Snowballing: finds papers citing or cited by seed papers, e.g. the gold titles
+    from `init_gold_titles` or titles and DOIs of papers screened as relevant.
+    `max_depth` citation steps are taken in the given `directions`, collecting at most
+    `max_results` papers per source. OpenAlex and Semantic Scholar are searched at the same time.
+    Relevant papers found are added to all results like those of a keyword search.
+    """
+    seed_titles = [t for t in seed_titles or [] if isinstance(t, str) and t.strip()]
+    seed_dois = list(dict.fromkeys(bare_doi(d) for d in seed_dois or [] if isinstance(d, str) and d.strip()))
+    options = dict(
+        relevance_terms=relevance_terms,
+        min_year=min_year,
+        directions=directions,
+        max_depth=max_depth,
+        max_nodes=max_results,
+        max_citing=max_citing,
+    )
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        jobs = {}
+        if "openalex" in sources:
+            jobs["openalex"] = executor.submit(
+                snowball_openalex, seed_titles, seed_dois, max_workers=max_workers, **options
+            )
+        if "semanticscholar" in sources:
+            jobs["semanticscholar"] = executor.submit(
+                snowball_semanticscholar, seed_titles, seed_dois, semanticscholar_api_key_path, **options
+            )
+        nodes = {}
+        for source, job in jobs.items():
+            try:
+                nodes[source] = job.result()
+            except Exception as e:
+                print(f"WARNING: Snowballing on {source} failed: {e}")
+                nodes[source] = []
+
+    to_record = {"openalex": openalex_record, "semanticscholar": semanticscholar_record}
+    snowball_results = []
+    relevant = Stopwatch("search.is_relevant", is_relevant)
+    for source, items in nodes.items():
+        for item in items:
+            record = to_record[source](item)
+            if record is None or record["year"] < min_year:
+                continue
+            if relevance_terms and not relevant(record["title"], record["abstract"], relevance_terms):
+                continue
+            record["source"] = f"{source}_snowball"
+            snowball_results.append(record)
+
+    print(f"Found {len(snowball_results)} candidate papers\n")
+    relevant.record()
+    add_to_all_results(snowball_results, seen_keys, all_results, gold_titles)
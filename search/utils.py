@@ -1,7 +1,12 @@
 import os
-import pybliometrics
+import re
+import html
+from profiling import timed, count
+from storage.fts import update_index
 
 def setup_elsevier_api(api_key_path: str):
+    import pybliometrics
+
     if api_key_path and os.path.exists(api_key_path):
         with open(api_key_path) as f:
             key = f.read().strip()
@@ -14,6 +19,18 @@ def contains_any_substring(text: str, substrings: list[str]) -> bool:
     return any(sub in text for sub in substrings)
 
 
+def contains_keywords(search_text: str, keywords: list[str]) -> bool:
+    """
+    True if all words of at least one keyword occur in the text.
+    """
+    search_text = search_text.lower()
+    for keyword in keywords:
+        words = keyword.lower().split()
+        if all(word in search_text for word in words):
+            return True
+    return False
+
+
 def is_relevant(title: str, abstract: str, relevance_terms: list[list[str]]) -> bool:
     """
     Implements our master bool query in a str search by checking
@@ -65,6 +82,7 @@ def nr_gold_papers_found(search_result_titles: list[str], gold_titles: list[str]
     print(f"Gold papers found in this search: {match_count}")
 
 
+@timed("search.add_to_all_results")
 def add_to_all_results(new_results: list[dict], seen_titles: set[str], all_results: list[dict], gold_titles: list[str]=None):
     """
     Adds new results (whose titles are not in seen titles) from a search to all results.
@@ -86,11 +104,28 @@ def add_to_all_results(new_results: list[dict], seen_titles: set[str], all_resul
             elif added == 4:
                 print(f"Adding more...")
     all_results.extend(temp_results)
+    update_index("add_papers", temp_results)
+    count("search.candidates", len(new_results))
+    count("search.added", len(temp_results))
     if gold_titles:
         nr_gold_papers_found(temp_results, gold_titles)
     print(f"Added {len(temp_results)} new papers\n")
 
 
+def clean_jats_abstract(raw_abstract: str) -> str:
+    """
+    Turns the JATS XML abstracts of Crossref into plain text,
+    keeping all paragraphs and dropping section titles like "Abstract".
+    """
+    if not raw_abstract:
+        return ""
+    text = re.sub(r"<jats:title>.*?</jats:title>", " ", raw_abstract, flags=re.DOTALL)
+    # paragraphs and sections are separated by a space, inline markup like <jats:italic> is removed
+    text = re.sub(r"</?jats:(?:p|sec|list|list-item)\b[^>]*>", " ", text)
+    text = re.sub(r"<[^>]+>", "", text)
+    return " ".join(html.unescape(text).split())
+
+
 def reconstruct_inverted_abstract(abstract_inverted_index: dict) -> str:
     """
     Used to reconstruct abstracts from Open Alex which are presented 
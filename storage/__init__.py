@@ -0,0 +1,38 @@
+import importlib
+
+# pyarrow and pandas are only imported once the Parquet store is used
+_LAZY = {
+    "ResultStore": "parquet_store",
+    "normalize_authors": "parquet_store",
+    "read_parquet": "parquet_store",
+    "write_parquet": "parquet_store",
+    "paper_id": "ids",
+    "PaperIndex": "fts",
+    "set_active_index": "fts",
+    "get_active_index": "fts",
+    "update_index": "fts",
+}
+
+__all__ = [
+    "ResultStore",
+    "paper_id",
+    "normalize_authors",
+    "read_parquet",
+    "write_parquet",
+    "PaperIndex",
+    "set_active_index",
+    "get_active_index",
+    "update_index",
+]
+
+
+def __getattr__(name: str):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_LAZY[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
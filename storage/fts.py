@@ -0,0 +1,274 @@
+import os
+import json
+import sqlite3
+import threading
+from profiling import count
+from .ids import paper_id
+
+# Relative weight of a match in each column for ranking
+COLUMN_WEIGHTS = {"title": 10.0, "abstract": 5.0, "annotations": 2.0, "markdown": 1.0}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    rowid INTEGER PRIMARY KEY,
+    paper_id TEXT UNIQUE NOT NULL,
+    title TEXT,
+    abstract TEXT,
+    annotations TEXT,
+    annotations_json TEXT,
+    markdown TEXT,
+    doi TEXT,
+    url TEXT,
+    year INTEGER,
+    source TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+    title, abstract, annotations, markdown,
+    content='papers', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS papers_ai AFTER INSERT ON papers BEGIN
+    INSERT INTO papers_fts(rowid, title, abstract, annotations, markdown)
+    VALUES (new.rowid, new.title, new.abstract, new.annotations, new.markdown);
+END;
+CREATE TRIGGER IF NOT EXISTS papers_ad AFTER DELETE ON papers BEGIN
+    INSERT INTO papers_fts(papers_fts, rowid, title, abstract, annotations, markdown)
+    VALUES ('delete', old.rowid, old.title, old.abstract, old.annotations, old.markdown);
+END;
+CREATE TRIGGER IF NOT EXISTS papers_au AFTER UPDATE ON papers BEGIN
+    INSERT INTO papers_fts(papers_fts, rowid, title, abstract, annotations, markdown)
+    VALUES ('delete', old.rowid, old.title, old.abstract, old.annotations, old.markdown);
+    INSERT INTO papers_fts(rowid, title, abstract, annotations, markdown)
+    VALUES (new.rowid, new.title, new.abstract, new.annotations, new.markdown);
+END;
+"""
+
+
+def _text(value) -> str:
+    if value is None or isinstance(value, str):
+        return value
+    if hasattr(value, "__iter__"):
+        return ", ".join(map(str, value))
+    try:
+        # NaN, pandas NA
+        if value != value:
+            return None
+    except TypeError:
+        return None
+    return str(value)
+
+
+def _year(value) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class PaperIndex:
+    def __init__(self, path: str="results/papers.sqlite"):
+        """
+        Full-text index of candidates in SQLite FTS5 over title, abstract, LLM annotations
+        and scraped markdown, keyed by `paper_id`. Papers are added or updated one batch at a time,
+        so the index can grow while searching, annotating and scraping.
+        Safe to use from several threads.
+        """
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+    def add_papers(self, records: list[dict]):
+        """
+        Adds search results or updates their metadata. Annotations and markdown are kept.
+        """
+        rows = [
+            (
+                paper_id(r["title"]), _text(r.get("title")), _text(r.get("abstract")), _text(r.get("doi")),
+                _text(r.get("url")), _year(r.get("year")), _text(r.get("source")),
+            )
+            for r in records if isinstance(r.get("title"), str) and r["title"].strip()
+        ]
+        with self._lock, self.db:
+            self.db.executemany(
+                """
+                INSERT INTO papers (paper_id, title, abstract, doi, url, year, source)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(paper_id) DO UPDATE SET
+                    title=excluded.title,
+                    abstract=COALESCE(excluded.abstract, abstract),
+                    doi=COALESCE(excluded.doi, doi),
+                    url=COALESCE(excluded.url, url),
+                    year=COALESCE(excluded.year, year),
+                    source=COALESCE(excluded.source, source)
+                WHERE title IS NOT excluded.title OR abstract IS NOT COALESCE(excluded.abstract, abstract)
+                    OR doi IS NOT COALESCE(excluded.doi, doi) OR url IS NOT COALESCE(excluded.url, url)
+                    OR year IS NOT COALESCE(excluded.year, year) OR source IS NOT COALESCE(excluded.source, source)
+                """,
+                rows,
+            )
+
+    def _ensure(self, paper: dict) -> str:
+        key = paper_id(paper["title"])
+        self.db.execute(
+            "INSERT INTO papers (paper_id, title, abstract) VALUES (?, ?, ?) ON CONFLICT(paper_id) DO NOTHING",
+            (key, _text(paper.get("title")), _text(paper.get("abstract"))),
+        )
+        return key
+
+    def add_annotations(self, paper: dict, annotations: dict):
+        """
+        Merges LLM answers (column name -> answer) into the annotations of a paper,
+        adding the paper if it is not indexed yet.
+        """
+        with self._lock, self.db:
+            self._merge_annotations(paper, annotations)
+
+    def _merge_annotations(self, paper: dict, annotations: dict):
+        key = self._ensure(paper)
+        stored = self.db.execute("SELECT annotations_json FROM papers WHERE paper_id=?", (key,)).fetchone()[0]
+        previous = json.loads(stored or "{}")
+        merged = {**previous, **{k: _text(v) for k, v in annotations.items()}}
+        if merged == previous:
+            return
+        text = "\n".join(f"{k}: {v}" for k, v in merged.items() if v)
+        self.db.execute(
+            "UPDATE papers SET annotations=?, annotations_json=? WHERE paper_id=?",
+            (text, json.dumps(merged), key),
+        )
+
+    def add_markdown(self, paper: dict, markdown: str):
+        """
+        Sets the scraped full text of a paper, adding the paper if it is not indexed yet.
+        """
+        if not markdown:
+            return
+        with self._lock, self.db:
+            self._set_markdown(paper, markdown)
+
+    def _set_markdown(self, paper: dict, markdown: str):
+        key = self._ensure(paper)
+        self.db.execute(
+            "UPDATE papers SET markdown=? WHERE paper_id=? AND markdown IS NOT ?", (markdown, key, markdown)
+        )
+
+    def add_df(self, df, annotation_columns: list[str]=None):
+        """
+        Indexes a DataFrame of candidates, e.g. one loaded from a `ResultStore`, including
+        `annotation_columns` (by default all columns that are not record fields) and "paper markdown".
+        """
+        records = df.to_dict("records")
+        self.add_papers(records)
+        if annotation_columns is None:
+            fields = {"paper_id", "title", "authors", "doi", "abstract", "url", "year", "source",
+                      "citations", "requires reannotation", "paper markdown"}
+            annotation_columns = [col for col in df.columns if col not in fields]
+        # one transaction for all rows
+        with self._lock, self.db:
+            for record in records:
+                if not isinstance(record.get("title"), str) or not record["title"].strip():
+                    continue
+                annotations = {col: record.get(col) for col in annotation_columns if _text(record.get(col))}
+                if annotations:
+                    self._merge_annotations(record, annotations)
+                if _text(record.get("paper markdown")):
+                    self._set_markdown(record, record["paper markdown"])
+
+    def search(self, query: str, limit: int=20, columns: list[str]=None, min_year: int=None):
+        """
+        Ranked (bm25) search with the FTS5 query syntax:
+            disinformation narrative          both words
+            "conspiracy theory"               phrase
+            propaganda OR disinformation      either
+            narrat* NOT survey                prefix, exclusion
+            NEAR(narrative detection, 5)      words close to each other
+        Words are not stemmed, use prefixes like the relevance terms (narrat* matches narratives).
+        `columns` limits the search to some of title, abstract, annotations and markdown.
+        Returns the best matches with a snippet of the matching text.
+        """
+        if columns:
+            query = f"{{{' '.join(columns)}}} : ({query})"
+        weights = ", ".join(str(w) for w in COLUMN_WEIGHTS.values())
+        year_filter = "AND rowid IN (SELECT rowid FROM papers WHERE year >= ?)" if min_year else ""
+        params = [query, min_year, limit] if min_year else [query, limit]
+        with self._lock:
+            # rank first, the snippets and the join are only computed for the returned rows
+            ranked = self.db.execute(
+                f"""
+                SELECT rowid, bm25(papers_fts, {weights}) AS score FROM papers_fts
+                WHERE papers_fts MATCH ? {year_filter} ORDER BY score LIMIT ?
+                """,
+                params,
+            ).fetchall()
+            scores = dict(ranked)
+            marks = ", ".join("?" * len(scores))
+            snippets = dict(self.db.execute(
+                f"""
+                SELECT rowid, snippet(papers_fts, -1, '[', ']', '...', 16) FROM papers_fts
+                WHERE papers_fts MATCH ? AND rowid IN ({marks})
+                """,
+                [query, *scores],
+            ).fetchall())
+            rows = self.db.execute(
+                f"SELECT rowid, paper_id, title, year, source, doi, url FROM papers WHERE rowid IN ({marks})",
+                list(scores),
+            ).fetchall()
+        from pandas import DataFrame
+
+        rows = sorted(([*row[1:], scores[row[0]], snippets.get(row[0])] for row in rows), key=lambda row: row[6])
+        columns = ["paper_id", "title", "year", "source", "doi", "url", "score", "snippet"]
+        return DataFrame(rows, columns=columns)
+
+    def count(self, query: str) -> int:
+        with self._lock:
+            return self.db.execute("SELECT count(*) FROM papers_fts WHERE papers_fts MATCH ?", (query,)).fetchone()[0]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.db.execute("SELECT count(*) FROM papers").fetchone()[0]
+
+    def optimize(self):
+        """
+        Merges the index segments written by many small updates, which speeds up queries.
+        """
+        with self._lock, self.db:
+            self.db.execute("INSERT INTO papers_fts(papers_fts) VALUES ('optimize')")
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+
+# Index updated by add_to_all_results, annotate_df and scrape_paper while set
+_active_index = None
+
+
+def set_active_index(index: PaperIndex):
+    """
+    Makes searches, annotation and scraping add what they produce to `index` (None to stop).
+    """
+    global _active_index
+    _active_index = index
+
+
+def get_active_index() -> PaperIndex:
+    return _active_index
+
+
+def update_index(method: str, *args):
+    """
+    Calls `method` (e.g. "add_annotations") of the active index, if there is one.
+    The index is secondary to the results, so sqlite errors such as a locked database
+    are printed as a warning instead of stopping the search, annotation or scraping.
+    """
+    index = _active_index
+    if index is None:
+        return
+    try:
+        getattr(index, method)(*args)
+    except sqlite3.Error as e:
+        print(f"WARNING: Could not update the full-text index at {index.path}: {e}")
+        count("index.errors")
@@ -0,0 +1,8 @@
+import hashlib
+
+
+def paper_id(title: str) -> str:
+    """
+    Stable key of a paper, derived from its lower case title like the seen titles in search.
+    """
+    return hashlib.sha1(str(title).lower().strip().encode("utf-8")).hexdigest()[:16]
@@ -0,0 +1,266 @@
+import os
+import re
+import ast
+import time
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.dataset as ds
+from pandas import DataFrame
+from .ids import paper_id
+
+RECORD_COLUMNS = ["paper_id", "title", "authors", "doi", "abstract", "url", "year", "source"]
+
+# Columns with a type other than string, everything else is stored as string
+COLUMN_TYPES = {
+    "authors": pa.list_(pa.string()),
+    "year": pa.int32(),
+    "citations": pa.int64(),
+    "requires reannotation": pa.bool_(),
+}
+
+
+def normalize_authors(authors) -> list[str]:
+    """
+    Turns the different author representations of the search backends
+    (and their stringified CSV form) into a plain list of names.
+    """
+    if authors is None or (isinstance(authors, float) and pd.isna(authors)):
+        return []
+    if isinstance(authors, str):
+        authors = authors.strip()
+        if authors.startswith("["):
+            try:
+                return normalize_authors(ast.literal_eval(authors))
+            except (ValueError, SyntaxError):
+                # reprs of acl_anthology Name objects
+                names = re.findall(r"Name\(first='(.*?)', last='(.*?)'\)", authors)
+                if names:
+                    return [" ".join(filter(None, name)) for name in names]
+                return [authors.strip("[]")]
+        return [authors] if authors else []
+    return [str(a) for a in authors]
+
+
+def _to_arrow_column(series: pd.Series, arrow_type: pa.DataType) -> pa.Array:
+    if arrow_type == pa.list_(pa.string()):
+        return pa.array([normalize_authors(v) for v in series], type=arrow_type)
+    if pa.types.is_integer(arrow_type):
+        return pa.array(pd.to_numeric(series, errors="coerce").astype("Int64"), type=arrow_type)
+    if arrow_type == pa.bool_():
+        values = [None if pd.isna(v) else str(v).lower() == "true" for v in series]
+        return pa.array(values, type=arrow_type)
+    values = [None if v is None or (not isinstance(v, str) and pd.isna(v)) else str(v) for v in series]
+    return pa.array(values, type=arrow_type)
+
+
+def to_arrow_table(df: DataFrame) -> pa.Table:
+    """
+    Converts candidates with any set of annotation columns into a typed Arrow table.
+    """
+    columns = [str(col) for col in df.columns]
+    arrays = [_to_arrow_column(df[col], COLUMN_TYPES.get(col, pa.string())) for col in df.columns]
+    return pa.Table.from_arrays(arrays, names=columns)
+
+
+def from_arrow_table(table: pa.Table) -> DataFrame:
+    df = table.to_pandas()
+    if "authors" in df.columns:
+        df["authors"] = [list(a) if a is not None else [] for a in df["authors"]]
+    return df
+
+
+def _write_table(table: pa.Table, path: str):
+    # written next to the target first, so readers never see a partial file
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    pq.write_table(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, path)
+
+
+def write_parquet(df: DataFrame, path: str):
+    _write_table(to_arrow_table(df), path)
+
+
+def read_parquet(path: str, columns: list[str]=None) -> DataFrame:
+    """
+    Reads a Parquet file, only loading `columns` if given.
+    """
+    if columns is not None:
+        available = pq.read_schema(path).names
+        columns = [col for col in columns if col in available]
+    return from_arrow_table(pq.read_table(path, columns=columns))
+
+
+class ResultStore:
+    def __init__(self, path: str):
+        """
+        Columnar store of candidate papers in a directory of Parquet files.
+
+        Search results are appended as new files partitioned by source and never rewritten.
+        Annotations are saved separately as new files holding only rows that changed,
+        the newest annotation of a paper wins when loading.
+        """
+        self.path = path
+        self.records_dir = os.path.join(path, "records")
+        self.annotations_dir = os.path.join(path, "annotations")
+        # latest annotation per paper and the files it was read from, see _stored_annotations
+        self._annotations = None
+        self._annotation_files = []
+
+    def _part_name(self) -> str:
+        return f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+
+    def _files(self, directory: str) -> list[str]:
+        if not os.path.isdir(directory):
+            return []
+        files = []
+        for root, _, names in os.walk(directory):
+            files += [os.path.join(root, name) for name in names if name.endswith(".parquet")]
+        return sorted(files, key=os.path.basename)
+
+    def paper_ids(self) -> set[str]:
+        files = self._files(self.records_dir)
+        if not files:
+            return set()
+        return set(ds.dataset(files).to_table(columns=["paper_id"]).column("paper_id").to_pylist())
+
+    def append(self, results) -> int:
+        """
+        Adds search results (list of dicts or DataFrame) whose titles are not stored yet.
+        Returns the number of added papers.
+        """
+        df = DataFrame(results) if not isinstance(results, DataFrame) else results
+        if len(df) == 0:
+            return 0
+        df = df.copy()
+        df["paper_id"] = [paper_id(title) for title in df["title"]]
+        df = df[~df["paper_id"].isin(self.paper_ids())].drop_duplicates(subset="paper_id")
+
+        record_columns = [col for col in RECORD_COLUMNS if col in df.columns]
+        for source, part in df.groupby(df["source"].fillna("unknown"), sort=False):
+            part_path = os.path.join(self.records_dir, f"source={source}", self._part_name())
+            write_parquet(part[record_columns], part_path)
+
+        annotation_columns = [col for col in df.columns if col not in RECORD_COLUMNS]
+        if annotation_columns and len(df):
+            self.save_annotations(df)
+        return len(df)
+
+    def _load_annotations(self, columns: list[str]=None) -> DataFrame:
+        files = self._files(self.annotations_dir)
+        if not files:
+            return DataFrame(columns=["paper_id"])
+        parts = [read_parquet(path, ["paper_id"] + columns if columns is not None else None) for path in files]
+        annotations = pd.concat(parts, ignore_index=True)
+        return annotations.drop_duplicates(subset="paper_id", keep="last")
+
+    def _stored_annotations(self) -> DataFrame:
+        """
+        Latest annotation per paper indexed by paper_id, kept in memory between saves.
+        Only files written since the last call are read, unless files were removed (e.g. by `compact`).
+        """
+        files = self._files(self.annotations_dir)
+        cached = self._annotation_files
+        if self._annotations is None or files[:len(cached)] != cached:
+            self._annotations = self._load_annotations().set_index("paper_id")
+        elif len(files) > len(cached):
+            parts = [self._annotations.reset_index()] + [read_parquet(path) for path in files[len(cached):]]
+            annotations = pd.concat(parts, ignore_index=True)
+            self._annotations = annotations.drop_duplicates(subset="paper_id", keep="last").set_index("paper_id")
+        self._annotation_files = files
+        return self._annotations
+
+    def save_annotations(self, df: DataFrame, columns: list[str]=None) -> int:
+        """
+        Saves annotation columns (all non-record columns by default) of rows that differ
+        from what is stored. Returns the number of written rows.
+        """
+        if columns is None:
+            columns = [col for col in df.columns if col not in RECORD_COLUMNS]
+        if not columns or len(df) == 0:
+            return 0
+
+        ids = df["paper_id"] if "paper_id" in df.columns else df["title"].map(paper_id)
+        new = df[columns].copy()
+        new.insert(0, "paper_id", ids.values)
+        new = new.drop_duplicates(subset="paper_id", keep="last").set_index("paper_id")
+
+        # the newest row of a paper replaces older ones, so it carries all stored columns
+        stored = self._stored_annotations().reindex(new.index)
+        as_text = lambda values: values.astype(str).where(values.notna(), "")
+        changed = pd.Series(False, index=new.index)
+        for col in columns:
+            old = stored[col] if col in stored.columns else pd.Series(None, index=new.index, dtype=object)
+            changed |= as_text(new[col]) != as_text(old)
+        for col in stored.columns:
+            if col not in new.columns:
+                new[col] = stored[col]
+
+        new = new[changed]
+        if len(new) == 0:
+            return 0
+        part_path = os.path.join(self.annotations_dir, self._part_name())
+        write_parquet(new.reset_index(), part_path)
+        if self._files(self.annotations_dir)[-1] == part_path:
+            annotations = pd.concat([self._annotations[~self._annotations.index.isin(new.index)], new])
+            self._annotations, self._annotation_files = annotations, self._annotation_files + [part_path]
+        return len(new)
+
+    def load(self, columns: list[str]=None, sources: list[str]=None) -> DataFrame:
+        """
+        Loads the candidates with their latest annotations.
+        `columns` limits which columns are read, `sources` which source partitions.
+        """
+        files = self._files(self.records_dir)
+        if not files:
+            return DataFrame(columns=RECORD_COLUMNS)
+        if sources is not None:
+            files = [
+                path for path in files
+                if os.path.basename(os.path.dirname(path)).removeprefix("source=") in sources
+                ]
+
+        record_columns = RECORD_COLUMNS if columns is None else \
+            ["paper_id"] + [col for col in columns if col in RECORD_COLUMNS and col != "paper_id"]
+        df = from_arrow_table(ds.dataset(files).to_table(columns=record_columns)) if files \
+            else DataFrame(columns=record_columns)
+
+        annotation_columns = None if columns is None else [col for col in columns if col not in RECORD_COLUMNS]
+        if annotation_columns != []:
+            annotations = self._load_annotations(annotation_columns)
+            if len(annotations.columns) > 1:
+                df = df.merge(annotations, on="paper_id", how="left")
+
+        if columns is not None:
+            df = df[["paper_id"] + [col for col in columns if col != "paper_id" and col in df.columns]]
+        return df
+
+    def compact(self):
+        """
+        Rewrites each source partition and the annotations into a single file each.
+        """
+        directories = {os.path.dirname(path) for path in self._files(self.records_dir)}
+        for directory in directories:
+            files = self._files(directory)
+            if len(files) > 1:
+                _write_table(ds.dataset(files).to_table(), os.path.join(directory, self._part_name()))
+                for path in files:
+                    os.remove(path)
+
+        files = self._files(self.annotations_dir)
+        if len(files) > 1:
+            write_parquet(self._load_annotations(), os.path.join(self.annotations_dir, self._part_name()))
+            for path in files:
+                os.remove(path)
+
+    @classmethod
+    def from_csv(cls, csv_path: str, path: str) -> "ResultStore":
+        """
+        Moves a results CSV (like results/candidate_papers.csv) with its annotations into a store.
+        """
+        store = cls(path)
+        added = store.append(pd.read_csv(csv_path))
+        print(f"Added {added} papers from {csv_path} to {path}")
+        return store
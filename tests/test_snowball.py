@@ -0,0 +1,37 @@
+from types import SimpleNamespace
+import search.snowball as snowball
+
+
+class FakeSemanticScholar:
+    """
+    Records the fields of each request. Paper "seed" is found by title and cites "ref".
+    """
+    def __init__(self):
+        self.calls = []
+
+    def search_paper(self, title, match_title=False, fields=None):
+        self.calls.append(("search_paper", list(fields)))
+        return SimpleNamespace(paperId="seed")
+
+    def get_papers(self, ids, fields=None):
+        self.calls.append(("get_papers", list(fields)))
+        papers = {
+            "seed": SimpleNamespace(paperId="seed", references=[SimpleNamespace(paperId="ref")], citations=[]),
+            "ref": SimpleNamespace(paperId="ref", references=[], citations=[]),
+        }
+        return [papers.get(i) for i in ids]
+
+
+def test_semanticscholar_title_seeds_fetch_links_in_batches(monkeypatch):
+    client = FakeSemanticScholar()
+    monkeypatch.setattr(snowball, "get_semanticscholar_client", lambda *args, **kwargs: client)
+    monkeypatch.setattr(snowball, "sleep", lambda seconds: None)
+
+    papers = snowball.snowball_semanticscholar(["A seed paper"], [], directions=["backward"])
+
+    assert sorted(p.paperId for p in papers) == ["ref", "seed"]
+    # the title match endpoint rejects nested fields
+    assert client.calls[0] == ("search_paper", ["paperId"])
+    for method, fields in client.calls[1:]:
+        assert method == "get_papers"
+        assert fields == snowball.SEMANTICSCHOLAR_FIELDS + ["references.paperId"]